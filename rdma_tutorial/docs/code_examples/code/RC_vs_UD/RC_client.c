@@ -19,6 +19,7 @@
 static struct context *s_ctx = NULL;
 static struct connection *s_conn = NULL;
 static struct remote_mr_info s_remote_mr_info; 
+static int s_json = 0; // --json: 结果输出为一行 JSON (schema rdma-bench/1)
 
 static void build_context(struct ibv_context *ibv_ctx) {
     if (s_ctx) return;
@@ -137,6 +138,16 @@ static void run_performance_test(struct connection *conn) {
     uint64_t total_bytes = (uint64_t)NUM_TRANSFERS * MESSAGE_SIZE;
     double bw = (double)total_bytes / sec / (1024.0 * 1024.0 * 1024.0);
     
+    if (s_json) {
+        printf("{\"schema\":\"rdma-bench/1\",\"role\":\"client\",\"mode\":\"write\","
+               "\"qp_type\":\"%s\",\"msg\":%d,\"window\":%d,\"iters\":%" PRIu64 ","
+               "\"sec\":%.6g,\"mops\":%.6g,\"gib\":%.6g}\n",
+               RDMA_Q_TYPE == IBV_QPT_RC ? "RC" : "UC", MESSAGE_SIZE, CLIENT_WINDOW,
+               (uint64_t)NUM_TRANSFERS, sec, mops, bw);
+        fflush(stdout);
+        return;
+    }
+
     printf("------------------------------------------------------------------\n");
     printf("Completed %s Test:\n", op_str);
     printf("Total Transfers: %" PRIu64 "\n", (uint64_t)NUM_TRANSFERS); 
@@ -223,10 +234,11 @@ static int on_event(struct rdma_cm_event *event) {
 }
 
 int main(int argc, char **argv) {
-    if (argc != 2) {
-        fprintf(stderr, "Usage: %s <server_ip>\n", argv[0]);
+    if (argc < 2 || argc > 3 || (argc == 3 && strcmp(argv[2], "--json"))) {
+        fprintf(stderr, "Usage: %s <server_ip> [--json]\n", argv[0]);
         exit(EXIT_FAILURE);
     }
+    s_json = (argc == 3);
     const char *server_ip = argv[1];
 
     struct rdma_event_channel *ec = rdma_create_event_channel();
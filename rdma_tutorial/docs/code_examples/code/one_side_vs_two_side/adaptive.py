@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Pick --iters per sweep point from a short calibration pass.
+
+With `iters = "auto"` in an experiment, every point first runs
+bench_client `calib_runs` times with `calib_iters` iterations, and the
+measured op rate then sets the iteration count of the real run:
+
+- target_seconds: the run should last about this long;
+- target_rse: the run should be long enough that its relative standard
+  error is below this. Run-to-run spread of the calibration runs is
+  assumed to shrink with 1/sqrt(duration).
+
+If both are set, the longer run wins. The result is clamped to
+[min_iters, max_iters].
+"""
+
+import math
+import statistics
+
+ADAPTIVE_DEFAULTS = {
+    "target_seconds": 2.0,
+    "target_rse": None,
+    "calib_iters": 20000,
+    "calib_runs": 1,
+    "min_iters": 10000,
+    "max_iters": 50_000_000,
+}
+
+
+def settings(*layers):
+    """Merge adaptive settings: defaults, then each layer in order."""
+    cfg = dict(ADAPTIVE_DEFAULTS)
+    for layer in layers:
+        unknown = set(layer or {}) - set(ADAPTIVE_DEFAULTS)
+        if unknown:
+            raise ValueError(
+                f"unknown adaptive setting(s): {', '.join(sorted(unknown))}"
+            )
+        cfg.update(layer or {})
+    if cfg["target_rse"] is not None and cfg["calib_runs"] < 2:
+        # A spread needs at least two samples
+        cfg["calib_runs"] = 3
+    return cfg
+
+
+def choose_iters(rates_mops, cfg):
+    """Iterations for the real run, given calibration rates in Mops."""
+    rate = statistics.mean(rates_mops) * 1e6  # ops/s
+    seconds = cfg["target_seconds"] or 0.0
+    if cfg["target_rse"] and len(rates_mops) >= 2:
+        calib_seconds = cfg["calib_iters"] / rate
+        rel_sd = statistics.stdev(rates_mops) / statistics.mean(rates_mops)
+        seconds = max(seconds, calib_seconds * (rel_sd / cfg["target_rse"]) ** 2)
+    iters = math.ceil(seconds * rate)
+    return max(cfg["min_iters"], min(cfg["max_iters"], iters))
+
+
+def calibrate(measure, cfg):
+    """Run the calibration pass and return the chosen iteration count.
+
+    measure(iters) runs bench_client once and returns its Mops, or None
+    if the run failed. Returns None if every calibration run failed.
+    """
+    rates = []
+    for _ in range(cfg["calib_runs"]):
+        mops = measure(cfg["calib_iters"])
+        if mops:
+            rates.append(mops)
+    if not rates:
+        return None
+    iters = choose_iters(rates, cfg)
+    print(
+        f"Calibrated: {', '.join(f'{r:.2f}' for r in rates)} Mops "
+        f"over {cfg['calib_iters']} iters -> --iters {iters}"
+    )
+    return iters
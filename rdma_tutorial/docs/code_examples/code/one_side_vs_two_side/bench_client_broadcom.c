@@ -1,14 +1,18 @@
-// gcc bench_client.c -o bench_client -lrdmacm -libverbs
+// gcc bench_client.c -o bench_client -lrdmacm -libverbs -lpthread
 #include <arpa/inet.h>
 #include <infiniband/verbs.h>
 #include <netdb.h>
+#include <pthread.h>
 #include <rdma/rdma_cma.h>
+#include <signal.h>
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
 #include <time.h>
 #include <unistd.h> // Include for usleep or potential system calls
 
+#include "bench_common.h"
+
 struct Info {
   uint64_t addr;
   uint32_t rkey, len;
@@ -16,6 +20,68 @@ struct Info {
 
 enum Mode { MODE_READ, MODE_WRITE, MODE_SEND };
 
+// wr_id = QP index << WR_QP_SHIFT | sequence number on that QP
+#define WR_QP_SHIFT 48
+
+// --inline asks for this much inline data first, then halves it until the
+// device accepts the QP
+#define INLINE_PROBE 1024
+
+// One connection (RC QP) to the server. --iters is split evenly over them.
+struct Conn {
+  struct rdma_cm_id *id;
+  struct ibv_mr *mr;
+  char *buf;
+  struct Info info;
+  uint64_t share;         // WRs to post on this QP
+  uint64_t posted;        // only touched by the owning thread
+  uint64_t done;          // WRs completed; atomic when the CQ is shared
+  uint64_t *t_post;       // --latency: post time, indexed by sequence % window
+  struct ibv_send_wr *wr; // --batch WRs, chained into one ibv_post_send
+  struct ibv_sge *sge;    // --sge per WR
+  uint32_t max_inline;    // what the QP got, with --inline
+  uint8_t max_rd_atomic;  // READs this QP may have outstanding
+  uint8_t max_dest_rd_atomic;
+};
+
+// One thread: posts on its QPs (QP i belongs to thread i % threads) and
+// polls its CQ, or the one CQ of all threads with --shared-cq.
+struct Worker {
+  pthread_t tid;
+  struct Bench *b;
+  struct Conn **conns;
+  int nconn;
+  struct ibv_cq *cq;
+  struct LatHist *lat;
+  uint64_t ops, end_ns;
+  int stopping; // SIGUSR1 seen
+};
+
+struct Bench {
+  enum Mode mode;
+  size_t msg;
+  uint64_t window;
+  uint64_t batch;  // WRs per ibv_post_send (one doorbell)
+  uint64_t signal; // request a completion for every signal-th WR
+  int nsge;        // SGEs per WR, each msg / nsge bytes of its own chunk
+  size_t buf_len;  // nsge chunks, 64-byte aligned
+  int use_inline;  // --inline given
+  int inline_flag; // IBV_SEND_INLINE if msg fits into every QP's inline data
+  int shared_cq;
+  struct Conn *conns;
+  int running; // workers not yet done
+  pthread_barrier_t start;
+};
+
+// SIGUSR1 ends the run early: the client finishes the WRs in flight and
+// reports what was done (the drivers stop a run once it is steady)
+static volatile sig_atomic_t stop_requested;
+
+static void on_stop(int sig) {
+  (void)sig;
+  stop_requested = 1;
+}
+
 static void die(const char *m) {
   perror(m);
   exit(1);
@@ -24,10 +90,304 @@ static void die(const char *m) {
 static void usage(const char *p) {
   fprintf(stderr,
           "Usage: %s <server_ip> <port> [--mode read|write|send] [--msg N] "
-          "[--iters N] [--window N]\n",
+          "[--iters N] [--window N] [--qps N] [--threads N] [--shared-cq] "
+          "[--batch N] [--signal N] [--inline] [--sge N] [--interval MS] "
+          "[--latency] [--cycles] [--json]\n",
           p);
 }
 
+static uint64_t conn_done(const struct Conn *c) {
+  return __atomic_load_n(&c->done, __ATOMIC_RELAXED);
+}
+
+// A QP completes in order, so the completion of WR seq means all WRs up to
+// seq are done. Two threads may poll them on a shared CQ: only move forward.
+static void conn_complete(struct Conn *c, uint64_t seq) {
+  uint64_t cur = conn_done(c);
+  while (cur < seq + 1 &&
+         !__atomic_compare_exchange_n(&c->done, &cur, seq + 1, 1,
+                                      __ATOMIC_RELAXED, __ATOMIC_RELAXED))
+    ;
+}
+
+// Connect one QP; its CQ is *cq, created on the first QP that uses it.
+static void connect_qp(struct rdma_event_channel *ec, struct addrinfo *res,
+                       struct Conn *c, struct ibv_cq **cq, int cqe,
+                       const struct Bench *b) {
+  struct rdma_cm_event *e;
+  if (rdma_create_id(ec, &c->id, NULL, RDMA_PS_TCP))
+    die("create_id");
+  if (rdma_resolve_addr(c->id, NULL, res->ai_addr, 2000))
+    die("resolve_addr");
+  if (rdma_get_cm_event(ec, &e))
+    die("event1");
+  rdma_ack_cm_event(e);
+  if (rdma_resolve_route(c->id, 2000))
+    die("resolve_route");
+  if (rdma_get_cm_event(ec, &e))
+    die("event2");
+  rdma_ack_cm_event(e);
+
+  if (!*cq) {
+    *cq = ibv_create_cq(c->id->verbs, cqe, NULL, NULL, 0);
+    if (!*cq)
+      die("create_cq");
+  }
+  struct ibv_device_attr da;
+  if (ibv_query_device(c->id->verbs, &da))
+    die("query_device");
+  if (b->nsge > da.max_sge) {
+    fprintf(stderr, "--sge %d exceeds the device's max_sge (%d)\n", b->nsge,
+            da.max_sge);
+    exit(1);
+  }
+
+  // The device does not report its inline limit; probe for it. The QP
+  // returns the inline size it actually got in qa.cap.
+  uint32_t want = b->use_inline ? INLINE_PROBE : 0;
+  struct ibv_qp_init_attr qa;
+  for (;;) {
+    memset(&qa, 0, sizeof(qa));
+    qa.qp_type = IBV_QPT_RC;
+    qa.send_cq = qa.recv_cq = *cq;
+    qa.cap.max_send_wr = (uint32_t)(b->window + 32);
+    qa.cap.max_recv_wr = 4;
+    qa.cap.max_send_sge = (uint32_t)b->nsge;
+    qa.cap.max_recv_sge = 1;
+    qa.cap.max_inline_data = want;
+    qa.sq_sig_all = 0;
+    if (!rdma_create_qp(c->id, c->id->pd, &qa))
+      break;
+    if (!want)
+      die("create_qp");
+    want /= 2;
+  }
+  c->max_inline = qa.cap.max_inline_data;
+
+  // Ask for as many outstanding READs as the device allows; the server
+  // answers with what it can take, and the QP gets the smaller of the two
+  struct rdma_conn_param p = {0};
+  p.initiator_depth =
+      da.max_qp_init_rd_atom < 255 ? da.max_qp_init_rd_atom : 255;
+  p.responder_resources = da.max_qp_rd_atom < 255 ? da.max_qp_rd_atom : 255;
+
+  if (rdma_connect(c->id, &p))
+    die("connect");
+
+  if (rdma_get_cm_event(ec, &e))
+    die("event3");
+  if (e->event != RDMA_CM_EVENT_ESTABLISHED) {
+    fprintf(stderr, "connect failed: %s\n", rdma_event_str(e->event));
+    exit(1);
+  }
+  memcpy(&c->info, e->param.conn.private_data, sizeof(c->info));
+  rdma_ack_cm_event(e);
+
+  struct ibv_qp_attr attr;
+  struct ibv_qp_init_attr init;
+  if (ibv_query_qp(c->id->qp, &attr,
+                   IBV_QP_MAX_QP_RD_ATOMIC | IBV_QP_MAX_DEST_RD_ATOMIC, &init))
+    die("query_qp");
+  c->max_rd_atomic = attr.max_rd_atomic;
+  c->max_dest_rd_atomic = attr.max_dest_rd_atomic;
+  if (c->info.len < b->msg) {
+    fprintf(stderr, "server buffer too small (%u < %zu)\n", c->info.len,
+            b->msg);
+    exit(1);
+  }
+
+  if (posix_memalign((void **)&c->buf, 4096, b->buf_len))
+    die("alloc");
+  memset(c->buf, 0xab, b->buf_len);
+
+  int access = IBV_ACCESS_LOCAL_WRITE;
+  c->mr = ibv_reg_mr(c->id->pd, c->buf, b->buf_len, access);
+  if (!c->mr)
+    die("reg_mr");
+}
+
+// The WRs of one post call, filled in once; post_window() sets wr_id,
+// send_flags and the chain.
+static void prepare_wrs(struct Bench *b, struct Conn *c) {
+  c->wr = (struct ibv_send_wr *)calloc(b->batch, sizeof(*c->wr));
+  c->sge = (struct ibv_sge *)calloc(b->batch * b->nsge, sizeof(*c->sge));
+  if (!c->wr || !c->sge)
+    die("alloc");
+  size_t chunk = b->msg / b->nsge, stride = b->buf_len / b->nsge;
+  for (uint64_t k = 0; k < b->batch; ++k) {
+    struct ibv_send_wr *wr = &c->wr[k];
+    struct ibv_sge *sg = &c->sge[k * b->nsge];
+    for (int j = 0; j < b->nsge; ++j) {
+      sg[j].addr = (uintptr_t)(c->buf + j * stride);
+      // The last SGE takes the remainder
+      sg[j].length =
+          (uint32_t)(j + 1 < b->nsge ? chunk : b->msg - chunk * (b->nsge - 1));
+      sg[j].lkey = c->mr->lkey;
+    }
+    wr->sg_list = sg;
+    wr->num_sge = b->nsge;
+
+    if (b->mode == MODE_READ) {
+      wr->opcode = IBV_WR_RDMA_READ;
+      wr->wr.rdma.remote_addr = c->info.addr;
+      wr->wr.rdma.rkey = c->info.rkey;
+    } else if (b->mode == MODE_WRITE) {
+      wr->opcode = IBV_WR_RDMA_WRITE;
+      wr->wr.rdma.remote_addr = c->info.addr;
+      wr->wr.rdma.rkey = c->info.rkey;
+    } else {
+      wr->opcode = IBV_WR_SEND;
+    }
+  }
+}
+
+// Fill the window of one QP, --batch WRs per ibv_post_send. Only every
+// --signal-th WR asks for a completion, plus the last WR of the QP and the
+// last one before the window runs out, so a completion is always on its way.
+static void post_window(struct Bench *b, struct Conn *c, uint64_t qp) {
+  for (;;) {
+    uint64_t room = b->window - (c->posted - conn_done(c));
+    uint64_t left = c->share - c->posted;
+    uint64_t n = room < left ? room : left;
+    // Wait for a full batch unless the QP is about to finish
+    if (n == 0 || (n < b->batch && n < left))
+      return;
+    if (n > b->batch)
+      n = b->batch;
+    int stall = room - n < b->batch;
+
+    for (uint64_t k = 0; k < n; ++k) {
+      uint64_t seq = c->posted + k;
+      struct ibv_send_wr *wr = &c->wr[k];
+      wr->wr_id = qp << WR_QP_SHIFT | seq;
+      wr->next = k + 1 < n ? &c->wr[k + 1] : NULL;
+      int last = k + 1 == n;
+      wr->send_flags =
+          ((seq + 1) % b->signal == 0 || seq + 1 == c->share || (last && stall))
+              ? IBV_SEND_SIGNALED
+              : 0;
+      wr->send_flags |= b->inline_flag;
+      if (c->t_post)
+        c->t_post[seq % b->window] = now_ns();
+    }
+
+    struct ibv_send_wr *bad = NULL;
+    if (ibv_post_send(c->id->qp, c->wr, &bad))
+      die("post_send");
+    c->posted += n;
+  }
+}
+
+// Stop posting on the QPs of w. Each QP ends at its next signaled WR, so
+// the completion of its last WR still arrives.
+static void stop_worker(const struct Bench *b, struct Worker *w) {
+  w->stopping = 1;
+  w->ops = 0;
+  for (int k = 0; k < w->nconn; ++k) {
+    struct Conn *c = w->conns[k];
+    uint64_t end = (c->posted + b->signal - 1) / b->signal * b->signal;
+    if (end < c->share)
+      c->share = end;
+    w->ops += c->share;
+  }
+}
+
+static void *worker_main(void *arg) {
+  struct Worker *w = (struct Worker *)arg;
+  struct Bench *b = w->b;
+  struct ibv_wc wc[32];
+
+  pthread_barrier_wait(&b->start);
+  for (;;) {
+    if (stop_requested && !w->stopping)
+      stop_worker(b, w);
+    uint64_t done = 0;
+    for (int k = 0; k < w->nconn; ++k)
+      done += conn_done(w->conns[k]);
+    if (done >= w->ops)
+      break;
+    for (int k = 0; k < w->nconn; ++k)
+      post_window(b, w->conns[k], (uint64_t)(w->conns[k] - b->conns));
+
+    int n = ibv_poll_cq(w->cq, 32, wc);
+    if (n < 0)
+      die("poll_cq");
+    uint64_t t_done = (w->lat && n > 0) ? now_ns() : 0;
+    for (int i = 0; i < n; ++i) {
+      if (wc[i].status) {
+        printf("RDMA error: wr_id=%lu status=%d(%s) vendor_err=0x%x\n",
+               wc[i].wr_id, wc[i].status, ibv_wc_status_str(wc[i].status),
+               wc[i].vendor_err);
+        die("wc");
+      }
+      // With a shared CQ this may be another thread's QP
+      struct Conn *c = &b->conns[wc[i].wr_id >> WR_QP_SHIFT];
+      uint64_t seq = wc[i].wr_id & ((1ull << WR_QP_SHIFT) - 1);
+      // With --signal only the signaled WRs are timed
+      if (w->lat)
+        lat_record(w->lat, t_done - c->t_post[seq % b->window]);
+      conn_complete(c, seq);
+    }
+  }
+  w->end_ns = now_ns();
+  __atomic_fetch_sub(&b->running, 1, __ATOMIC_RELEASE);
+  return NULL;
+}
+
+// --interval: while the workers run, print the WRs completed in each
+// period, for the drivers to tell the warm-up from the steady state.
+static void report_intervals(struct Bench *b, int qps, uint64_t t0,
+                             uint64_t period_ns, int json) {
+  struct timespec nap = {0, 1000000};
+  uint64_t next = t0 + period_ns, last_t = t0, last_ops = 0;
+  for (int n = 1; __atomic_load_n(&b->running, __ATOMIC_ACQUIRE);) {
+    nanosleep(&nap, NULL);
+    uint64_t t = now_ns();
+    if (t < next)
+      continue;
+    uint64_t ops = 0;
+    for (int q = 0; q < qps; ++q)
+      ops += conn_done(&b->conns[q]);
+    double sec = (t - last_t) / 1e9;
+    double mops = (ops - last_ops) / sec / 1e6;
+    double gib = (ops - last_ops) * b->msg / sec / (1024.0 * 1024.0 * 1024.0);
+    if (json) {
+      json_begin("interval");
+      json_put_int("interval", n);
+      json_put_f64("t", (t - t0) / 1e9);
+      json_put_f64("sec", sec);
+      json_put_u64("ops", ops - last_ops);
+      json_put_f64("mops", mops);
+      json_put_f64("gib", gib);
+      json_end();
+    } else {
+      printf("[client] interval %d: t=%.3f s, %lu ops, %.3f Mops, %.3f GiB/s\n",
+             n, (t - t0) / 1e9, (unsigned long)(ops - last_ops), mops, gib);
+    }
+    fflush(stdout); // stdout is a pipe to the driver
+    last_t = t;
+    last_ops = ops;
+    n++;
+    while (next <= t)
+      next += period_ns;
+  }
+}
+
+// Per-thread results as "per_thread": [{"thread": 0, "qps": 1, ...}, ...]
+static void threads_json(const struct Worker *ws, int threads, uint64_t t0,
+                         size_t msg) {
+  printf(",\"per_thread\":[");
+  for (int t = 0; t < threads; ++t) {
+    double sec = (ws[t].end_ns - t0) / 1e9;
+    printf("%s{\"thread\":%d,\"qps\":%d,\"ops\":%lu,\"sec\":%.6g,"
+           "\"mops\":%.6g,\"gib\":%.6g}",
+           t ? "," : "", t, ws[t].nconn, (unsigned long)ws[t].ops, sec,
+           ws[t].ops / sec / 1e6,
+           (ws[t].ops * msg) / sec / (1024.0 * 1024.0 * 1024.0));
+  }
+  printf("]");
+}
+
 int main(int argc, char **argv) {
   if (argc < 3) {
     usage(argv[0]);
@@ -40,6 +400,17 @@ int main(int argc, char **argv) {
   size_t msg = 4096;
   uint64_t iters = 100000;
   uint64_t window = 64;
+  int qps = 1;
+  int threads = 1;
+  int shared_cq = 0;
+  uint64_t batch = 1;
+  uint64_t signal = 1;
+  int use_inline = 0;
+  int nsge = 1;
+  uint64_t interval_ms = 0;
+  int latency = 0;
+  int cycles = 0;
+  int json = 0;
 
   for (int i = 3; i < argc; ++i) {
     if (!strcmp(argv[i], "--mode") && i + 1 < argc) {
@@ -56,18 +427,51 @@ int main(int argc, char **argv) {
       iters = strtoull(argv[++i], NULL, 0);
     } else if (!strcmp(argv[i], "--window") && i + 1 < argc) {
       window = strtoull(argv[++i], NULL, 0);
+    } else if (!strcmp(argv[i], "--qps") && i + 1 < argc) {
+      qps = atoi(argv[++i]);
+    } else if (!strcmp(argv[i], "--threads") && i + 1 < argc) {
+      threads = atoi(argv[++i]);
+    } else if (!strcmp(argv[i], "--shared-cq")) {
+      shared_cq = 1;
+    } else if (!strcmp(argv[i], "--batch") && i + 1 < argc) {
+      batch = strtoull(argv[++i], NULL, 0);
+    } else if (!strcmp(argv[i], "--signal") && i + 1 < argc) {
+      signal = strtoull(argv[++i], NULL, 0);
+    } else if (!strcmp(argv[i], "--inline")) {
+      use_inline = 1;
+    } else if (!strcmp(argv[i], "--sge") && i + 1 < argc) {
+      nsge = atoi(argv[++i]);
+    } else if (!strcmp(argv[i], "--interval") && i + 1 < argc) {
+      interval_ms = strtoull(argv[++i], NULL, 0);
+    } else if (!strcmp(argv[i], "--latency")) {
+      latency = 1;
+    } else if (!strcmp(argv[i], "--cycles")) {
+      cycles = 1;
+    } else if (!strcmp(argv[i], "--json")) {
+      json = 1;
     } else {
       usage(argv[0]);
       return 1;
     }
   }
+  if (qps < 1 || threads < 1 || window < 1 || batch < 1 || signal < 1 ||
+      nsge < 1 || (size_t)nsge > msg) {
+    usage(argv[0]);
+    return 1;
+  }
+  if (threads > qps)
+    threads = qps; // a thread without a QP has nothing to do
+  // Neither can exceed the WRs in flight on one QP
+  if (batch > window)
+    batch = window;
+  if (signal > window)
+    signal = window;
 
-  struct rdma_event_channel *ec = rdma_create_event_channel();
-  struct rdma_cm_id *id;
-  struct rdma_cm_event *e;
-  if (rdma_create_id(ec, &id, NULL, RDMA_PS_TCP))
-    die("create_id");
+  struct sigaction sa = {0};
+  sa.sa_handler = on_stop;
+  sigaction(SIGUSR1, &sa, NULL);
 
+  struct rdma_event_channel *ec = rdma_create_event_channel();
   struct addrinfo *res;
   char ps[16];
   snprintf(ps, sizeof(ps), "%d", port);
@@ -85,114 +489,204 @@ int main(int argc, char **argv) {
   }
   // --- END: 修改部分 ---
 
-  if (rdma_resolve_addr(id, NULL, res->ai_addr, 2000))
-    die("resolve_addr");
-  if (rdma_get_cm_event(ec, &e))
-    die("event1");
-  rdma_ack_cm_event(e);
-  if (rdma_resolve_route(id, 2000))
-    die("resolve_route");
-  if (rdma_get_cm_event(ec, &e))
-    die("event2");
-  rdma_ack_cm_event(e);
-
-  struct ibv_qp_init_attr qa = {0};
-  qa.qp_type = IBV_QPT_RC;
-  qa.cap.max_send_wr = (uint32_t)(window + 32);
-  qa.cap.max_recv_wr = 4;
-  qa.cap.max_send_sge = qa.cap.max_recv_sge = 1;
-  qa.sq_sig_all = 0;
-  if (rdma_create_qp(id, id->pd, &qa))
-    die("create_qp");
-
-  struct rdma_conn_param p = {0};
-  p.initiator_depth = 16;
-  p.responder_resources = 16;
-
-  if (rdma_connect(id, &p))
-    die("connect");
+  struct Bench b = {.mode = mode,
+                    .msg = msg,
+                    .window = window,
+                    .batch = batch,
+                    .signal = signal,
+                    .nsge = nsge,
+                    .buf_len = msg,
+                    .use_inline = use_inline,
+                    .shared_cq = shared_cq};
+  if (nsge > 1)
+    b.buf_len = nsge * ((msg / nsge + msg % nsge + 63) & ~(size_t)63);
+  struct Conn *conns = (struct Conn *)calloc(qps, sizeof(*conns));
+  struct Worker *ws = (struct Worker *)calloc(threads, sizeof(*ws));
+  if (!conns || !ws)
+    die("alloc");
+  b.conns = conns;
 
-  if (rdma_get_cm_event(ec, &e))
-    die("event3");
-  struct Info info;
-  memcpy(&info, e->param.conn.private_data, sizeof(info));
-  rdma_ack_cm_event(e);
-  if (info.len < msg) {
-    fprintf(stderr, "server buffer too small (%u < %zu)\n", info.len, msg);
-    return 1;
+  for (int t = 0; t < threads; ++t) {
+    ws[t].b = &b;
+    ws[t].conns = (struct Conn **)calloc(qps, sizeof(*ws[t].conns));
+    if (!ws[t].conns)
+      die("alloc");
+    if (latency) {
+      ws[t].lat = (struct LatHist *)calloc(1, sizeof(*ws[t].lat));
+      if (!ws[t].lat)
+        die("alloc");
+    }
   }
+  struct ibv_cq *shared = NULL;
+  for (int q = 0; q < qps; ++q) {
+    struct Conn *c = &conns[q];
+    struct Worker *w = &ws[q % threads];
+    c->share = iters / qps + ((uint64_t)q < iters % qps);
+    w->conns[w->nconn++] = c;
+    w->ops += c->share;
+    // Room for the full window of every QP that shares the CQ
+    int per_cq = shared_cq ? qps : (qps - q % threads + threads - 1) / threads;
+    connect_qp(ec, res, c, shared_cq ? &shared : &w->cq,
+               per_cq * (int)(window + 32), &b);
+    if (latency) {
+      c->t_post = (uint64_t *)calloc(window, sizeof(*c->t_post));
+      if (!c->t_post)
+        die("alloc");
+    }
+  }
+  if (shared_cq)
+    for (int t = 0; t < threads; ++t)
+      ws[t].cq = shared;
 
-  char *buf = NULL;
-  if (posix_memalign((void **)&buf, 4096, msg))
-    die("alloc");
-  memset(buf, 0xab, msg);
-
-  int access = IBV_ACCESS_LOCAL_WRITE;
-  struct ibv_mr *mr = ibv_reg_mr(id->pd, buf, msg, access);
-  if (!mr)
-    die("reg_mr");
+  // READ has no payload to inline; otherwise it must fit every QP
+  uint32_t max_inline = conns[0].max_inline;
+  int rd_atomic = conns[0].max_rd_atomic;
+  int dest_rd_atomic = conns[0].max_dest_rd_atomic;
+  for (int q = 1; q < qps; ++q) {
+    if (conns[q].max_inline < max_inline)
+      max_inline = conns[q].max_inline;
+    if (conns[q].max_rd_atomic < rd_atomic)
+      rd_atomic = conns[q].max_rd_atomic;
+    if (conns[q].max_dest_rd_atomic < dest_rd_atomic)
+      dest_rd_atomic = conns[q].max_dest_rd_atomic;
+  }
+  // A READ beyond max_rd_atomic waits in the send queue: the window that
+  // actually is in flight
+  uint64_t eff_window = mode == MODE_READ && (uint64_t)rd_atomic < window
+                            ? (uint64_t)rd_atomic
+                            : window;
+  if (use_inline && mode != MODE_READ && msg <= max_inline)
+    b.inline_flag = IBV_SEND_INLINE;
+  for (int q = 0; q < qps; ++q)
+    prepare_wrs(&b, &conns[q]);
 
-  uint64_t posted = 0, done = 0;
-  struct ibv_wc wc[32];
-  struct timespec ts0, ts1;
-  clock_gettime(CLOCK_MONOTONIC, &ts0);
-
-  while (done < iters) {
-    while (posted - done < window && posted < iters) {
-      struct ibv_sge s = {
-          .addr = (uintptr_t)buf, .length = (uint32_t)msg, .lkey = mr->lkey};
-      struct ibv_send_wr wr = {0}, *bad = NULL;
-      wr.wr_id = posted;
-      wr.sg_list = &s;
-      wr.num_sge = 1;
-      wr.send_flags = IBV_SEND_SIGNALED;
-
-      if (mode == MODE_READ) {
-        wr.opcode = IBV_WR_RDMA_READ;
-        wr.wr.rdma.remote_addr = info.addr;
-        wr.wr.rdma.rkey = info.rkey;
-      } else if (mode == MODE_WRITE) {
-        wr.opcode = IBV_WR_RDMA_WRITE;
-        wr.wr.rdma.remote_addr = info.addr;
-        wr.wr.rdma.rkey = info.rkey;
-      } else {
-        wr.opcode = IBV_WR_SEND;
-      }
+  // All threads start together; the run ends with the last one
+  pthread_barrier_init(&b.start, NULL, threads + 1);
+  b.running = threads;
+  // CPU time from starting the threads until they are joined; the cycle
+  // counter is opened first so that the threads inherit it
+  struct CpuMark cm;
+  cpu_start(&cm, cycles);
+  for (int t = 0; t < threads; ++t)
+    if (pthread_create(&ws[t].tid, NULL, worker_main, &ws[t]))
+      die("pthread_create");
+  pthread_barrier_wait(&b.start);
+  uint64_t t0 = now_ns(), t1 = t0;
+  if (interval_ms)
+    report_intervals(&b, qps, t0, interval_ms * 1000000ull, json);
+  struct LatHist *lat = latency ? ws[0].lat : NULL;
+  for (int t = 0; t < threads; ++t) {
+    pthread_join(ws[t].tid, NULL);
+    if (ws[t].end_ns > t1)
+      t1 = ws[t].end_ns;
+    if (lat && t)
+      lat_merge(lat, ws[t].lat);
+  }
+  struct CpuUse cpu = cpu_stop(&cm);
+  pthread_barrier_destroy(&b.start);
 
-      if (ibv_post_send(id->qp, &wr, &bad))
-        die("post_send");
-      posted++;
+  // Fewer than --iters if the run was stopped early
+  uint64_t ops = 0;
+  for (int q = 0; q < qps; ++q)
+    ops += conn_done(&conns[q]);
+  double sec = (t1 - t0) / 1e9;
+  double mops = ops / sec / 1e6;
+  double bw = (ops * msg) / sec / (1024.0 * 1024.0 * 1024.0);
+  const char *mstr =
+      mode == MODE_READ ? "read" : (mode == MODE_WRITE ? "write" : "send");
+  int multi = qps > 1 || threads > 1;
+  if (json) {
+    json_begin("client");
+    json_put_str("mode", mstr);
+    json_put_u64("msg", msg);
+    json_put_u64("window", window);
+    json_put_u64("iters", ops);
+    json_put_f64("sec", sec);
+    if (ops < iters)
+      json_put_bool("stopped", 1);
+    json_put_f64("mops", mops);
+    json_put_f64("gib", bw);
+    if (multi) {
+      json_put_int("qps", qps);
+      json_put_int("threads", threads);
+      json_put_bool("shared_cq", shared_cq);
+      threads_json(ws, threads, t0, msg);
     }
-
-    int n = ibv_poll_cq(id->send_cq, 32, wc);
-    if (n < 0)
-      die("poll_cq");
-    for (int i = 0; i < n; ++i) {
-      if (wc[i].status) {
-        printf("RDMA error: wr_id=%lu status=%d(%s) vendor_err=0x%x\n",
-               wc[i].wr_id, wc[i].status, ibv_wc_status_str(wc[i].status),
-               wc[i].vendor_err);
-        die("wc");
+    if (batch > 1 || signal > 1) {
+      json_put_u64("batch", batch);
+      json_put_u64("signal", signal);
+    }
+    if (use_inline) {
+      json_put_bool("inline", b.inline_flag != 0);
+      json_put_u64("max_inline", max_inline);
+    }
+    if (nsge > 1)
+      json_put_int("sge", nsge);
+    if (mode == MODE_READ) {
+      json_put_int("max_rd_atomic", rd_atomic);
+      json_put_int("max_dest_rd_atomic", dest_rd_atomic);
+      json_put_u64("effective_window", eff_window);
+    }
+    cpu_json(&cpu);
+    if (lat)
+      lat_json(lat);
+    json_end();
+  } else {
+    printf(
+        "[client] %s done: %.2f Mops, %.2f GiB/s (msg=%zu bytes, window=%lu)\n",
+        mstr, mops, bw, msg, (unsigned long)window);
+    if (ops < iters)
+      printf("[client] stopped early after %lu of %lu WRs\n",
+             (unsigned long)ops, (unsigned long)iters);
+    if (multi) {
+      printf("[client] %d QPs on %d threads (%s CQ)\n", qps, threads,
+             shared_cq ? "shared" : "per-thread");
+      for (int t = 0; t < threads; ++t) {
+        double tsec = (ws[t].end_ns - t0) / 1e9;
+        printf("[client] thread %d: %.2f Mops, %.2f GiB/s (qps=%d)\n", t,
+               ws[t].ops / tsec / 1e6,
+               (ws[t].ops * msg) / tsec / (1024.0 * 1024.0 * 1024.0),
+               ws[t].nconn);
       }
-      done++;
     }
+    if (batch > 1 || signal > 1)
+      printf("[client] %lu WRs per post, signal every %lu WRs\n",
+             (unsigned long)batch, (unsigned long)signal);
+    if (use_inline)
+      printf("[client] inline %s (max_inline_data=%u)\n",
+             b.inline_flag ? "on" : "off", max_inline);
+    if (nsge > 1)
+      printf("[client] %d SGEs per WR\n", nsge);
+    if (mode == MODE_READ)
+      printf("[client] READ: max_rd_atomic=%d max_dest_rd_atomic=%d, "
+             "effective window %lu\n",
+             rd_atomic, dest_rd_atomic, (unsigned long)eff_window);
+    cpu_print("client", &cpu);
+    if (lat)
+      lat_print(lat);
   }
 
-  clock_gettime(CLOCK_MONOTONIC, &ts1);
-  double sec = (ts1.tv_sec - ts0.tv_sec) + (ts1.tv_nsec - ts0.tv_nsec) / 1e9;
-  double mops = iters / sec / 1e6;
-  double bw = (iters * msg) / sec / (1024.0 * 1024.0 * 1024.0);
-  const char *mstr =
-      mode == MODE_READ ? "read" : (mode == MODE_WRITE ? "write" : "send");
-  printf(
-      "[client] %s done: %.2f Mops, %.2f GiB/s (msg=%zu bytes, window=%lu)\n",
-      mstr, mops, bw, msg, (unsigned long)window);
-
-  rdma_disconnect(id);
-  ibv_dereg_mr(mr);
-  free(buf);
-  rdma_destroy_qp(id);
-  rdma_destroy_id(id);
+  for (int q = 0; q < qps; ++q)
+    rdma_disconnect(conns[q].id);
+  for (int q = 0; q < qps; ++q) {
+    ibv_dereg_mr(conns[q].mr);
+    free(conns[q].buf);
+    free(conns[q].t_post);
+    free(conns[q].wr);
+    free(conns[q].sge);
+    rdma_destroy_qp(conns[q].id);
+    rdma_destroy_id(conns[q].id);
+  }
+  for (int t = 0; t < threads; ++t) {
+    if (ws[t].cq && !shared_cq)
+      ibv_destroy_cq(ws[t].cq);
+    free(ws[t].conns);
+    free(ws[t].lat);
+  }
+  if (shared)
+    ibv_destroy_cq(shared);
+  free(ws);
+  free(conns);
   rdma_destroy_event_channel(ec);
   freeaddrinfo(res);
   return 0;
@@ -9,6 +9,8 @@
 #include <string.h>
 #include <time.h>
 
+#include "bench_common.h"
+
 struct Info {
   uint64_t addr;
   uint32_t rkey, len;
@@ -35,7 +37,7 @@ static void usage(const char *p) {
   fprintf(stderr,
           "Usage: %s <server_ip> <port> "
           "[--mode read|write|send] [--msg N] [--iters N] "
-          "[--window N] [--gpu N]\n",
+          "[--window N] [--gpu N] [--latency] [--json]\n",
           p);
 }
 
@@ -51,6 +53,8 @@ int main(int argc, char **argv) {
   size_t msg = 4096;
   uint64_t iters = 100000;
   uint64_t window = 64;
+  int latency = 0;
+  int json = 0;
   int gpu = 0;
 
   for (int i = 3; i < argc; ++i) {
@@ -70,6 +74,10 @@ int main(int argc, char **argv) {
       window = strtoull(argv[++i], NULL, 0);
     } else if (!strcmp(argv[i], "--gpu") && i + 1 < argc) {
       gpu = atoi(argv[++i]);
+    } else if (!strcmp(argv[i], "--latency")) {
+      latency = 1;
+    } else if (!strcmp(argv[i], "--json")) {
+      json = 1;
     } else {
       usage(argv[0]);
       return 1;
@@ -159,6 +167,17 @@ int main(int argc, char **argv) {
   uint64_t posted = 0, done = 0;
   struct ibv_wc wc[32];
   struct timespec ts0, ts1;
+
+  // --latency: post time of each outstanding WR, indexed by wr_id % window
+  uint64_t *t_post = NULL;
+  struct LatHist *lat = NULL;
+  if (latency) {
+    t_post = (uint64_t *)calloc(window, sizeof(*t_post));
+    lat = (struct LatHist *)calloc(1, sizeof(*lat));
+    if (!t_post || !lat)
+      die("alloc");
+  }
+
   clock_gettime(CLOCK_MONOTONIC, &ts0);
 
   while (done < iters) {
@@ -188,6 +207,9 @@ int main(int argc, char **argv) {
         wr.opcode = IBV_WR_SEND;
       }
 
+      if (t_post)
+        t_post[posted % window] = now_ns();
+
       if (ibv_post_send(id->qp, &wr, &bad))
         die("ibv_post_send");
       posted++;
@@ -196,6 +218,7 @@ int main(int argc, char **argv) {
     int n = ibv_poll_cq(id->send_cq, 32, wc);
     if (n < 0)
       die("ibv_poll_cq");
+    uint64_t t_done = (lat && n > 0) ? now_ns() : 0;
     for (int i = 0; i < n; ++i) {
       if (wc[i].status) {
         printf("RDMA error: wr_id=%lu status=%d(%s) vendor_err=0x%x\n",
@@ -203,6 +226,8 @@ int main(int argc, char **argv) {
                wc[i].vendor_err);
         die("wc");
       }
+      if (lat)
+        lat_record(lat, t_done - t_post[wc[i].wr_id % window]);
       done++;
     }
   }
@@ -215,9 +240,28 @@ int main(int argc, char **argv) {
 
   const char *mstr =
       mode == MODE_READ ? "read" : (mode == MODE_WRITE ? "write" : "send");
-  printf("[client] GPU %s done: %.2f Mops, %.2f GiB/s "
-         "(msg=%zu bytes, window=%lu, gpu=%d)\n",
-         mstr, mops, bw, msg, (unsigned long)window, gpu);
+  if (json) {
+    json_begin("client");
+    json_put_str("mode", mstr);
+    json_put_u64("msg", msg);
+    json_put_u64("window", window);
+    json_put_u64("iters", iters);
+    json_put_int("gpu", gpu);
+    json_put_f64("sec", sec);
+    json_put_f64("mops", mops);
+    json_put_f64("gib", bw);
+    if (lat)
+      lat_json(lat);
+    json_end();
+  } else {
+    printf("[client] GPU %s done: %.2f Mops, %.2f GiB/s "
+           "(msg=%zu bytes, window=%lu, gpu=%d)\n",
+           mstr, mops, bw, msg, (unsigned long)window, gpu);
+    if (lat)
+      lat_print(lat);
+  }
+  free(t_post);
+  free(lat);
 
   rdma_disconnect(id);
   ibv_dereg_mr(mr);
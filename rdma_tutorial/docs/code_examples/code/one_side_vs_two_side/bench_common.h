@@ -0,0 +1,237 @@
+// Helpers shared by the bench_* programs (header only, C and C++).
+#pragma once
+#include <linux/perf_event.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <string.h>
+#include <sys/resource.h>
+#include <sys/syscall.h>
+#include <time.h>
+#include <unistd.h>
+
+static inline uint64_t now_ns(void) {
+  struct timespec ts;
+  clock_gettime(CLOCK_MONOTONIC, &ts);
+  return (uint64_t)ts.tv_sec * 1000000000ull + (uint64_t)ts.tv_nsec;
+}
+
+// ---- latency histogram (--latency) ----
+// HDR-style log-linear buckets: exact below 2^LAT_SUB_BITS ns, then
+// 2^LAT_SUB_BITS buckets per power of two, i.e. about 3% resolution.
+#define LAT_SUB_BITS 5
+#define LAT_SUB (1 << LAT_SUB_BITS)
+#define LAT_BUCKETS ((64 - LAT_SUB_BITS + 1) * LAT_SUB)
+
+struct LatHist {
+  uint64_t count[LAT_BUCKETS];
+  uint64_t total, sum_ns, max_ns;
+};
+
+static inline int lat_index(uint64_t ns) {
+  if (ns < LAT_SUB)
+    return (int)ns;
+  int shift = 63 - __builtin_clzll(ns) - LAT_SUB_BITS;
+  return (shift + 1) * LAT_SUB + (int)((ns >> shift) - LAT_SUB);
+}
+
+// Lowest value that falls into bucket idx.
+static inline uint64_t lat_lower(int idx) {
+  if (idx < LAT_SUB)
+    return (uint64_t)idx;
+  int shift = idx / LAT_SUB - 1;
+  return (uint64_t)(idx % LAT_SUB + LAT_SUB) << shift;
+}
+
+static inline void lat_record(struct LatHist *h, uint64_t ns) {
+  h->count[lat_index(ns)]++;
+  h->total++;
+  h->sum_ns += ns;
+  if (ns > h->max_ns)
+    h->max_ns = ns;
+}
+
+// Add the samples of src to h (histograms of several threads).
+static inline void lat_merge(struct LatHist *h, const struct LatHist *src) {
+  for (int i = 0; i < LAT_BUCKETS; ++i)
+    h->count[i] += src->count[i];
+  h->total += src->total;
+  h->sum_ns += src->sum_ns;
+  if (src->max_ns > h->max_ns)
+    h->max_ns = src->max_ns;
+}
+
+// Value (ns) below which a fraction q of the samples lie, bucket midpoint.
+static inline double lat_percentile(const struct LatHist *h, double q) {
+  uint64_t rank = (uint64_t)(q * (double)h->total + 0.5), seen = 0;
+  if (rank == 0)
+    rank = 1;
+  for (int i = 0; i < LAT_BUCKETS; ++i) {
+    seen += h->count[i];
+    if (seen >= rank) {
+      double lo = (double)lat_lower(i);
+      return lo + ((double)lat_lower(i + 1) - lo) / 2.0;
+    }
+  }
+  return (double)h->max_ns;
+}
+
+// Two lines: a readable summary, and the non-empty buckets as
+// "<lower bound ns>:<count>" pairs for the sweep drivers to merge.
+static inline void lat_print(const struct LatHist *h) {
+  if (!h->total)
+    return;
+  printf("[client] latency: p50=%.2f p99=%.2f p99.9=%.2f max=%.2f mean=%.2f us "
+         "(n=%lu)\n",
+         lat_percentile(h, 0.50) / 1e3, lat_percentile(h, 0.99) / 1e3,
+         lat_percentile(h, 0.999) / 1e3, h->max_ns / 1e3,
+         (double)h->sum_ns / h->total / 1e3, (unsigned long)h->total);
+  printf("[client] latency hist:");
+  for (int i = 0; i < LAT_BUCKETS; ++i)
+    if (h->count[i])
+      printf(" %lu:%lu", (unsigned long)lat_lower(i),
+             (unsigned long)h->count[i]);
+  printf("\n");
+}
+
+// ---- JSON output (--json) ----
+// With --json a program prints each result as one JSON object on a single
+// line instead of its "done" text line; results.py holds the schema.
+#define BENCH_SCHEMA "rdma-bench/1"
+
+static inline void json_begin(const char *role) {
+  printf("{\"schema\":\"" BENCH_SCHEMA "\",\"role\":\"%s\"", role);
+}
+
+static inline void json_put_str(const char *key, const char *v) {
+  printf(",\"%s\":\"%s\"", key, v);
+}
+
+static inline void json_put_u64(const char *key, uint64_t v) {
+  printf(",\"%s\":%lu", key, (unsigned long)v);
+}
+
+static inline void json_put_int(const char *key, int v) {
+  printf(",\"%s\":%d", key, v);
+}
+
+static inline void json_put_f64(const char *key, double v) {
+  printf(",\"%s\":%.6g", key, v);
+}
+
+static inline void json_put_bool(const char *key, int v) {
+  printf(",\"%s\":%s", key, v ? "true" : "false");
+}
+
+static inline void json_end(void) { printf("}\n"); }
+
+// The histogram as "latency": {..., "hist": [[lower_ns, count], ...]}
+static inline void lat_json(const struct LatHist *h) {
+  if (!h->total)
+    return;
+  printf(",\"latency\":{\"n\":%lu", (unsigned long)h->total);
+  printf(",\"p50_us\":%.3f,\"p99_us\":%.3f,\"p999_us\":%.3f",
+         lat_percentile(h, 0.50) / 1e3, lat_percentile(h, 0.99) / 1e3,
+         lat_percentile(h, 0.999) / 1e3);
+  printf(",\"max_us\":%.3f,\"mean_us\":%.3f,\"hist\":[", h->max_ns / 1e3,
+         (double)h->sum_ns / h->total / 1e3);
+  const char *sep = "";
+  for (int i = 0; i < LAT_BUCKETS; ++i)
+    if (h->count[i]) {
+      printf("%s[%lu,%lu]", sep, (unsigned long)lat_lower(i),
+             (unsigned long)h->count[i]);
+      sep = ",";
+    }
+  printf("]}");
+}
+
+// ---- CPU cost of a run ----
+// What the measured part of a run cost the CPU: user and system time of
+// this process (getrusage, all its threads), the busy time of the whole
+// host (/proc/stat, in clock ticks of usually 10 ms) and, with --cycles,
+// the CPU cycles of this process and of the threads it starts afterwards
+// (perf_event_open, user space only if perf_event_paranoid says so).
+struct CpuUse {
+  double user_s, sys_s, host_s;
+  int64_t cycles; // -1: not counted
+};
+
+struct CpuMark {
+  struct rusage ru;
+  uint64_t host_ticks;
+  int fd; // cycle counter, -1 if none
+};
+
+// Busy ticks of all CPUs: the "cpu" line of /proc/stat without idle and
+// iowait.
+static inline uint64_t host_busy_ticks(void) {
+  unsigned long long v[8] = {0};
+  FILE *f = fopen("/proc/stat", "r");
+  if (!f)
+    return 0;
+  int n = fscanf(f, "cpu %llu %llu %llu %llu %llu %llu %llu %llu", &v[0], &v[1],
+                 &v[2], &v[3], &v[4], &v[5], &v[6], &v[7]);
+  fclose(f);
+  if (n < 4)
+    return 0;
+  return v[0] + v[1] + v[2] + v[5] + v[6] + v[7];
+}
+
+static inline int cycles_open(void) {
+  struct perf_event_attr pa;
+  memset(&pa, 0, sizeof(pa));
+  pa.size = sizeof(pa);
+  pa.type = PERF_TYPE_HARDWARE;
+  pa.config = PERF_COUNT_HW_CPU_CYCLES;
+  pa.inherit = 1; // threads started later count too
+  int fd = (int)syscall(SYS_perf_event_open, &pa, 0, -1, -1, 0);
+  if (fd < 0) {
+    pa.exclude_kernel = pa.exclude_hv = 1;
+    fd = (int)syscall(SYS_perf_event_open, &pa, 0, -1, -1, 0);
+  }
+  return fd;
+}
+
+static inline double timeval_sec(struct timeval tv) {
+  return tv.tv_sec + tv.tv_usec / 1e6;
+}
+
+static inline void cpu_start(struct CpuMark *m, int cycles) {
+  m->fd = cycles ? cycles_open() : -1;
+  getrusage(RUSAGE_SELF, &m->ru);
+  m->host_ticks = host_busy_ticks();
+}
+
+static inline struct CpuUse cpu_stop(struct CpuMark *m) {
+  struct rusage ru;
+  struct CpuUse u;
+  getrusage(RUSAGE_SELF, &ru);
+  u.user_s = timeval_sec(ru.ru_utime) - timeval_sec(m->ru.ru_utime);
+  u.sys_s = timeval_sec(ru.ru_stime) - timeval_sec(m->ru.ru_stime);
+  u.host_s = (double)(host_busy_ticks() - m->host_ticks) / sysconf(_SC_CLK_TCK);
+  u.cycles = -1;
+  if (m->fd >= 0) {
+    uint64_t v;
+    if (read(m->fd, &v, sizeof(v)) == (ssize_t)sizeof(v))
+      u.cycles = (int64_t)v;
+    close(m->fd);
+    m->fd = -1;
+  }
+  return u;
+}
+
+// [client] cpu: user=0.512 s, sys=0.004 s, host=0.530 s, cycles=1530000000
+static inline void cpu_print(const char *role, const struct CpuUse *u) {
+  printf("[%s] cpu: user=%.6f s, sys=%.6f s, host=%.6f s", role, u->user_s,
+         u->sys_s, u->host_s);
+  if (u->cycles >= 0)
+    printf(", cycles=%lld", (long long)u->cycles);
+  printf("\n");
+}
+
+static inline void cpu_json(const struct CpuUse *u) {
+  json_put_f64("cpu_user_s", u->user_s);
+  json_put_f64("cpu_sys_s", u->sys_s);
+  json_put_f64("host_cpu_s", u->host_s);
+  if (u->cycles >= 0)
+    json_put_u64("cycles", (uint64_t)u->cycles);
+}
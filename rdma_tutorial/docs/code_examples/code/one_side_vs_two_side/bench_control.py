@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Controller for `bench_server --daemon`.
+
+The daemon listens on a TCP control port (default: RDMA port + 1) and takes
+one JSON object per line:
+
+    -> {"cmd": "run", "mode": "send", "msg": 32, "iters": 200000, "recv_depth": 256}
+       (+ "qps": N when the client connects N QPs, "cycles": 1 to count
+       CPU cycles)
+    <- {"status": "listening", "port": 9000}      # start the client now
+    <- {"status": "done", "mode": "send", ..., "reused": true, "mops": .., "gib": ..,
+        "cpu_user_s": .., "cpu_sys_s": .., "host_cpu_s": ..}
+    -> {"cmd": "quit"}
+
+"reused" tells whether the registered buffer of an earlier run was reused;
+the cpu fields are what the run cost the server's CPU (cpu.py).
+"""
+
+import json
+import socket
+import time
+
+
+class BenchControl:
+    """One control connection to a bench_server daemon."""
+
+    def __init__(self, host, ctrl_port, connect_timeout=30.0, run_timeout=60.0):
+        self.host = host
+        self.ctrl_port = ctrl_port
+        self.run_timeout = run_timeout
+        self.sock = self._connect(connect_timeout)
+        self.rfile = self.sock.makefile("r")
+
+    def _connect(self, timeout):
+        # The daemon opens its control port right after printing "listening",
+        # so retry for a little while.
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return socket.create_connection((self.host, self.ctrl_port), timeout=5)
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.2)
+
+    def _send(self, obj):
+        self.sock.sendall((json.dumps(obj) + "\n").encode())
+
+    def _recv(self, timeout):
+        self.sock.settimeout(timeout)
+        line = self.rfile.readline()
+        if not line:
+            raise RuntimeError("bench_server daemon closed the control connection")
+        reply = json.loads(line)
+        if reply.get("status") == "error":
+            raise RuntimeError(f"bench_server daemon: {reply.get('error')}")
+        return reply
+
+    def start_run(self, mode, msg, iters, recv_depth=None, qps=None, cycles=False):
+        """Ask for the next run; returns once the server is accepting."""
+        req = {"cmd": "run", "mode": mode, "msg": int(msg), "iters": int(iters)}
+        if recv_depth is not None:
+            req["recv_depth"] = int(recv_depth)
+        if qps is not None:
+            req["qps"] = int(qps)
+        if cycles:
+            req["cycles"] = 1
+        self._send(req)
+        return self._recv(self.run_timeout)
+
+    def wait_done(self):
+        """Wait for the "done" reply of the current run."""
+        return self._recv(self.run_timeout)
+
+    def close(self):
+        try:
+            self._send({"cmd": "quit"})
+        except OSError:
+            pass
+        self.rfile.close()
+        self.sock.close()
@@ -1,12 +1,18 @@
 #include <arpa/inet.h>
+#include <fcntl.h>
 #include <infiniband/verbs.h>
+#include <netdb.h> // for getnameinfo, to print IPv6 address
+#include <netinet/in.h>
 #include <rdma/rdma_cma.h>
+#include <stdarg.h>
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include <sys/socket.h>
 #include <time.h>
 #include <unistd.h>
-#include <netdb.h> // for getnameinfo, to print IPv6 address
+
+#include "bench_common.h"
 
 struct Info {
   uint64_t addr;
@@ -15,6 +21,26 @@ struct Info {
 
 enum Mode { MODE_READ, MODE_WRITE, MODE_SEND };
 
+struct Config {
+  enum Mode mode;
+  size_t msg;
+  uint64_t iters;
+  int recv_depth; // per QP
+  int json;       // print the result as JSON (--json)
+  int qps;        // connections of one run (client --qps)
+  int cycles;     // count CPU cycles (--cycles)
+};
+
+// Registered buffer. In daemon mode it is kept across runs and only
+// re-registered when a run does not fit.
+struct Buf {
+  struct ibv_pd *pd;
+  char *buf;
+  size_t len;
+  int access;
+  struct ibv_mr *mr;
+};
+
 static void die(const char *m) {
   perror(m);
   exit(1);
@@ -23,180 +49,495 @@ static void die(const char *m) {
 static void usage(const char *p) {
   fprintf(stderr,
           "Usage: %s <port> [--mode read|write|send] [--msg N] [--iters N] "
-          "[--recv-depth N]\n",
+          "[--recv-depth N] [--qps N] [--cycles] [--daemon] [--ctrl-port N] "
+          "[--json]\n",
           p);
 }
 
+static enum Mode parse_mode(const char *s) {
+  if (!strcmp(s, "send"))
+    return MODE_SEND;
+  if (!strcmp(s, "write"))
+    return MODE_WRITE;
+  return MODE_READ;
+}
+
+static const char *mode_str(enum Mode m) {
+  return m == MODE_READ ? "read" : (m == MODE_WRITE ? "write" : "send");
+}
+
+// PD on the device of the current connection; reused while the device
+// does not change.
+static struct ibv_pd *get_pd(struct Buf *b, struct ibv_context *verbs) {
+  if (b->pd && b->pd->context == verbs)
+    return b->pd;
+  if (b->mr) {
+    ibv_dereg_mr(b->mr);
+    b->mr = NULL;
+  }
+  if (b->pd)
+    ibv_dealloc_pd(b->pd);
+  b->pd = ibv_alloc_pd(verbs);
+  if (!b->pd)
+    die("alloc_pd");
+  return b->pd;
+}
+
+// Make sure b holds at least len bytes registered with access.
+// Returns 1 if the existing registration was reused.
+static int ensure_buf(struct Buf *b, size_t len, int access) {
+  if (b->mr && b->len >= len && (b->access & access) == access)
+    return 1;
+  if (b->mr)
+    ibv_dereg_mr(b->mr);
+  free(b->buf);
+  b->buf = NULL;
+  if (posix_memalign((void **)&b->buf, 4096, len))
+    die("alloc");
+  memset(b->buf, 0, len);
+  b->mr = ibv_reg_mr(b->pd, b->buf, len, access);
+  if (!b->mr)
+    die("reg_mr");
+  b->len = len;
+  b->access = access;
+  return 0;
+}
+
+static void free_buf(struct Buf *b) {
+  if (b->mr)
+    ibv_dereg_mr(b->mr);
+  free(b->buf);
+  if (b->pd)
+    ibv_dealloc_pd(b->pd);
+  memset(b, 0, sizeof(*b));
+}
+
+// Post receive slot `slot` of QP `qp`; each QP has recv_depth slots of its
+// own in the buffer, and wr_id = qp << 32 | slot.
+static void post_recv_slot(struct rdma_cm_id *id, const struct Config *c,
+                           char *buf, struct ibv_mr *mr, int qp, int slot) {
+  struct ibv_recv_wr *bad;
+  size_t off = ((size_t)qp * c->recv_depth + slot) * c->msg;
+  struct ibv_sge s = {.addr = (uintptr_t)(buf + off),
+                      .length = (uint32_t)c->msg,
+                      .lkey = mr->lkey};
+  struct ibv_recv_wr wr = {.wr_id = (uint64_t)qp << 32 | (uint64_t)slot,
+                           .sg_list = &s,
+                           .num_sge = 1};
+  if (ibv_post_recv(id->qp, &wr, &bad))
+    die("post_recv");
+}
+
+// Accept c->qps clients from the listening id and serve one run of c.
+// All QPs of the run share one CQ. In send mode the server-side rate is
+// stored in *mops / *bw. *cpu is what the run cost the server's CPU from
+// the connection until the last receive (send) or the client's disconnect
+// (read / write), in every mode.
+static int serve_one(struct rdma_event_channel *ec, const struct Config *c,
+                     struct Buf *b, int access, double *mops, double *bw,
+                     struct CpuUse *cpu) {
+  struct rdma_cm_event *e;
+  struct rdma_cm_id **ids = (struct rdma_cm_id **)calloc(c->qps, sizeof(*ids));
+  struct ibv_cq *cq = NULL;
+  size_t msg = c->msg;
+  size_t region = msg * c->recv_depth; // per QP
+  int reused = 0, accepted = 0, established = 0;
+  double sec = 0;
+  *mops = *bw = 0;
+  if (!ids)
+    die("alloc");
+
+  while (established < c->qps) {
+    if (rdma_get_cm_event(ec, &e))
+      die("get_event");
+    if (e->event == RDMA_CM_EVENT_ESTABLISHED) {
+      established++;
+      rdma_ack_cm_event(e);
+      continue;
+    }
+    // A daemon may still see events of the previous connection here.
+    if (e->event != RDMA_CM_EVENT_CONNECT_REQUEST || accepted == c->qps) {
+      rdma_ack_cm_event(e);
+      continue;
+    }
+    struct rdma_cm_id *id = e->id;
+    struct rdma_conn_param req = e->param.conn;
+    rdma_ack_cm_event(e);
+
+    struct ibv_pd *pd = get_pd(b, id->verbs);
+    if (!cq) {
+      cq = ibv_create_cq(id->verbs, c->qps * (c->recv_depth + 16), NULL, NULL,
+                         0);
+      if (!cq)
+        die("create_cq");
+      reused = ensure_buf(b, region * c->qps, access);
+    }
+    struct ibv_qp_init_attr qa = {0};
+    qa.qp_type = IBV_QPT_RC;
+    qa.send_cq = qa.recv_cq = cq;
+    qa.cap.max_send_wr = c->recv_depth + 16;
+    qa.cap.max_recv_wr = c->recv_depth + 16;
+    qa.cap.max_send_sge = qa.cap.max_recv_sge = 1;
+    qa.sq_sig_all = 0;
+    if (rdma_create_qp(id, pd, &qa))
+      die("create_qp");
+
+    // For SEND mode, pre-post recv WRs *before* we accept the connection,
+    // so the RQ is ready when the client starts sending.
+    if (c->mode == MODE_SEND)
+      for (int i = 0; i < c->recv_depth; ++i)
+        post_recv_slot(id, c, b->buf, b->mr, accepted, i);
+
+    struct Info info = {(uint64_t)(b->buf + region * accepted), b->mr->rkey,
+                        (uint32_t)msg};
+    struct rdma_conn_param p = {0};
+    p.private_data = &info;
+    p.private_data_len = sizeof(info);
+
+    // Take as many of the client's outstanding READs as the device can
+    // serve (max_dest_rd_atomic of the QP), and no more than it asked for
+    struct ibv_device_attr da;
+    if (ibv_query_device(id->verbs, &da))
+      die("query_device");
+    p.responder_resources = req.initiator_depth < da.max_qp_rd_atom
+                                ? req.initiator_depth
+                                : da.max_qp_rd_atom;
+    p.initiator_depth = req.responder_resources < da.max_qp_init_rd_atom
+                            ? req.responder_resources
+                            : da.max_qp_init_rd_atom;
+
+    if (rdma_accept(id, &p))
+      die("accept");
+    ids[accepted++] = id;
+  }
+
+  uint64_t received = c->iters;
+  struct CpuMark cm;
+  cpu_start(&cm, c->cycles);
+  if (c->mode == MODE_SEND) {
+    uint64_t iters = c->iters; // over all QPs
+    uint64_t done = 0, idle = 0;
+    int disconnected = 0;
+    struct ibv_wc wc[32];
+    struct timespec ts0, ts1;
+    // A client stopped early (SIGUSR1) sends fewer than iters and then
+    // disconnects; look for that on the CM channel while the CQ is idle.
+    int flags = fcntl(ec->fd, F_GETFL);
+    fcntl(ec->fd, F_SETFL, flags | O_NONBLOCK);
+    clock_gettime(CLOCK_MONOTONIC, &ts0);
+    while (done < iters && disconnected < c->qps) {
+      int n = ibv_poll_cq(cq, 32, wc);
+      if (n < 0)
+        die("poll_cq");
+      if (n == 0 && ++idle % 4096 == 0 && !rdma_get_cm_event(ec, &e)) {
+        if (e->event == RDMA_CM_EVENT_DISCONNECTED)
+          disconnected++;
+        rdma_ack_cm_event(e);
+      }
+      for (int i = 0; i < n; ++i) {
+        // Receives still posted are flushed once the client is gone
+        if (disconnected && wc[i].status == IBV_WC_WR_FLUSH_ERR)
+          continue;
+        if (wc[i].status)
+          die("wc");
+        done++;
+        if (disconnected)
+          continue; // the client has finished, no more receives needed
+        int qp = (int)(wc[i].wr_id >> 32);
+        post_recv_slot(ids[qp], c, b->buf, b->mr, qp,
+                       (int)(wc[i].wr_id & 0xffffffff));
+      }
+    }
+    fcntl(ec->fd, F_SETFL, flags);
+    clock_gettime(CLOCK_MONOTONIC, &ts1);
+    received = done;
+    sec = (ts1.tv_sec - ts0.tv_sec) + (ts1.tv_nsec - ts0.tv_nsec) / 1e9;
+    *mops = done / sec / 1e6;
+    *bw = (done * msg) / sec / (1024.0 * 1024.0 * 1024.0);
+    if (!c->json)
+      printf("[server] recv done: %.2f Mops, %.2f GiB/s\n", *mops, *bw);
+  } else {
+    printf("[server] ready for client RDMA %s, waiting for disconnect...\n",
+           c->mode == MODE_READ ? "READ" : "WRITE");
+    for (int disconnected = 0; disconnected < c->qps;) {
+      if (rdma_get_cm_event(ec, &e))
+        die("wait_disconnect");
+      if (e->event == RDMA_CM_EVENT_DISCONNECTED)
+        disconnected++;
+      else
+        fprintf(stderr, "unexpected event %d\n", e->event);
+      rdma_ack_cm_event(e);
+    }
+  }
+  *cpu = cpu_stop(&cm);
+  if (!c->json)
+    cpu_print("server", cpu);
+
+  if (c->json) {
+    json_begin("server");
+    json_put_str("mode", mode_str(c->mode));
+    json_put_u64("msg", msg);
+    json_put_u64("iters", received);
+    json_put_bool("reused", reused);
+    if (c->qps > 1)
+      json_put_int("qps", c->qps);
+    if (c->mode == MODE_SEND) {
+      json_put_int("recv_depth", c->recv_depth);
+      json_put_f64("sec", sec);
+      json_put_f64("mops", *mops);
+      json_put_f64("gib", *bw);
+    }
+    cpu_json(cpu);
+    json_end();
+  }
+
+  for (int q = 0; q < c->qps; ++q) {
+    rdma_disconnect(ids[q]);
+    rdma_destroy_qp(ids[q]);
+    rdma_destroy_id(ids[q]);
+  }
+  ibv_destroy_cq(cq);
+  free(ids);
+  return reused;
+}
+
+// ---- daemon control channel: one JSON object per line over TCP ----
+
+// Minimal lookup in a flat JSON object: returns the text after "key":
+static const char *json_value(const char *s, const char *key) {
+  char pat[64];
+  snprintf(pat, sizeof(pat), "\"%s\"", key);
+  const char *p = strstr(s, pat);
+  if (!p)
+    return NULL;
+  p += strlen(pat);
+  while (*p == ' ')
+    p++;
+  if (*p++ != ':')
+    return NULL;
+  while (*p == ' ')
+    p++;
+  return p;
+}
+
+static int json_u64(const char *s, const char *key, uint64_t *out) {
+  const char *p = json_value(s, key);
+  if (!p || *p < '0' || *p > '9')
+    return 0;
+  *out = strtoull(p, NULL, 10);
+  return 1;
+}
+
+static int json_str(const char *s, const char *key, char *out, size_t n) {
+  const char *p = json_value(s, key);
+  if (!p || *p != '"')
+    return 0;
+  size_t i = 0;
+  for (p++; *p && *p != '"' && i + 1 < n; p++)
+    out[i++] = *p;
+  out[i] = 0;
+  return 1;
+}
+
+static int read_line(int fd, char *buf, size_t n) {
+  size_t len = 0;
+  while (len + 1 < n) {
+    char ch;
+    ssize_t r = read(fd, &ch, 1);
+    if (r <= 0)
+      return -1;
+    if (ch == '\n')
+      break;
+    buf[len++] = ch;
+  }
+  buf[len] = 0;
+  return (int)len;
+}
+
+static void reply(int fd, const char *fmt, ...) {
+  char out[512];
+  va_list ap;
+  va_start(ap, fmt);
+  int len = vsnprintf(out, sizeof(out), fmt, ap);
+  va_end(ap);
+  if (write(fd, out, len) != len)
+    die("ctrl write");
+}
+
+static int ctrl_accept(int ctrl_port) {
+  // Control port listens on all addresses (v4-mapped included).
+  int lfd = socket(AF_INET6, SOCK_STREAM, 0);
+  if (lfd < 0)
+    die("ctrl socket");
+  int one = 1, zero = 0;
+  setsockopt(lfd, SOL_SOCKET, SO_REUSEADDR, &one, sizeof(one));
+  setsockopt(lfd, IPPROTO_IPV6, IPV6_V6ONLY, &zero, sizeof(zero));
+  struct sockaddr_in6 a = {0};
+  a.sin6_family = AF_INET6;
+  a.sin6_port = htons(ctrl_port);
+  a.sin6_addr = in6addr_any;
+  if (bind(lfd, (struct sockaddr *)&a, sizeof(a)))
+    die("ctrl bind");
+  if (listen(lfd, 1))
+    die("ctrl listen");
+  int fd = accept(lfd, NULL, NULL);
+  if (fd < 0)
+    die("ctrl accept");
+  close(lfd);
+  return fd;
+}
+
+// Serve runs until the controller sends {"cmd":"quit"} or disconnects.
+// Requests: {"cmd":"run","mode":"send","msg":N,"iters":N,"recv_depth":N,
+//            "qps":N,"cycles":1}
+// Replies:  {"status":"listening",...} once ready for the client, then
+//           {"status":"done",...} when the run is over, with its CPU use.
+static void run_daemon(struct rdma_event_channel *ec, int port, int ctrl_port,
+                       struct Buf *b, int json) {
+  int fd = ctrl_accept(ctrl_port);
+  char line[512];
+  int access =
+      IBV_ACCESS_LOCAL_WRITE | IBV_ACCESS_REMOTE_READ | IBV_ACCESS_REMOTE_WRITE;
+  printf("[server] controller connected\n");
+
+  while (read_line(fd, line, sizeof(line)) >= 0) {
+    char cmd[16] = "run", m[16];
+    json_str(line, "cmd", cmd, sizeof(cmd));
+    if (!strcmp(cmd, "quit"))
+      break;
+    if (strcmp(cmd, "run")) {
+      reply(fd, "{\"status\":\"error\",\"error\":\"unknown cmd %s\"}\n", cmd);
+      continue;
+    }
+
+    struct Config c = {MODE_READ, 4096, 100000, 128, json, 1, 0};
+    uint64_t v;
+    if (json_str(line, "mode", m, sizeof(m)))
+      c.mode = parse_mode(m);
+    if (json_u64(line, "msg", &v))
+      c.msg = v;
+    if (json_u64(line, "iters", &v))
+      c.iters = v;
+    if (json_u64(line, "recv_depth", &v))
+      c.recv_depth = (int)v;
+    if (json_u64(line, "qps", &v) && v > 0)
+      c.qps = (int)v;
+    if (json_u64(line, "cycles", &v))
+      c.cycles = v != 0;
+
+    printf("[server] run: mode=%s msg=%zu iters=%lu recv_depth=%d qps=%d\n",
+           mode_str(c.mode), c.msg, (unsigned long)c.iters, c.recv_depth,
+           c.qps);
+    reply(fd, "{\"status\":\"listening\",\"port\":%d}\n", port);
+
+    double mops, bw;
+    struct CpuUse cpu;
+    int reused = serve_one(ec, &c, b, access, &mops, &bw, &cpu);
+    char cyc[40] = "";
+    if (cpu.cycles >= 0)
+      snprintf(cyc, sizeof(cyc), ",\"cycles\":%lld", (long long)cpu.cycles);
+    reply(fd,
+          "{\"status\":\"done\",\"mode\":\"%s\",\"msg\":%zu,\"iters\":%lu,"
+          "\"reused\":%s,\"mops\":%.2f,\"gib\":%.2f,\"cpu_user_s\":%.6g,"
+          "\"cpu_sys_s\":%.6g,\"host_cpu_s\":%.6g%s}\n",
+          mode_str(c.mode), c.msg, (unsigned long)c.iters,
+          reused ? "true" : "false", mops, bw, cpu.user_s, cpu.sys_s,
+          cpu.host_s, cyc);
+  }
+  close(fd);
+}
+
 int main(int argc, char **argv) {
+  // Line-buffer stdout so a launcher reading through a pipe sees
+  // "[server] listening on" as soon as it is printed.
+  setvbuf(stdout, NULL, _IOLBF, 0);
+
   if (argc < 2) {
     usage(argv[0]);
     return 1;
   }
 
-  enum Mode mode = MODE_READ;
-  size_t msg = 4096;
-  uint64_t iters = 100000;
-  int recv_depth = 128;
+  struct Config c = {MODE_READ, 4096, 100000, 128, 0, 1, 0};
   int port = atoi(argv[1]);
+  int daemon_mode = 0;
+  int ctrl_port = port + 1;
 
   for (int i = 2; i < argc; ++i) {
     if (!strcmp(argv[i], "--mode") && i + 1 < argc) {
-      if (!strcmp(argv[i + 1], "send"))
-        mode = MODE_SEND;
-      else if (!strcmp(argv[i + 1], "write"))
-        mode = MODE_WRITE;
-      else
-        mode = MODE_READ;
-      i++;
+      c.mode = parse_mode(argv[++i]);
     } else if (!strcmp(argv[i], "--msg") && i + 1 < argc) {
-      msg = strtoull(argv[++i], NULL, 0);
+      c.msg = strtoull(argv[++i], NULL, 0);
     } else if (!strcmp(argv[i], "--iters") && i + 1 < argc) {
-      iters = strtoull(argv[++i], NULL, 0);
+      c.iters = strtoull(argv[++i], NULL, 0);
     } else if (!strcmp(argv[i], "--recv-depth") && i + 1 < argc) {
-      recv_depth = atoi(argv[++i]);
+      c.recv_depth = atoi(argv[++i]);
+    } else if (!strcmp(argv[i], "--qps") && i + 1 < argc) {
+      c.qps = atoi(argv[++i]);
+      if (c.qps < 1) {
+        usage(argv[0]);
+        return 1;
+      }
+    } else if (!strcmp(argv[i], "--cycles")) {
+      c.cycles = 1;
+    } else if (!strcmp(argv[i], "--daemon")) {
+      daemon_mode = 1;
+    } else if (!strcmp(argv[i], "--ctrl-port") && i + 1 < argc) {
+      ctrl_port = atoi(argv[++i]);
+    } else if (!strcmp(argv[i], "--json")) {
+      c.json = 1;
     } else {
       usage(argv[0]);
       return 1;
     }
   }
 
-  const char *broadcom_ip_str = "fd93:16d3:59b6:12e:7ec2:55ff:febd:dc76"; 
-  
+  const char *broadcom_ip_str = "fd93:16d3:59b6:12e:7ec2:55ff:febd:dc76";
+
   struct rdma_event_channel *ec = rdma_create_event_channel();
-  struct rdma_cm_id *lid, *id;
-  struct rdma_cm_event *e;
-  
+  struct rdma_cm_id *lid;
+
   struct sockaddr_in6 a = {0};
   a.sin6_family = AF_INET6;
   a.sin6_port = htons(port);
 
- 
   if (inet_pton(AF_INET6, broadcom_ip_str, &a.sin6_addr) <= 0)
     die("inet_pton failed to set broadcom IPv6 address");
 
   if (rdma_create_id(ec, &lid, NULL, RDMA_PS_TCP))
     die("create_id");
-  
+
   if (rdma_bind_addr(lid, (struct sockaddr *)&a))
     die("bind");
-  if (rdma_listen(lid, 1))
+  // Backlog for clients that connect several QPs (--qps)
+  if (rdma_listen(lid, 16))
     die("listen");
-  
+
   char host_str[NI_MAXHOST];
-  if (getnameinfo((struct sockaddr *)&a, sizeof(a), 
-                  host_str, sizeof(host_str), 
+  if (getnameinfo((struct sockaddr *)&a, sizeof(a),
+                  host_str, sizeof(host_str),
                   NULL, 0, NI_NUMERICHOST) != 0) {
       strcpy(host_str, broadcom_ip_str);
   }
-  
-  printf("[server] listening on [%s]:%d (mode=%s msg=%zu iters=%lu)\n", 
-         host_str, port,
-         mode == MODE_READ ? "read" : (mode == MODE_WRITE ? "write" : "send"),
-         msg, (unsigned long)iters);
-
-  if (rdma_get_cm_event(ec, &e))
-    die("get_event");
-  id = e->id;
-  rdma_ack_cm_event(e);
-
-  struct ibv_qp_init_attr qa = {0};
-  qa.qp_type = IBV_QPT_RC;
-  qa.cap.max_send_wr = recv_depth + 16;
-  qa.cap.max_recv_wr = recv_depth + 16;
-  qa.cap.max_send_sge = qa.cap.max_recv_sge = 1;
-  qa.sq_sig_all = 0;
-  if (rdma_create_qp(id, id->pd, &qa)) 
-    die("create_qp");
-
-  size_t buf_len = msg * recv_depth;
-  char *buf = NULL;
-  if (posix_memalign((void **)&buf, 4096, buf_len))
-    die("alloc");
-  memset(buf, 0, buf_len);
-
-  int access = IBV_ACCESS_LOCAL_WRITE;
-  if (mode == MODE_READ)
-    access |= IBV_ACCESS_REMOTE_READ;
-  if (mode == MODE_WRITE)
-    access |= IBV_ACCESS_REMOTE_WRITE;
-  struct ibv_mr *mr = ibv_reg_mr(id->pd, buf, buf_len, access);
-  if (!mr)
-    die("reg_mr");
-  // For SEND mode, pre-post recv WRs *before* we accept the connection,
-  // so the RQ is ready when the client starts sending.
-  if (mode == MODE_SEND) {
-    struct ibv_recv_wr *bad;
-    for (int i = 0; i < recv_depth; ++i) {
-      struct ibv_sge s = {.addr = (uintptr_t)(buf + (size_t)i * msg),
-                          .length = (uint32_t)msg,
-                          .lkey = mr->lkey};
-      struct ibv_recv_wr wr = {
-          .wr_id = (uint64_t)i, .sg_list = &s, .num_sge = 1};
-      if (ibv_post_recv(id->qp, &wr, &bad))
-        die("post_recv");
-    }
-  }
-
-  struct Info info = {(uint64_t)buf, mr->rkey, (uint32_t)msg};
-  struct rdma_conn_param p = {0};
-  p.private_data = &info;
-  p.private_data_len = sizeof(info);
-
-  p.responder_resources = 16;
-  p.initiator_depth = 16;
-
-  if (rdma_accept(id, &p))
-    die("accept");
 
-  if (rdma_get_cm_event(ec, &e))
-    die("event2");
-  rdma_ack_cm_event(e);
-
-  if (mode == MODE_SEND) {
-    struct ibv_recv_wr *bad; 
-
-    uint64_t done = 0;
-    struct ibv_wc wc[32];
-    struct timespec ts0, ts1;
-    clock_gettime(CLOCK_MONOTONIC, &ts0);
-    while (done < iters) {
-      int n = ibv_poll_cq(id->recv_cq, 32, wc);
-      if (n < 0)
-        die("poll_cq");
-      for (int i = 0; i < n; ++i) {
-        if (wc[i].status)
-          die("wc");
-        done++;
-        int slot = (int)wc[i].wr_id;
-        struct ibv_sge s = {.addr = (uintptr_t)(buf + (size_t)slot * msg),
-                            .length = (uint32_t)msg,
-                            .lkey = mr->lkey};
-        struct ibv_recv_wr wr = {
-            .wr_id = (uint64_t)slot, .sg_list = &s, .num_sge = 1};
-        if (ibv_post_recv(id->qp, &wr, &bad))
-          die("repost_recv");
-      }
-    }
-    clock_gettime(CLOCK_MONOTONIC, &ts1);
-    double sec = (ts1.tv_sec - ts0.tv_sec) + (ts1.tv_nsec - ts0.tv_nsec) / 1e9;
-    double mops = iters / sec / 1e6;
-    double bw = (iters * msg) / sec / (1024.0 * 1024.0 * 1024.0);
-    printf("[server] recv done: %.2f Mops, %.2f GiB/s\n", mops, bw);
+  struct Buf b = {0};
+  if (daemon_mode) {
+    printf("[server] listening on [%s]:%d (daemon, control port %d)\n",
+           host_str, port, ctrl_port);
+    run_daemon(ec, port, ctrl_port, &b, c.json);
   } else {
-    printf("[server] ready for client RDMA %s, waiting for disconnect...\n",
-           mode == MODE_READ ? "READ" : "WRITE");
-    if (rdma_get_cm_event(ec, &e))
-      die("wait_disconnect");
-    if (e->event != RDMA_CM_EVENT_DISCONNECTED)
-      fprintf(stderr, "unexpected event %d\n", e->event);
-    rdma_ack_cm_event(e);
+    printf("[server] listening on [%s]:%d (mode=%s msg=%zu iters=%lu)\n",
+           host_str, port, mode_str(c.mode), c.msg, (unsigned long)c.iters);
+    int access = IBV_ACCESS_LOCAL_WRITE;
+    if (c.mode == MODE_READ)
+      access |= IBV_ACCESS_REMOTE_READ;
+    if (c.mode == MODE_WRITE)
+      access |= IBV_ACCESS_REMOTE_WRITE;
+    double mops, bw;
+    struct CpuUse cpu;
+    serve_one(ec, &c, &b, access, &mops, &bw, &cpu);
   }
 
-  rdma_disconnect(id);
-  ibv_dereg_mr(mr);
-  free(buf);
-  rdma_destroy_qp(id);
-  rdma_destroy_id(id);
+  free_buf(&b);
   rdma_destroy_id(lid);
   rdma_destroy_event_channel(ec);
   return 0;
@@ -9,6 +9,8 @@
 #include <time.h>
 #include <unistd.h>
 
+#include "bench_common.h"
+
 struct Info {
   uint64_t addr;
   uint32_t rkey, len;
@@ -34,11 +36,15 @@ static void die(const char *m) {
 static void usage(const char *p) {
   fprintf(stderr,
           "Usage: %s <port> [--mode read|write|send] [--msg N] [--iters N] "
-          "[--recv-depth N] [--gpu N]\n",
+          "[--recv-depth N] [--gpu N] [--json]\n",
           p);
 }
 
 int main(int argc, char **argv) {
+  // Line-buffer stdout so a launcher reading through a pipe sees
+  // "[server] listening on" as soon as it is printed.
+  setvbuf(stdout, NULL, _IOLBF, 0);
+
   if (argc < 2) {
     usage(argv[0]);
     return 1;
@@ -50,6 +56,7 @@ int main(int argc, char **argv) {
   int recv_depth = 128;
   int port = atoi(argv[1]);
   int gpu = 0;
+  int json = 0;
 
   for (int i = 2; i < argc; ++i) {
     if (!strcmp(argv[i], "--mode") && i + 1 < argc) {
@@ -68,6 +75,8 @@ int main(int argc, char **argv) {
       recv_depth = atoi(argv[++i]);
     } else if (!strcmp(argv[i], "--gpu") && i + 1 < argc) {
       gpu = atoi(argv[++i]);
+    } else if (!strcmp(argv[i], "--json")) {
+      json = 1;
     } else {
       usage(argv[0]);
       return 1;
@@ -148,6 +157,7 @@ int main(int argc, char **argv) {
     die("event2");
   rdma_ack_cm_event(e);
 
+  double sec = 0, mops = 0, bw = 0;
   if (mode == MODE_SEND) {
     struct ibv_recv_wr *bad;
     uint64_t done = 0;
@@ -174,11 +184,11 @@ int main(int argc, char **argv) {
       }
     }
     clock_gettime(CLOCK_MONOTONIC, &ts1);
-    double sec =
-        (ts1.tv_sec - ts0.tv_sec) + (ts1.tv_nsec - ts0.tv_nsec) / 1e9;
-    double mops = iters / sec / 1e6;
-    double bw = (iters * msg) / sec / (1024.0 * 1024.0 * 1024.0);
-    printf("[server] GPU recv done: %.2f Mops, %.2f GiB/s\n", mops, bw);
+    sec = (ts1.tv_sec - ts0.tv_sec) + (ts1.tv_nsec - ts0.tv_nsec) / 1e9;
+    mops = iters / sec / 1e6;
+    bw = (iters * msg) / sec / (1024.0 * 1024.0 * 1024.0);
+    if (!json)
+      printf("[server] GPU recv done: %.2f Mops, %.2f GiB/s\n", mops, bw);
   } else {
     printf("[server] GPU buffer ready for client RDMA %s, waiting for "
            "disconnect...\n",
@@ -190,6 +200,23 @@ int main(int argc, char **argv) {
     rdma_ack_cm_event(e);
   }
 
+  if (json) {
+    json_begin("server");
+    json_put_str("mode", mode == MODE_READ
+                             ? "read"
+                             : (mode == MODE_WRITE ? "write" : "send"));
+    json_put_u64("msg", msg);
+    json_put_u64("iters", iters);
+    json_put_int("gpu", gpu);
+    if (mode == MODE_SEND) {
+      json_put_int("recv_depth", recv_depth);
+      json_put_f64("sec", sec);
+      json_put_f64("mops", mops);
+      json_put_f64("gib", bw);
+    }
+    json_end();
+  }
+
   rdma_disconnect(id);
   ibv_dereg_mr(mr);
   HIP_CHECK(hipFree(buf));
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Point-level checkpointing so an interrupted sweep can be resumed.
+
+Every finished run is appended (and fsync'ed) to a journal next to the
+result CSV, `<result_csv>.runs.jsonl`. As soon as all runs of a point are
+in, the point's row is committed to the CSV. The journal is removed once
+the sweep completes.
+
+Rows carry a fingerprint of what was measured: hashes of the client and
+server binaries, the client host, the server address, the GPU and the
+point's configuration. `sweep.py ... run --resume` skips points whose
+fingerprint is already in the CSV and reuses journaled runs of points
+that were not finished, so a sweep restarts where it stopped. Changing a
+binary or the spec changes the fingerprint, and those points run again.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import socket
+import threading
+from pathlib import Path
+
+_digests = {}
+
+
+def file_digest(path):
+    """sha256 of a local binary; binaries only present remotely hash by path."""
+    if path not in _digests:
+        h = hashlib.sha256()
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        except OSError:
+            h.update(f"path:{path}".encode())
+        _digests[path] = h.hexdigest()
+    return _digests[path]
+
+
+def fingerprint(spec, point):
+    """Short hash identifying what one point measures on this setup."""
+    ident = {
+        "client": file_digest(spec["client"]),
+        "server": file_digest(spec["server"]),
+        "client_host": socket.gethostname(),
+        "server_ip": spec["server_ip"],
+        "server_host": spec["server_host"],
+        "gpu": spec["gpu"],
+        **{k: point[k] for k in ("experiment", "mode", "msg", "window", "iters")},
+        "recv_depth": point["recv_depth"],
+        "adaptive": point["adaptive"],
+        "repeats": point["repeats"],
+        "retry": point["retry"],
+        "latency": point["latency"],
+    }
+    # Only when set, so points of older CSVs keep their fingerprint
+    for key, default in (
+        ("qps", 1),
+        ("threads", 1),
+        ("shared_cq", False),
+        ("batch", 1),
+        ("signal", 1),
+        ("inline", False),
+        ("sge", 1),
+        ("numa", "none"),
+        ("steady", None),
+        ("cycles", False),
+    ):
+        if point.get(key, default) != default:
+            ident[key] = point[key]
+    blob = json.dumps(ident, sort_keys=True).encode()
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+def committed(result_csv):
+    """Rows of the points already in the result CSV, by fingerprint."""
+    try:
+        with open(result_csv, newline="") as f:
+            return {
+                r["fingerprint"]: r for r in csv.DictReader(f) if r.get("fingerprint")
+            }
+    except FileNotFoundError:
+        return {}
+
+
+def _read_journal(path):
+    runs = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn last line after a crash
+                runs[(rec["fingerprint"], rec["repeat"])] = rec["row"]
+    except FileNotFoundError:
+        pass
+    return runs
+
+
+def _fsync_dir(path):
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(path, os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def write_atomic(path, data):
+    """Replace `path` with `data` so a crash leaves either old or new file."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", newline="") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    tmp.replace(path)
+    _fsync_dir(path.parent)
+
+
+class Checkpoint:
+    """Journal runs and commit each point's row once all its runs are in.
+
+    commit(row) writes one finished point to the CSV; aggregate(rows)
+    folds the runs of one point into that row. record() may be called
+    from several scheduler threads.
+    """
+
+    def __init__(self, result_csv, points, commit, aggregate, resume=False):
+        self.journal = Path(str(result_csv) + ".runs.jsonl")
+        self.points = points
+        self.commit = commit
+        self.aggregate = aggregate
+        self.lock = threading.Lock()
+        self.done = set()
+        self.runs = _read_journal(self.journal) if resume else {}
+        if not resume and self.journal.exists():
+            print(f"Discarding unfinished runs in {self.journal} (no --resume)")
+            self.journal.unlink()
+
+    def cached(self, run):
+        """Row of a run journaled before an interruption, or None."""
+        return self.runs.get((run["fingerprint"], run["repeat"]))
+
+    def record(self, run, row):
+        with self.lock:
+            key = (run["fingerprint"], run["repeat"])
+            if key not in self.runs:
+                with open(self.journal, "a") as f:
+                    rec = {"fingerprint": key[0], "repeat": key[1], "row": row}
+                    f.write(json.dumps(rec) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.runs[key] = row
+            point = self.points[run["index"]]
+            if point["fingerprint"] in self.done:
+                return None
+            rows = [
+                self.runs.get((point["fingerprint"], r))
+                for r in range(point["repeats"])
+            ]
+            if all(r is not None for r in rows):
+                result = self.aggregate(rows)
+                result["fingerprint"] = point["fingerprint"]
+                self.commit(result)
+                self.done.add(point["fingerprint"])
+                return result
+        return None
+
+    def finish(self):
+        self.journal.unlink(missing_ok=True)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""Compare a new result set against a baseline and flag regressions.
+
+A result set is a CSV written by sweep.py, or a query on the Parquet store
+(store.py) given as comma-separated column=value filters:
+
+    python3 compare.py rdma_msg_sweep.csv rdma_msg_sweep_test_broadcom.csv
+    python3 compare.py nic=mellanox,memory=host nic=broadcom,memory=host --threshold 10
+
+Points are lined up by (experiment, mode, msg, window, iters) and the
+client options (qps, threads, batch, signal, inline, sge, numa); rows
+missing one of the first five are skipped and counted. For each metric
+(Mops, GiB/s) a point regresses when the new value is more than
+--threshold percent below the baseline and, if both sides carry repeats
+(n_ok > 1 and a stddev, or several rows for the point), the drop is
+significant at 95% (Welch's t test). Without repeats the threshold alone
+decides. The exit code is 1 if any point regressed, so an upgrade can be
+gated on it.
+"""
+
+import argparse
+import csv
+import math
+import statistics
+import sys
+from pathlib import Path
+
+import repeats
+import store
+
+KEY = (
+    "experiment",
+    "mode",
+    "msg",
+    "window",
+    "iters",
+    "qps",
+    "threads",
+    "batch",
+    "signal",
+    "inline",
+    "sge",
+    "numa",
+)
+# Part of KEY a row must have to be lined up; the options default
+REQUIRED = KEY[:5]
+METRICS = {"mops": "Mops", "gib": "GiB/s"}
+
+
+def _num(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def load_set(ref, store_dir=store.DEFAULT_STORE):
+    """Rows of a result set: a CSV path, or store filters "k=v,k=v"."""
+    if Path(ref).exists() or "=" not in ref:
+        with open(ref, newline="") as f:
+            return [
+                r
+                for r in csv.DictReader(f)
+                if r.get("mode") in ("read", "write", "send")
+            ]
+    filters = {}
+    for item in ref.split(","):
+        key, _, value = item.partition("=")
+        filters[key.strip()] = store.parse_value(value.strip())
+    df = store.load_results(store_dir, **filters)
+    return df.to_dict("records")
+
+
+def sample(rows, metric):
+    """(mean, std, n) of one point; std is NaN when there is no spread."""
+    rows = [r for r in rows if not math.isnan(_num(r.get(metric)))]
+    if not rows:
+        return math.nan, math.nan, 0
+    if len(rows) == 1:
+        r = rows[0]
+        n = _num(r.get("n_ok"))
+        std = _num(r.get(f"{metric}_std"))
+        if n > 1 and not math.isnan(std):
+            return _num(r[metric]), std, int(n)
+        return _num(r[metric]), math.nan, 1
+    # Several rows of the same point (e.g. re-runs in the store): use them as samples
+    vals = [_num(r[metric]) for r in rows]
+    return statistics.mean(vals), statistics.stdev(vals), len(vals)
+
+
+def welch(a, b):
+    """Is the difference of two (mean, std, n) samples significant at 95%?
+
+    None when either side has no spread to test with.
+    """
+    (m1, s1, n1), (m2, s2, n2) = a, b
+    if n1 < 2 or n2 < 2 or math.isnan(s1) or math.isnan(s2):
+        return None
+    v1, v2 = s1 * s1 / n1, s2 * s2 / n2
+    if v1 + v2 == 0:
+        return m1 != m2
+    df = (v1 + v2) ** 2 / (v1 * v1 / (n1 - 1) + v2 * v2 / (n2 - 1))
+    return abs(m2 - m1) > repeats.t95(max(1, round(df))) * math.sqrt(v1 + v2)
+
+
+def _option(key, v):
+    """A client option of a row; rows from before its column ran without
+    it (1, False for inline, "none" for numa).
+    """
+    if key == "numa":
+        return v if isinstance(v, str) and v else "none"
+    if key == "inline":
+        return str(v).lower() in ("true", "1", "1.0")
+    v = _num(v)
+    return 1 if math.isnan(v) else int(v)
+
+
+def _required(key, v):
+    """A REQUIRED field of a row; None if it is missing."""
+    if key in ("experiment", "mode"):
+        return v if isinstance(v, str) and v else None
+    v = _num(v)
+    return None if math.isnan(v) else int(v)
+
+
+def group(rows):
+    """{KEY: rows of that point}, and the number of rows skipped for a
+    missing REQUIRED field.
+    """
+    out = {}
+    skipped = 0
+    for r in rows:
+        key = tuple(_required(k, r.get(k)) for k in REQUIRED)
+        if None in key:
+            skipped += 1
+            continue
+        key += tuple(_option(k, r.get(k)) for k in KEY[len(REQUIRED) :])
+        out.setdefault(key, []).append(r)
+    return out, skipped
+
+
+def compare(base_rows, new_rows, threshold=5.0, metrics=tuple(METRICS)):
+    """One result dict per (point, metric) present in both sets, the
+    points only in base, those only in new, and the number of rows
+    skipped for a missing REQUIRED field.
+    """
+    (base, base_skipped), (new, new_skipped) = group(base_rows), group(new_rows)
+    out = []
+    for key in sorted(base.keys() & new.keys()):
+        for metric in metrics:
+            a, b = sample(base[key], metric), sample(new[key], metric)
+            if math.isnan(a[0]) or math.isnan(b[0]) or a[0] == 0:
+                continue
+            change = (b[0] - a[0]) / a[0] * 100
+            sig = welch(a, b)
+            if change < -threshold and sig is not False:
+                verdict = "REGRESSION"
+            elif change > threshold and sig is not False:
+                verdict = "improved"
+            else:
+                verdict = "ok"
+            out.append(
+                {
+                    **dict(zip(KEY, key)),
+                    "metric": metric,
+                    "base": a[0],
+                    "new": b[0],
+                    "change": change,
+                    "significant": sig,
+                    "verdict": verdict,
+                }
+            )
+    only_base = sorted(base.keys() - new.keys())
+    only_new = sorted(new.keys() - base.keys())
+    return out, only_base, only_new, base_skipped + new_skipped
+
+
+def print_table(results):
+    head = f"{'experiment':<16}{'mode':<6}{'msg':>9}{'window':>8}{'iters':>9}"
+    head += f"{'qps':>5}{'thr':>5}{'bat':>5}{'sgnl':>5}{'inl':>5}"
+    head += f"{'sge':>5}{'numa':>7}  "
+    head += f"{'metric':<6}{'base':>10}{'new':>10}"
+    print(head + f"{'change':>9}  {'sig':<4} verdict")
+    for r in results:
+        sig = {True: "yes", False: "no", None: "-"}[r["significant"]]
+        print(
+            f"{r['experiment']:<16}{r['mode']:<6}{r['msg']:>9}{r['window']:>8}"
+            f"{r['iters']:>9}{r['qps']:>5}{r['threads']:>5}"
+            f"{r['batch']:>5}{r['signal']:>5}{'yes' if r['inline'] else 'no':>5}"
+            f"{r['sge']:>5}{r['numa']:>7}  {METRICS[r['metric']]:<6}"
+            f"{r['base']:>10.3f}{r['new']:>10.3f}{r['change']:>+8.1f}%  {sig:<4} "
+            f"{r['verdict']}"
+        )
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("base", help="baseline: CSV, or store filters k=v,k=v")
+    ap.add_argument("new", help="new results: CSV, or store filters k=v,k=v")
+    ap.add_argument(
+        "--threshold",
+        type=float,
+        default=5.0,
+        help="percent drop that counts as a regression (default 5)",
+    )
+    ap.add_argument("--metric", choices=list(METRICS), action="append")
+    ap.add_argument("--mode", action="append", help="only these modes")
+    ap.add_argument("--store", default=store.DEFAULT_STORE)
+    ap.add_argument("--all", action="store_true", help="also list unchanged points")
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    base = load_set(args.base, args.store)
+    new = load_set(args.new, args.store)
+    if args.mode:
+        base = [r for r in base if r["mode"] in args.mode]
+        new = [r for r in new if r["mode"] in args.mode]
+    results, only_base, only_new, skipped = compare(
+        base, new, args.threshold, args.metric or tuple(METRICS)
+    )
+    if skipped:
+        print(f"Skipped {skipped} rows without {', '.join(REQUIRED)}")
+    if not results:
+        print("No points in common.")
+        return 2
+    shown = results if args.all else [r for r in results if r["verdict"] != "ok"]
+    if shown:
+        print_table(shown)
+    counts = {
+        v: sum(r["verdict"] == v for r in results)
+        for v in ("REGRESSION", "improved", "ok")
+    }
+    points = len({tuple(r[k] for k in KEY) for r in results})
+    print(
+        f"\n{points} points compared (threshold {args.threshold:g}%), per metric: "
+        f"{counts['REGRESSION']} regressions, {counts['improved']} improvements, "
+        f"{counts['ok']} unchanged"
+    )
+    if only_base or only_new:
+        print(f"Only in base: {len(only_base)} points, only in new: {len(only_new)}")
+    return 1 if counts["REGRESSION"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
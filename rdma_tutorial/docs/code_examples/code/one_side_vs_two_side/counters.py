@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""RNIC port counters around every client run.
+
+A point that comes out low says nothing about why: retransmissions,
+out-of-sequence packets, RNR NAKs, link-level pauses. With
+`counters = true` in an experiment the driver snapshots
+
+    <sysfs>/class/infiniband/<dev>/ports/<port>/counters/*
+    <sysfs>/class/infiniband/<dev>/ports/<port>/hw_counters/*
+
+right before and after each client run, on the client (`ib_dev`) and on
+the server (`server_ib_dev`, read through its launcher like numa.py),
+and stores what changed in the `client_counters` / `server_counters`
+columns as "name=delta;name=delta" (port_xmit_data and port_rcv_data
+count 4-byte words). The names depend on the driver (mlx5 and bnxt_re
+differ); PFC pause frames are ethtool statistics, not sysfs, but
+port_xmit_wait shows the time the port could not send. The counters are
+port-wide, so other traffic on the port shows up too.
+
+`overlay = "<name>"` in an msg or window experiment draws that counter,
+per million WRs, over the throughput curves on a second axis; a
+"client:" or "server:" prefix picks one side, otherwise both are added.
+A `[counters]` table, or `counters = {...}` in an experiment, overrides
+COUNTER_DEFAULTS.
+
+    python3 counters.py mlx5_0                # current values
+    python3 counters.py mock0 --sysfs /tmp/rdma_mock_sysfs  # after a mock sweep
+"""
+
+import argparse
+import math
+import statistics
+import sys
+
+import sysfs
+
+COUNTER_DEFAULTS = {
+    "port": 1,
+    "dirs": ["counters", "hw_counters"],
+}
+
+# Per run; sweep.py CSV columns
+COUNTER_FIELDS = ("client_counters", "server_counters")
+
+SIDES = ("client", "server")
+
+
+def settings(*layers):
+    """Merge counter settings: defaults, then each layer in order.
+
+    A layer may be `true` (an experiment's `counters = true`).
+    """
+    cfg = dict(COUNTER_DEFAULTS)
+    for layer in layers:
+        if not isinstance(layer, dict):
+            continue
+        unknown = set(layer) - set(COUNTER_DEFAULTS)
+        if unknown:
+            raise ValueError(
+                f"unknown counters setting(s): {', '.join(sorted(unknown))}"
+            )
+        cfg.update(layer)
+    return cfg
+
+
+def snapshot(fs, dev, cfg):
+    """{name: value} of one RNIC port now; {} if fs or dev is unknown."""
+    if fs is None or not dev:
+        return {}
+    base = f"class/infiniband/{dev}/ports/{cfg['port']}"
+    return fs.scan(*(f"{base}/{d}" for d in cfg["dirs"]))
+
+
+def delta(before, after):
+    """The counters that went up between two snapshots.
+
+    A counter that went down was reset or wrapped; it is left out.
+    """
+    out = {}
+    for name, value in after.items():
+        d = value - before.get(name, value)
+        if d > 0:
+            out[name] = d
+    return out
+
+
+def format_cell(counts):
+    """{name: delta} -> "name=delta;..." (a CSV cell); None if empty."""
+    if not counts:
+        return None
+    # Means of several runs are rounded; raw deltas stay exact integers
+    return ";".join(
+        f"{k}={round(v, 3) if isinstance(v, float) else v}"
+        for k, v in sorted(counts.items())
+    )
+
+
+def parse_cell(cell):
+    """A CSV cell of format_cell() -> {name: delta}."""
+    if not isinstance(cell, str):
+        return {}  # empty, or NaN from pandas
+    out = {}
+    for item in filter(None, cell.split(";")):
+        name, _, value = item.partition("=")
+        value = float(value)
+        out[name] = int(value) if value.is_integer() else value
+    return out
+
+
+def merge(cells):
+    """One cell for the runs of a point: the mean delta per counter over
+    the runs that have counters (a counter missing in a run counts 0).
+    """
+    runs = [parse_cell(c) for c in cells if c]
+    if not runs:
+        return None
+    names = set().union(*runs)
+    return format_cell({k: statistics.mean(r.get(k, 0) for r in runs) for k in names})
+
+
+class Probe:
+    """Snapshots of both sides around one run."""
+
+    def __init__(self, cfg, devs, client_fs, server_fs):
+        self.cfg = cfg
+        self.sides = {
+            "client": (client_fs, devs["client"]),
+            "server": (server_fs, devs["server"]),
+        }
+        self.before = {}
+        self.result = {}
+
+    def _snap(self, side):
+        fs, dev = self.sides[side]
+        try:
+            return snapshot(fs, dev, self.cfg)
+        except OSError as e:
+            print(f"!! cannot read the {side}'s counters: {e}")
+            return None
+
+    def start(self):
+        self.before = {side: self._snap(side) for side in SIDES}
+
+    def stop(self):
+        """COUNTER_FIELDS of the run, the deltas since start(); also kept
+        in self.result.
+        """
+        self.result = {}
+        for side in SIDES:
+            before, after = self.before.get(side), self._snap(side)
+            counts = delta(before, after) if before and after else {}
+            self.result[f"{side}_counters"] = format_cell(counts)
+        return self.result
+
+
+def per_mwr(df, overlay):
+    """The overlay counter of each row of a results DataFrame, per million
+    WRs (NaN where the row has no counters); overlay is "name" or
+    "client:name" / "server:name".
+    """
+    side, _, name = overlay.rpartition(":")
+    if side and side not in SIDES:
+        raise ValueError(f"overlay side must be client or server, not {side!r}")
+    cols = [f"{side}_counters"] if side else list(COUNTER_FIELDS)
+    cols = [c for c in cols if c in df]
+
+    def value(row):
+        cells = [row[c] for c in cols if isinstance(row[c], str)]
+        if not cells or not row["iters"]:
+            return math.nan
+        total = sum(parse_cell(c).get(name, 0) for c in cells)
+        return total / row["iters"] * 1e6
+
+    return df.apply(value, axis=1)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("dev", help="RNIC name, e.g. mlx5_0")
+    ap.add_argument("--sysfs", default="/sys", help="sysfs root")
+    ap.add_argument("--port", type=int, default=COUNTER_DEFAULTS["port"])
+    args = ap.parse_args(argv)
+    cfg = settings({"port": args.port})
+    values = snapshot(sysfs.Sysfs(args.sysfs), args.dev, cfg)
+    if not values:
+        print(f"{args.dev}: no counters for port {args.port}", file=sys.stderr)
+        return 1
+    for name in sorted(values):
+        print(f"{name:<32}{values[name]:>20}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""CPU time per operation on the client and on the server.
+
+What one-sided READ and WRITE buy is a server CPU that never touches the
+data: the RNIC moves it while bench_server sleeps in rdma_get_cm_event(),
+whereas in send mode it polls its CQ and reposts a receive per message.
+Throughput curves cannot show that, so both bench programs report what
+the measured part of a run cost (bench_common.h):
+
+    [client] cpu: user=0.512000 s, sys=0.004000 s, host=0.530000 s
+    [server] cpu: user=0.000021 s, sys=0.000043 s, host=0.010000 s
+
+user and sys are the process's own time (getrusage, all threads), host
+the busy time of all CPUs of that host (/proc/stat, 10 ms ticks), which
+also catches interrupt and kernel work charged to no process. With
+`cycles = true` in an experiment both sides run with --cycles and count
+CPU cycles too (perf_event_open). The client measures from starting its
+threads until they are joined, the server from the connection until the
+last receive (send) or the client's disconnect (read / write).
+
+The driver reads the client's numbers from its output and the server's
+from its launcher (the daemon's "done" reply or the local server's
+output; not with the manual launcher) and stores per side CPU seconds,
+host CPU seconds and cycles, and derived from them CPU ns per operation
+and per byte, and cycles per operation: CPU_FIELDS, e.g.
+`server_cpu_ns_op`. `plot = "cpu"` plots them against the message size.
+"""
+
+import results
+
+SIDES = ("client", "server")
+
+# Per side; sweep.py CSV columns
+MEASURED = ("cpu_s", "host_cpu_s", "cycles")
+DERIVED = ("cpu_ns_op", "cpu_ns_byte", "cycles_op")
+CPU_FIELDS = tuple(f"{side}_{k}" for side in SIDES for k in MEASURED + DERIVED)
+
+
+def usage(res):
+    """{"cpu_s", "host_cpu_s", "cycles"} of one side from its result (a
+    parsed client result, a daemon's "done" reply, parse_cpu()); {} if it
+    reports no CPU time.
+    """
+    if not res or "cpu_user_s" not in res:
+        return {}
+    return {
+        "cpu_s": res["cpu_user_s"] + res.get("cpu_sys_s", 0),
+        "host_cpu_s": res.get("host_cpu_s"),
+        "cycles": res.get("cycles"),
+    }
+
+
+def server_usage(launcher):
+    """usage() of the server's last run as its launcher saw it; {} where
+    the launcher does not see the server's output.
+    """
+    reply = getattr(launcher, "last_result", None)
+    if reply:
+        return usage(reply)
+    lines = getattr(launcher, "last_output", None)
+    if lines:
+        return usage(results.parse_cpu("\n".join(lines), "server"))
+    return {}
+
+
+def costs(client, server, ops, msg):
+    """The CPU_FIELDS of a run of ops WRs of msg bytes, from the usage()
+    of both sides; None where a side reported nothing.
+    """
+    out = dict.fromkeys(CPU_FIELDS)
+    for side, use in (("client", client), ("server", server)):
+        use = use or {}
+        for k in MEASURED:
+            out[f"{side}_{k}"] = use.get(k)
+        if not ops:
+            continue
+        if use.get("cpu_s") is not None:
+            out[f"{side}_cpu_ns_op"] = use["cpu_s"] * 1e9 / ops
+            out[f"{side}_cpu_ns_byte"] = use["cpu_s"] * 1e9 / (ops * msg)
+        if use.get("cycles") is not None:
+            out[f"{side}_cycles_op"] = use["cycles"] / ops
+    return out
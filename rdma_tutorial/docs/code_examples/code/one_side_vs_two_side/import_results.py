@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""Import result CSVs into the Parquet store (store.py).
+
+The CSVs in this directory predate the store and hold only the seven
+columns of the first sweeps; what they are about lives in the file name.
+Each CSV is matched to the spec that writes it (specs/*.toml,
+`result_csv`), which gives the binaries, GPU, server address and each
+experiment's receive depth. The rest is inferred:
+
+- NIC: "broadcom" in the file name is the Broadcom 400G RoCE pair, the
+  CSVs of the first sweeps are the Mellanox pair (NIC_RULES); any other
+  CSV needs `--nic`, else it is skipped (e.g. rdma_mock.csv, whose rows
+  the mock sweep already stored)
+- memory / GPU: the spec's `gpu`, else a `*_gpu` experiment
+  (`msg_sweep_gpu`) or "gpu" in the file name means GPU 0
+- window: the `window` column, else a trailing `_<N>` in the file name
+- date: the CSVs record none, so `--date YYYY-MM-DD` if given, else the
+  author date of the commit that added the CSV, else its mtime; the
+  `date_source` column says which ("option", "git" or "mtime")
+- git commit: the commit that added the CSV
+
+Columns have one type across all files: INT_COLUMNS and FLOAT_COLUMNS
+are numbers, BOOL_COLUMNS booleans, everything else is kept as text.
+A row with a cell that does not fit its column's type is skipped and
+reported with its file and line. The store itself is not committed
+(results/ is ignored); it is built here from the CSVs:
+
+    python3 import_results.py                  # spec result CSVs -> results/
+    python3 import_results.py rdma_results.csv --dry-run
+    python3 import_results.py rdma_msg_sweep.csv --date 2025-11-03
+    python3 import_results.py old_run.csv --nic mellanox
+
+Without arguments, only the CSVs named by a spec's `result_csv` are
+read, not the `_knee.csv` / `_optimize.csv` summaries next to them.
+
+Imported rows carry `import_digest`, the hash of the CSV they came from,
+and a CSV whose digest is already in the store is skipped, so running the
+importer again only picks up new or changed files.
+"""
+
+import argparse
+import csv
+import datetime
+import hashlib
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import cpu
+import latency
+import numa
+import repeats
+import results
+import steady
+import store
+import sweep
+
+HERE = Path(__file__).parent
+
+# (pattern in the file name, nic, nic_model, ip family); first match wins
+NIC_RULES = [
+    (r"broadcom", "broadcom", "Broadcom 400G RoCE", "ipv6"),
+    (
+        r"^rdma_(results|msg_sweep(_4)?|gpu_msg_sweep(_op)?)\.csv$",
+        "mellanox",
+        "Mellanox",
+        "ipv4",
+    ),
+]
+
+INT_COLUMNS = (
+    "msg",
+    "window",
+    "iters",
+    "repeats",
+    "n_ok",
+    "recv_depth",
+    "run_window",
+    "attempts",
+    "timeouts",
+    "qps",
+    "threads",
+    "batch",
+    "signal",
+    "sge",
+    "stopped_early",
+    *numa.NODE_FIELDS,
+    *results.LIMIT_FIELDS,
+)
+FLOAT_COLUMNS = (
+    "mops",
+    "gib",
+    *(k for k in repeats.STAT_FIELDS if k not in INT_COLUMNS),
+    *latency.LAT_FIELDS,
+    *(k for k in steady.STEADY_FIELDS if k not in INT_COLUMNS),
+    *cpu.CPU_FIELDS,
+)
+BOOL_COLUMNS = ("shared_cq", "inline")
+
+
+def specs_by_csv(spec_dir):
+    """{result CSV file name: spec} for every spec in spec_dir."""
+    out = {}
+    for path in sorted(Path(spec_dir).glob("*.toml")):
+        try:
+            spec = sweep.load_spec(path)
+        except (OSError, ValueError) as e:
+            print(f"skipping {path}: {e}")
+            continue
+        out.setdefault(Path(spec["result_csv"]).name, spec)
+    return out
+
+
+def read_rows(path):
+    """The data rows of a CSV; blank lines and repeated headers are dropped,
+    rows with a bad cell reported and skipped.
+    """
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        rows = []
+        for row in reader:
+            if not row.get("experiment") or row["experiment"] == "experiment":
+                continue
+            try:
+                rows.append({k: _cell(k, v) for k, v in row.items() if k})
+            except ValueError as e:
+                print(f"{path.name}:{reader.line_num}: skipping row: {e}")
+    return rows
+
+
+def _cell(key, text):
+    """A CSV cell as the fixed type of its column (None if empty)."""
+    text = (text or "").strip()
+    if text == "":
+        return None
+    try:
+        if key in INT_COLUMNS:
+            return int(float(text))
+        if key in FLOAT_COLUMNS:
+            return float(text)
+    except ValueError:
+        raise ValueError(f"{key} = {text!r} is not a number") from None
+    if key in BOOL_COLUMNS:
+        return text.lower() in ("true", "1")
+    return text
+
+
+def file_history(path):
+    """(timestamp, commit, source) of the commit that added path, else
+    its mtime.
+    """
+    try:
+        out = subprocess.run(
+            ["git", "log", "--diff-filter=A", "--format=%aI %H", "--", path.name],
+            capture_output=True,
+            text=True,
+            cwd=path.parent,
+        ).stdout.split()
+    except OSError:
+        out = []
+    if len(out) >= 2:
+        # Newest first; the last entry is the commit that added the file
+        when = datetime.datetime.fromisoformat(out[-2])
+        return when.astimezone(datetime.timezone.utc), out[-1][:12], "git"
+    when = datetime.datetime.fromtimestamp(path.stat().st_mtime, datetime.timezone.utc)
+    return when, None, "mtime"
+
+
+def nic_for(name, nic=None):
+    """(nic, nic_model, ip family) of a CSV: the NIC_RULES entry of nic
+    (from --nic) or of its file name; None if neither is known.
+    """
+    for pattern, rule_nic, model, family in NIC_RULES:
+        if rule_nic == nic if nic else re.search(pattern, name.lower()):
+            return rule_nic, model, family
+    return (nic, nic, None) if nic else None
+
+
+def infer(path, spec, date=None, nic=None):
+    """Metadata of the rows in one CSV, from its spec and its name;
+    date (a datetime.date) is when it was measured, if known. None if
+    the CSV's NIC is not known (nic_for()).
+    """
+    name = path.name.lower()
+    found = nic_for(name, nic)
+    if found is None:
+        return None
+    nic, model, family = found
+    when, commit, source = file_history(path)
+    if date is not None:
+        when = datetime.datetime.combine(date, datetime.time(), datetime.timezone.utc)
+        source = "option"
+    meta = {
+        "nic": nic,
+        "nic_model": model,
+        "firmware": None,
+        "host": "unknown",
+        "spec": spec["name"] if spec else path.stem,
+        "source": path.name,
+        "client_bin": Path(spec["client"]).name if spec else None,
+        "server_bin": Path(spec["server"]).name if spec else None,
+        # The binaries that produced these rows were not kept
+        "client_hash": None,
+        "server_hash": None,
+        "gpu": spec["gpu"] if spec else (0 if "gpu" in name else None),
+        "server_ip": spec["server_ip"] if spec else None,
+        "server_host": spec["server_host"] if spec else None,
+        "ip_family": store.ip_family(spec["server_ip"]) if spec else family,
+        "git_commit": commit,
+        "timestamp": when,
+        "date_source": source,
+    }
+    meta["memory"] = "host" if meta["gpu"] is None else "gpu"
+    return meta
+
+
+def normalize(rows, path, spec, meta):
+    """Fill in GPU, window and receive depth where the CSV lacks them."""
+    m = re.search(r"_(\d+)$", path.stem)
+    name_window = int(m.group(1)) if m else None
+    exps = spec["experiment"] if spec else []
+    out = []
+    for row in rows:
+        row = dict(row)
+        if row.get("window") is None:
+            row["window"] = name_window
+        if meta["gpu"] is None and str(row["experiment"]).endswith("_gpu"):
+            row.update(gpu=0, memory="gpu")
+        if row.get("recv_depth") is None and row.get("mode") == "send":
+            for exp in exps:
+                if exp["name"] == row["experiment"] and row["window"] in exp["window"]:
+                    row["recv_depth"] = sweep.recv_depth_for(exp, row["window"])
+                    break
+        row["import_digest"] = meta["import_digest"]
+        out.append(row)
+    return out
+
+
+def imported_digests(store_dir):
+    try:
+        df = store.load_results(store_dir, columns=["import_digest"])
+    except (ValueError, TypeError):
+        # pyarrow's ArrowInvalid / ArrowTypeError: none of the store's
+        # files has the column yet, or their schemas do not merge
+        return set()
+    return set(df["import_digest"].dropna())
+
+
+def import_csv(path, spec, store_dir, done=(), dry_run=False, date=None, nic=None):
+    """Add one CSV to the store; returns the number of rows imported."""
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+    if digest in done:
+        print(f"{path.name}: already imported")
+        return 0
+    meta = infer(path, spec, date, nic)
+    if meta is None:
+        print(f"{path.name}: unknown NIC, skipped (give it with --nic)")
+        return 0
+    meta["import_digest"] = digest
+    rows = normalize(read_rows(path), path, spec, meta)
+    exps = sorted({r["experiment"] for r in rows})
+    windows = sorted({r["window"] for r in rows if r["window"] is not None})
+    print(
+        f"{path.name}: {len(rows)} rows, nic={meta['nic']}, memory={meta['memory']}, "
+        f"windows={windows}, experiments={exps}, spec={meta['spec']}, "
+        f"date={meta['timestamp'].date()} ({meta['date_source']})"
+    )
+    if rows and not dry_run:
+        store.append(store_dir, rows, meta)
+    return len(rows)
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument(
+        "csv", nargs="*", help="CSVs to import (default: the specs' result CSVs here)"
+    )
+    ap.add_argument("--store", default=str(HERE / store.DEFAULT_STORE))
+    ap.add_argument("--specs", default=str(HERE / "specs"), help="spec directory")
+    ap.add_argument("--dry-run", action="store_true", help="only show what is found")
+    ap.add_argument(
+        "--date",
+        type=datetime.date.fromisoformat,
+        help="when the CSVs were measured (YYYY-MM-DD)",
+    )
+    ap.add_argument(
+        "--nic",
+        help="NIC the CSVs were measured on, e.g. mellanox (default: by file name)",
+    )
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    specs = specs_by_csv(args.specs)
+    paths = [Path(p) for p in args.csv] or sorted(
+        HERE / name for name in specs if (HERE / name).exists()
+    )
+    done = imported_digests(args.store)
+    total = 0
+    for path in paths:
+        spec = specs.get(path.name)
+        total += import_csv(
+            path, spec, args.store, done, args.dry_run, args.date, args.nic
+        )
+    action = "Found" if args.dry_run else f"Imported into {args.store}:"
+    print(f"{action} {total} rows from {len(paths)} files")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
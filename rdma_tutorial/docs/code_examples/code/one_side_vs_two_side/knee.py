@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Find the smallest window that reaches a fraction of peak throughput.
+
+With `window = "knee"` in an experiment the window is searched instead of
+swept, per (mode, msg):
+
+1. exponential probing: windows min_window, 2x, 4x, ... until the best
+   value has not improved by more than `plateau` (relative) for
+   `plateau_steps` probes in a row, or max_window is reached;
+2. bisection between the last probe below `fraction` x peak and the first
+   one above it, down to a single window.
+
+The result is the knee: the queue depth to configure. It takes about
+log2(max_window) + log2(knee) runs instead of a full window grid. Every
+probe is an ordinary sweep point, so it lands in the CSV and the window
+plots as usual.
+"""
+
+KNEE_DEFAULTS = {
+    "fraction": 0.95,
+    "metric": "mops",
+    "min_window": 1,
+    "max_window": 1024,
+    "plateau": 0.02,
+    "plateau_steps": 2,
+}
+
+KNEE_FIELDS = [
+    "experiment",
+    "mode",
+    "msg",
+    "metric",
+    "fraction",
+    "peak",
+    "peak_window",
+    "knee_window",
+    "knee_value",
+    "runs",
+]
+
+
+def settings(*layers):
+    """Merge knee settings: defaults, then each layer in order."""
+    cfg = dict(KNEE_DEFAULTS)
+    for layer in layers:
+        unknown = set(layer or {}) - set(KNEE_DEFAULTS)
+        if unknown:
+            raise ValueError(f"unknown knee setting(s): {', '.join(sorted(unknown))}")
+        cfg.update(layer or {})
+    if not 0 < cfg["fraction"] <= 1:
+        raise ValueError("knee fraction must be in (0, 1]")
+    if not 1 <= cfg["min_window"] <= cfg["max_window"]:
+        raise ValueError("knee needs 1 <= min_window <= max_window")
+    return cfg
+
+
+def search(measure, cfg):
+    """Run the search; measure(window) returns the metric or None on failure.
+
+    Returns {"peak", "peak_window", "knee_window", "knee_value", "runs",
+    "probes"}, or None if no run succeeded.
+    """
+    probes = {}
+
+    def probe(window):
+        if window not in probes:
+            probes[window] = measure(window)
+        return probes[window]
+
+    best, flat, window = None, 0, cfg["min_window"]
+    while window <= cfg["max_window"]:
+        value = probe(window)
+        if value is not None and (best is None or value > best * (1 + cfg["plateau"])):
+            flat = 0
+        else:
+            flat += 1
+        if value is not None and (best is None or value > best):
+            best = value
+        if flat >= cfg["plateau_steps"]:
+            break
+        window *= 2
+    if best is None:
+        return None
+
+    target = cfg["fraction"] * best
+    hi = min(w for w, v in probes.items() if v is not None and v >= target)
+    below = [w for w in probes if w < hi]
+    lo = max(below) if below else hi
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        value = probe(mid)
+        if value is not None and value >= target:
+            hi = mid
+        else:
+            lo = mid
+
+    peak_window = max((w for w, v in probes.items() if v is not None), key=probes.get)
+    return {
+        "peak": best,
+        "peak_window": peak_window,
+        "knee_window": hi,
+        "knee_value": probes[hi],
+        "runs": len(probes),
+        "probes": probes,
+    }
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Latency histograms printed by `bench_client --latency`.
+
+With --latency the client timestamps every WR when it is posted and when
+its completion is polled, and prints the per-WR latencies as a log-linear
+(HDR-style) histogram, see bench_common.h:
+
+    [client] latency hist: 992:7 1008:16 1024:32 ... 49152:1
+
+Each pair is "<bucket lower bound in ns>:<count>". Buckets are exact below
+32 ns and then 32 per power of two, so values are within ~3%. Histograms
+of repeated runs are merged before percentiles are taken.
+"""
+
+import math
+import re
+
+HIST_RE = re.compile(r"\[client\]\s+latency hist:(.*)")
+
+SUB_BITS = 5  # LAT_SUB_BITS in bench_common.h
+
+PERCENTILES = {"p50": 0.50, "p99": 0.99, "p999": 0.999}
+LAT_FIELDS = [f"lat_{p}_us" for p in PERCENTILES] + ["lat_mean_us", "lat_max_us"]
+
+
+def parse_hist(stdout):
+    """The histogram of a client run as {lower_ns: count}, or None."""
+    for line in stdout.splitlines()[::-1]:
+        m = HIST_RE.search(line)
+        if m:
+            pairs = (tok.split(":") for tok in m.group(1).split())
+            return {int(lo): int(n) for lo, n in pairs}
+    return None
+
+
+def bucket_lower(ns):
+    """Lower bound of the bucket a value (ns) falls into, like lat_index()."""
+    ns = int(ns)
+    if ns < 1 << SUB_BITS:
+        return ns
+    shift = ns.bit_length() - 1 - SUB_BITS
+    return ns >> shift << shift
+
+
+def bucket_width(lower):
+    if lower < 1 << SUB_BITS:
+        return 1
+    return 1 << (lower.bit_length() - 1 - SUB_BITS)
+
+
+def merge(hists):
+    """Sum histograms; None entries (failed runs) are skipped."""
+    out = {}
+    for h in hists:
+        for lo, n in (h or {}).items():
+            # Histograms read back from the JSON journal have string keys
+            out[int(lo)] = out.get(int(lo), 0) + n
+    return out
+
+
+def percentile(hist, q):
+    """Bucket midpoint (ns) below which a fraction q of the samples lie."""
+    total = sum(hist.values())
+    rank = max(1, int(q * total + 0.5))
+    seen = 0
+    for lo in sorted(hist):
+        seen += hist[lo]
+        if seen >= rank:
+            return lo + bucket_width(lo) / 2
+    return math.nan
+
+
+def summary(hist):
+    """The LAT_FIELDS columns (in us) of a histogram; NaN if it is empty."""
+    if not hist:
+        return dict.fromkeys(LAT_FIELDS, math.nan)
+    total = sum(hist.values())
+    out = {f"lat_{p}_us": percentile(hist, q) / 1e3 for p, q in PERCENTILES.items()}
+    mid = sum((lo + bucket_width(lo) / 2) * n for lo, n in hist.items())
+    out["lat_mean_us"] = mid / total / 1e3
+    top = max(hist)
+    out["lat_max_us"] = (top + bucket_width(top)) / 1e3
+    return out
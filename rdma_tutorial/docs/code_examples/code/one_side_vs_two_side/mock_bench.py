@@ -0,0 +1,837 @@
+#!/usr/bin/env python3
+"""Simulated bench_client / bench_server for hosts without an RNIC.
+
+mock_client.py and mock_server.py take the same arguments and print the
+same lines (text or --json) as the real programs, so the sweep engine, the
+launchers and the daemon protocol (bench_control.py) run unchanged:
+
+    python3 sweep.py specs/mock.toml run     # whole sweep, a few seconds
+
+The two sides meet over plain TCP on the RDMA port: the server announces
+its buffer size and receive depth, the client sends its run, works out the
+result from the model below and reports back. Nothing is transferred.
+
+Throughput follows Little's law. One WR takes
+
+    latency = base (+ send matching) (+ GPU) + msg / bandwidth
+
+with bandwidth the lower of the link and the PCIe path (host or GPU
+memory), and the client keeps `window` WRs in flight per QP (READ: at
+most max_rd_atomic), so
+
+    Mops = min(window / latency, message rate, bandwidth / msg, core rate)
+
+with some run-to-run noise. The core rate is what one client thread can
+post and poll; post_share of it goes to ringing the doorbell, which
+--batch K pays once per K WRs, and poll_share to completions, which
+--signal N asks for once per N WRs. --inline (up to max_inline bytes,
+not READ) saves the NIC the DMA read of the payload: inline_gain more
+message rate and inline_latency_us less latency, for a copy of the
+payload at copy_gbps on the core; every SGE past the first costs
+sge_cost of the message rate. With --qps / --threads every thread gets
+the window of each of its QPs and its own core rate, the NIC caps their
+sum, and the run lasts until the slowest thread is done; threads sharing
+one CQ (--shared-cq) lose shared_cq_penalty of the core rate to
+contention. A send run fails like a real RNR error ("RNR retry counter
+exceeded", exit code 1) when the window is deeper than the server's
+receive queue, or at random with rnr_probability. With hang_probability
+a run never finishes, like a QP stuck in error, until it is killed.
+
+mock_numactl.py stands in for numactl and passes the node it binds to in
+MOCK_BENCH_NODE; the server tells the client its node. A side off
+nic_node, the RNIC's node, adds remote_numa_latency_us, caps the DMA
+bandwidth at remote_numa_gbps (the inter-socket link) and, for the
+client, costs remote_numa_core of the core rate (doorbells and CQ polls
+across the link). mock_sysfs/ is a matching sysfs tree (numa.py); the
+mock spec sweeps on a copy of it in /tmp (sysfs_seed).
+
+If the RNIC directory above sysfs_port exists, the client adds each
+run's traffic to the port counters there (counters.py): data and
+packets (one per mtu bytes of a WR, sent and received, as both sides
+share the RNIC), oos_per_mpkt out-of-sequence packets per million, and
+an RNR retry error for a failed send run.
+
+Both sides report what a run cost the CPU (cpu.py): a polling thread is
+busy for the whole run, sys_share of it in the kernel, so the client
+costs its threads' run time and a send-mode server the run time too,
+while a read/write server only handles its connection events
+(idle_server_cpu_us). The host's busy time adds host_busy_cores of other
+work and is counted in 10 ms ticks; --cycles counts cpu_ghz cycles per
+ns of CPU time.
+
+With --interval MS the client prints a sample per interval of modeled
+time. The rate starts at warmup_start of the steady rate and closes the
+gap with time constant warmup_tau_s, with interval_noise per sample, so
+the whole-run result is below the steady state. Each interval sleeps
+interval_pace of its length, and SIGUSR1 ends the run after the current
+interval, like the real client.
+
+MOCK_BENCH_MODEL names a TOML file with a [model] table that overrides
+MODEL_DEFAULTS. MOCK_BENCH_SEED makes the noise reproducible: the same
+client arguments and receive depth then give the same result. With
+time_scale > 0 a run sleeps that fraction of its modeled duration.
+"""
+
+import fcntl
+import json
+import math
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+import latency
+import results
+
+MODEL_DEFAULTS = {
+    "base_latency_us": 1.6,  # WRITE/READ round trip on an idle link
+    "send_latency_us": 0.4,  # extra for matching a posted receive
+    "gpu_latency_us": 0.8,  # extra for GPU memory (peer-to-peer PCIe)
+    "link_gbps": 100.0,
+    "pcie_gbps": 200.0,  # host memory
+    "gpu_pcie_gbps": 100.0,  # GPU memory
+    "msg_rate_mops": 12.0,  # NIC message rate, WRITE/READ
+    "send_rate_mops": 8.0,  # NIC message rate, SEND
+    "max_rd_atomic": 16,  # outstanding READs per QP
+    "core_mops": 4.0,  # WRs one client thread can post and poll
+    "post_share": 0.5,  # part of a WR's core time spent in ibv_post_send
+    "poll_share": 0.3,  # part spent polling its completion
+    "max_inline": 220,  # max_inline_data a QP gets
+    "max_sge": 30,  # device max_sge
+    "inline_gain": 0.5,  # NIC message rate gained without the payload DMA read
+    "inline_latency_us": 0.3,  # latency saved by it
+    "copy_gbps": 40.0,  # copying the inline payload into the WQE
+    "sge_cost": 0.1,  # NIC message rate lost per SGE past the first
+    "shared_cq_penalty": 0.15,  # core rate lost per thread on a shared CQ
+    "nic_node": 0,  # NUMA node of the RNIC, both hosts
+    "remote_numa_gbps": 80.0,  # DMA across the inter-socket link
+    "remote_numa_latency_us": 0.25,  # per side off the RNIC's node
+    "remote_numa_core": 0.2,  # core rate lost by a client off the RNIC's node
+    "noise": 0.02,  # relative stddev of a run's throughput
+    "rnr_probability": 0.0,  # random RNR failures of send runs
+    "hang_probability": 0.0,  # runs that hang until killed
+    "warmup_start": 0.6,  # --interval: rate at the start, relative to steady
+    "warmup_tau_s": 0.15,  # time constant of the warm-up
+    "interval_noise": 0.01,  # relative stddev of one interval sample
+    "interval_pace": 0.05,  # sleep this fraction of each interval
+    "time_scale": 0.0,  # sleep this fraction of the modeled run time
+    "connect_timeout": 5.0,  # seconds the client keeps trying to connect
+    "sysfs_port": "/tmp/rdma_mock_sysfs/class/infiniband/mock0/ports/1",  # "" for none
+    "mtu": 4096,
+    "oos_per_mpkt": 20.0,  # out-of-sequence packets per million
+    "sys_share": 0.01,  # part of a polling thread's time spent in the kernel
+    "idle_server_cpu_us": 40.0,  # a read/write server: connection events only
+    "host_busy_cores": 0.05,  # other work on each host
+    "cpu_ghz": 2.5,  # --cycles: cycles per ns of CPU time
+}
+
+# Written under sysfs_port; a run adds to them
+COUNTERS = (
+    "counters/port_xmit_data",
+    "counters/port_rcv_data",
+    "counters/port_xmit_packets",
+    "counters/port_rcv_packets",
+    "hw_counters/out_of_sequence",
+    "hw_counters/packet_seq_err",
+    "hw_counters/rnr_nak_retry_err",
+)
+# Per packet: RoCEv2 Ethernet, IP, UDP, BTH and ICRC
+HEADER_BYTES = 58
+
+MODES = ("read", "write", "send")
+
+
+def load_model():
+    """MODEL_DEFAULTS updated from the file named by MOCK_BENCH_MODEL."""
+    model = dict(MODEL_DEFAULTS)
+    path = os.environ.get("MOCK_BENCH_MODEL")
+    if path:
+        import tomllib
+
+        with open(path, "rb") as f:
+            raw = tomllib.load(f).get("model", {})
+        unknown = set(raw) - set(model)
+        if unknown:
+            raise ValueError(f"{path}: unknown model keys {sorted(unknown)}")
+        model.update(raw)
+    return model
+
+
+def numa_node():
+    """The node mock_numactl.py bound this process to, or None."""
+    node = os.environ.get("MOCK_BENCH_NODE")
+    return int(node) if node else None
+
+
+def remote(model, node):
+    return node is not None and node != model["nic_node"]
+
+
+def bump(model, add):
+    """Add to the counters under sysfs_port (created at 0 first)."""
+    port = model["sysfs_port"]
+    if not port or not os.path.isdir(os.path.dirname(os.path.dirname(port))):
+        return
+    for d in ("counters", "hw_counters"):
+        os.makedirs(os.path.join(port, d), exist_ok=True)
+    # Slots running in parallel share the tree
+    with open(os.path.join(port, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        for name in COUNTERS:
+            path = os.path.join(port, name)
+            if name not in add and os.path.exists(path):
+                continue
+            value = 0
+            if os.path.exists(path):
+                with open(path) as f:
+                    value = int(f.read())
+            with open(path, "w") as f:
+                f.write(f"{value + add.get(name, 0)}\n")
+
+
+def traffic(model, msg, ops, rand):
+    """Counter increments of ops WRs of msg bytes."""
+    pkts = ops * max(1, math.ceil(msg / model["mtu"]))
+    words = (ops * msg + pkts * HEADER_BYTES) // 4
+    expected = pkts * model["oos_per_mpkt"] / 1e6
+    oos = int(expected) + (rand.random() < expected % 1)
+    return {
+        "counters/port_xmit_data": words,
+        "counters/port_rcv_data": words,
+        "counters/port_xmit_packets": pkts,
+        "counters/port_rcv_packets": pkts,
+        "hw_counters/out_of_sequence": oos,
+        "hw_counters/packet_seq_err": oos,
+    }
+
+
+def cpu_use(model, busy_s, sec, cycles, rand):
+    """Modeled CPU use (results.CPU_KEYS) of one side: its threads were
+    busy for busy_s in total during a run of sec.
+    """
+    sys_s = busy_s * model["sys_share"]
+    other = model["host_busy_cores"] * sec * max(0.0, rand.gauss(1.0, 0.2))
+    use = {
+        "cpu_user_s": round(busy_s - sys_s, 6),
+        "cpu_sys_s": round(sys_s, 6),
+        # /proc/stat counts in clock ticks
+        "host_cpu_s": round(busy_s + other, 2),
+    }
+    if cycles:
+        use["cycles"] = round(busy_s * model["cpu_ghz"] * 1e9)
+    return use
+
+
+def print_cpu(role, use):
+    """The "cpu:" text line, like cpu_print()."""
+    line = (
+        f"[{role}] cpu: user={use['cpu_user_s']:.6f} s, "
+        f"sys={use['cpu_sys_s']:.6f} s, host={use['host_cpu_s']:.6f} s"
+    )
+    if "cycles" in use:
+        line += f", cycles={use['cycles']}"
+    print(line)
+
+
+def rng(*key):
+    """Random numbers for one run; with MOCK_BENCH_SEED fixed per key."""
+    seed = os.environ.get("MOCK_BENCH_SEED")
+    return random.Random(f"{seed}:{key}" if seed else None)
+
+
+def simulate(
+    model,
+    mode,
+    msg,
+    window,
+    iters,
+    gpu=False,
+    rand=random,
+    qps=1,
+    threads=1,
+    shared_cq=False,
+    batch=1,
+    signal=1,
+    inline=False,
+    sge=1,
+    client_remote=False,
+    server_remote=False,
+):
+    """Modeled {"sec", "mops", "gib", "lat_ns", "per_thread"} of one run."""
+    gbps = min(model["link_gbps"], model["gpu_pcie_gbps" if gpu else "pcie_gbps"])
+    if client_remote or server_remote:
+        gbps = min(gbps, model["remote_numa_gbps"])
+    lat_us = model["base_latency_us"] + msg * 8 / (gbps * 1e3)
+    lat_us += (client_remote + server_remote) * model["remote_numa_latency_us"]
+    if mode == "send":
+        lat_us += model["send_latency_us"]
+    if gpu:
+        lat_us += model["gpu_latency_us"]
+    if inline:
+        lat_us -= model["inline_latency_us"]
+    per_qp = min(window, model["max_rd_atomic"]) if mode == "read" else window
+    rate = model["send_rate_mops" if mode == "send" else "msg_rate_mops"]
+    if inline:
+        rate *= 1 + model["inline_gain"]
+    rate /= 1 + model["sge_cost"] * (sge - 1)
+    nic = min(rate, gbps * 1e3 / (8 * msg))
+    # Doorbells and completions are shared by a batch / a signal period
+    post, poll = model["post_share"], model["poll_share"]
+    wr_us = (1 - post - poll + post / batch + poll / signal) / model["core_mops"]
+    if inline:
+        wr_us += msg * 8 / (model["copy_gbps"] * 1e3)
+    core = 1 / wr_us
+    if shared_cq and threads > 1:
+        core *= 1 - model["shared_cq_penalty"]
+    if client_remote:
+        core *= 1 - model["remote_numa_core"]
+    # QP i runs on thread i % threads; each QP posts an equal share of iters.
+    # A thread is limited by its QPs' windows and by the core rate, and all
+    # threads share the NIC; the run ends with the slowest thread.
+    nqps = [len(range(t, qps, threads)) for t in range(threads)]
+    rates = [min(core, n * per_qp / lat_us) for n in nqps]
+    scale = min(1.0, nic / sum(rates)) * max(0.1, rand.gauss(1.0, model["noise"]))
+    per_thread, sec = [], 0.0
+    for t, n in enumerate(nqps):
+        ops = iters * n / qps
+        t_sec = ops / (rates[t] * scale * 1e6)
+        sec = max(sec, t_sec)
+        per_thread.append(
+            {
+                "thread": t,
+                "qps": n,
+                "ops": round(ops),
+                "sec": round(t_sec, 6),
+                "mops": round(ops / t_sec / 1e6, 5),
+                "gib": round(ops * msg / t_sec / 2**30, 5),
+            }
+        )
+    mops = iters / sec / 1e6
+    return {
+        "sec": sec,
+        "mops": mops,
+        "gib": iters * msg / sec / 2**30,
+        # Each WR waits behind the others in flight (Little's law)
+        "lat_ns": qps * per_qp / mops * 1e3,
+        "per_thread": per_thread,
+    }
+
+
+def intervals(model, res, iters, msg, interval_s, rand, as_json):
+    """Print --interval samples of a run at res["mops"] with a warm-up.
+
+    Stops early on SIGUSR1; returns (ops, sec) of what was done.
+    """
+    stop = []
+    signal.signal(signal.SIGUSR1, lambda *_: stop.append(True))
+    steady = res["mops"] * 1e6
+    gap = 1 - model["warmup_start"]
+    ops, t, n = 0, 0.0, 0
+    while ops < iters and not stop:
+        mid = t + interval_s / 2
+        rate = steady * (1 - gap * math.exp(-mid / model["warmup_tau_s"]))
+        rate *= max(0.1, rand.gauss(1.0, model["interval_noise"]))
+        dt = min(interval_s, (iters - ops) / rate)
+        done = min(iters - ops, round(rate * dt))
+        time.sleep(dt * (model["time_scale"] or model["interval_pace"]))
+        ops, t = ops + done, t + dt
+        if dt < interval_s:
+            break  # the real client does not report the last, partial one
+        n += 1
+        mops, gib = done / dt / 1e6, done * msg / dt / 2**30
+        if as_json:
+            print_json(
+                "interval",
+                interval=n,
+                t=round(t, 6),
+                sec=round(dt, 6),
+                ops=done,
+                mops=round(mops, 5),
+                gib=round(gib, 5),
+            )
+        else:
+            print(
+                f"[client] interval {n}: t={t:.3f} s, {done} ops, {mops:.3f} Mops, "
+                f"{gib:.3f} GiB/s",
+                flush=True,
+            )
+    return ops, t
+
+
+def lat_hist(lat_ns, iters, rand=random, samples=20000):
+    """A plausible per-WR histogram around lat_ns, scaled to iters WRs."""
+    n = min(iters, samples)
+    hist = {}
+    for _ in range(n):
+        ns = lat_ns * (1 + abs(rand.gauss(0, 0.05)))
+        if rand.random() < 0.01:
+            ns *= rand.uniform(1.5, 4.0)  # a tail, as from retransmits
+        lo = latency.bucket_lower(ns)
+        hist[lo] = hist.get(lo, 0) + 1
+    return {lo: max(1, round(c * iters / n)) for lo, c in sorted(hist.items())}
+
+
+def print_lat(hist, as_json):
+    """The client's latency output, like lat_print() / lat_json()."""
+    s = latency.summary(hist)
+    n = sum(hist.values())
+    if as_json:
+        return {
+            "n": n,
+            "p50_us": round(s["lat_p50_us"], 3),
+            "p99_us": round(s["lat_p99_us"], 3),
+            "p999_us": round(s["lat_p999_us"], 3),
+            "max_us": round(s["lat_max_us"], 3),
+            "mean_us": round(s["lat_mean_us"], 3),
+            "hist": [[lo, c] for lo, c in hist.items()],
+        }
+    print(
+        f"[client] latency: p50={s['lat_p50_us']:.2f} p99={s['lat_p99_us']:.2f} "
+        f"p99.9={s['lat_p999_us']:.2f} max={s['lat_max_us']:.2f} "
+        f"mean={s['lat_mean_us']:.2f} us (n={n})"
+    )
+    print("[client] latency hist: " + " ".join(f"{lo}:{c}" for lo, c in hist.items()))
+    return None
+
+
+def print_json(role, **fields):
+    obj = {"schema": results.SCHEMA_ID, "role": role}
+    obj.update((k, v) for k, v in fields.items() if v is not None)
+    print(json.dumps(obj, separators=(",", ":")), flush=True)
+
+
+def send_line(sock, obj):
+    sock.sendall((json.dumps(obj) + "\n").encode())
+
+
+def recv_line(rfile):
+    line = rfile.readline()
+    if not line:
+        raise ConnectionError("peer closed the connection")
+    return json.loads(line)
+
+
+def parse_args(argv, positional, flags, switches):
+    """argv -> dict, strict like the C programs; None prints the usage."""
+    if len(argv) < len(positional):
+        return None
+    opts = dict(zip(positional, argv))
+    rest = argv[len(positional) :]
+    i = 0
+    while i < len(rest):
+        key = rest[i].lstrip("-").replace("-", "_")
+        if rest[i] in switches:
+            opts[key] = True
+        elif rest[i] in flags and i + 1 < len(rest):
+            opts[key] = rest[i + 1]
+            i += 1
+        else:
+            return None
+        i += 1
+    return opts
+
+
+# ================== client ==================
+
+CLIENT_USAGE = (
+    "Usage: {} <server_ip> <port> [--mode read|write|send] [--msg N] "
+    "[--iters N] [--window N] [--qps N] [--threads N] [--shared-cq] [--batch N] "
+    "[--signal N] [--inline] [--sge N] [--gpu N] [--interval MS] [--latency] "
+    "[--cycles] [--json]"
+)
+
+
+def connect(host, port, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return socket.create_connection((host, port), timeout=timeout)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def client(argv):
+    opts = parse_args(
+        argv[1:],
+        ("server_ip", "port"),
+        (
+            "--mode",
+            "--msg",
+            "--iters",
+            "--window",
+            "--qps",
+            "--threads",
+            "--batch",
+            "--signal",
+            "--sge",
+            "--gpu",
+            "--interval",
+        ),
+        ("--shared-cq", "--inline", "--latency", "--cycles", "--json"),
+    )
+    if opts is None:
+        print(CLIENT_USAGE.format(argv[0]), file=sys.stderr)
+        return 1
+    model = load_model()
+    mode = opts.get("mode", "read")
+    mode = mode if mode in MODES else "read"
+    msg = int(opts.get("msg", "4096"), 0)
+    iters = int(opts.get("iters", "100000"), 0)
+    window = int(opts.get("window", "64"), 0)
+    gpu = int(opts["gpu"]) if "gpu" in opts else None
+    qps = int(opts.get("qps", "1"))
+    threads = min(int(opts.get("threads", "1")), qps)
+    shared_cq = bool(opts.get("shared_cq"))
+    batch = int(opts.get("batch", "1"), 0)
+    signal = int(opts.get("signal", "1"), 0)
+    sge = int(opts.get("sge", "1"))
+    interval_ms = int(opts.get("interval", "0"), 0)
+    if min(qps, threads, window, batch, signal, sge) < 1 or sge > msg:
+        print(CLIENT_USAGE.format(argv[0]), file=sys.stderr)
+        return 1
+    if sge > model["max_sge"]:
+        print(
+            f"--sge {sge} exceeds the device's max_sge ({model['max_sge']})",
+            file=sys.stderr,
+        )
+        return 1
+    # READ has no payload to inline; otherwise it must fit
+    inline = bool(opts.get("inline")) and mode != "read" and msg <= model["max_inline"]
+    batch, signal = min(batch, window), min(signal, window)
+
+    try:
+        sock = connect(opts["server_ip"], int(opts["port"]), model["connect_timeout"])
+    except OSError as e:
+        print(f"resolve_addr: {e}", file=sys.stderr)
+        return 1
+    with sock, sock.makefile("r") as rfile:
+        info = recv_line(rfile)
+        if info["len"] < msg:
+            print(f"server buffer too small ({info['len']} < {msg})", file=sys.stderr)
+            send_line(sock, {"ok": False, "error": "buffer too small"})
+            return 1
+        # A retry with a deeper receive queue gets other random numbers
+        rand = rng(argv[1:], info["recv_depth"])
+        if info.get("qps", 1) != qps:
+            print(
+                f"connect failed: server expects {info.get('qps', 1)} QPs",
+                file=sys.stderr,
+            )
+            send_line(sock, {"ok": False, "error": "QP count mismatch"})
+            return 1
+        res = simulate(
+            model,
+            mode,
+            msg,
+            window,
+            iters,
+            gpu is not None,
+            rand,
+            qps=qps,
+            threads=threads,
+            shared_cq=shared_cq,
+            batch=batch,
+            signal=signal,
+            inline=inline,
+            sge=sge,
+            client_remote=remote(model, numa_node()),
+            server_remote=remote(model, info.get("node")),
+        )
+        rnr = mode == "send" and (
+            window > info["recv_depth"] or rand.random() < model["rnr_probability"]
+        )
+        if model["hang_probability"] and rand.random() < model["hang_probability"]:
+            while True:
+                time.sleep(3600)
+        if model["time_scale"] > 0 and not (interval_ms and not rnr):
+            time.sleep(res["sec"] * model["time_scale"] * (0.5 if rnr else 1))
+        if rnr:
+            print(
+                f"RDMA error: wr_id={rand.randrange(window)} status=13"
+                "(RNR retry counter exceeded) vendor_err=0x0",
+                flush=True,
+            )
+            print("wc: Success", file=sys.stderr)
+            bump(model, {"hw_counters/rnr_nak_retry_err": 1})
+            send_line(sock, {"ok": False, "error": "RNR retry counter exceeded"})
+            return 1
+        requested = iters
+        if interval_ms:
+            # The whole run, warm-up included, and maybe stopped early
+            iters, sec = intervals(
+                model, res, iters, msg, interval_ms / 1e3, rand, opts.get("json")
+            )
+            done, stretch = iters / requested, sec / res["sec"]
+            res.update(sec=sec, mops=iters / sec / 1e6, gib=iters * msg / sec / 2**30)
+            for t in res["per_thread"]:
+                t["ops"] = round(t["ops"] * done)
+                t["sec"] = round(t["sec"] * stretch, 6)
+                t["mops"] = round(t["ops"] / t["sec"] / 1e6, 5)
+                t["gib"] = round(t["ops"] * msg / t["sec"] / 2**30, 5)
+        bump(model, traffic(model, msg, iters, rng(argv[1:], "counters")))
+        send_line(sock, {"ok": True, "sec": res["sec"], "ops": iters})
+
+    # Only signaled WRs are timed
+    timed = -(-iters // signal)
+    hist = lat_hist(res["lat_ns"], timed, rand) if opts.get("latency") else None
+    gpu_tag = "GPU " if gpu is not None else ""
+    multi = qps > 1 or threads > 1
+    eff_window = min(window, model["max_rd_atomic"])
+    doorbell = batch > 1 or signal > 1
+    # Every thread polls its CQ until its QPs are done
+    busy = sum(t["sec"] for t in res["per_thread"])
+    use = cpu_use(model, busy, res["sec"], opts.get("cycles"), rng(argv[1:], "cpu"))
+    if opts.get("json"):
+        print_json(
+            "client",
+            mode=mode,
+            msg=msg,
+            window=window,
+            iters=iters,
+            gpu=gpu,
+            sec=round(res["sec"], 6),
+            stopped=True if iters < requested else None,
+            mops=round(res["mops"], 5),
+            gib=round(res["gib"], 5),
+            qps=qps if multi else None,
+            threads=threads if multi else None,
+            shared_cq=shared_cq if multi else None,
+            per_thread=res["per_thread"] if multi else None,
+            batch=batch if doorbell else None,
+            signal=signal if doorbell else None,
+            inline=inline if opts.get("inline") else None,
+            max_inline=model["max_inline"] if opts.get("inline") else None,
+            sge=sge if sge > 1 else None,
+            max_rd_atomic=model["max_rd_atomic"] if mode == "read" else None,
+            max_dest_rd_atomic=model["max_rd_atomic"] if mode == "read" else None,
+            effective_window=eff_window if mode == "read" else None,
+            **use,
+            latency=print_lat(hist, True) if hist else None,
+        )
+    else:
+        extra = f", gpu={gpu}" if gpu is not None else ""
+        print(
+            f"[client] {gpu_tag}{mode} done: {res['mops']:.2f} Mops, "
+            f"{res['gib']:.2f} GiB/s (msg={msg} bytes, window={window}{extra})"
+        )
+        if iters < requested:
+            print(f"[client] stopped early after {iters} of {requested} WRs")
+        if multi:
+            cq = "shared" if shared_cq else "per-thread"
+            print(f"[client] {qps} QPs on {threads} threads ({cq} CQ)")
+            for t in res["per_thread"]:
+                print(
+                    f"[client] thread {t['thread']}: {t['mops']:.2f} Mops, "
+                    f"{t['gib']:.2f} GiB/s (qps={t['qps']})"
+                )
+        if doorbell:
+            print(f"[client] {batch} WRs per post, signal every {signal} WRs")
+        if opts.get("inline"):
+            state = "on" if inline else "off"
+            print(f"[client] inline {state} (max_inline_data={model['max_inline']})")
+        if sge > 1:
+            print(f"[client] {sge} SGEs per WR")
+        if mode == "read":
+            rd = model["max_rd_atomic"]
+            print(
+                f"[client] READ: max_rd_atomic={rd} max_dest_rd_atomic={rd}, "
+                f"effective window {eff_window}"
+            )
+        print_cpu("client", use)
+        if hist:
+            print_lat(hist, False)
+    return 0
+
+
+# ================== server ==================
+
+SERVER_USAGE = (
+    "Usage: {} <port> [--mode read|write|send] [--msg N] [--iters N] "
+    "[--recv-depth N] [--qps N] [--gpu N] [--cycles] [--daemon] [--ctrl-port N] "
+    "[--json]"
+)
+
+
+def listen(port):
+    if socket.has_dualstack_ipv6():
+        return socket.create_server(
+            ("", port), family=socket.AF_INET6, dualstack_ipv6=True
+        )
+    return socket.create_server(("", port))
+
+
+def serve_one(lsock, run):
+    """Serve one client; returns its report ({"ok": .., "sec": ..})."""
+    conn, _ = lsock.accept()
+    with conn, conn.makefile("r") as rfile:
+        depth = run["recv_depth"] if run["mode"] == "send" else 0
+        info = {"len": run["msg"], "recv_depth": depth, "qps": run["qps"]}
+        send_line(conn, {**info, "node": numa_node()})
+        try:
+            return recv_line(rfile)
+        except (ConnectionError, ValueError):
+            return {"ok": False, "error": "client disconnected"}
+
+
+def report(run, done, gpu, as_json, reused=None):
+    """The server's result lines; returns (mops, gib), None but in send
+    mode, and its CPU use.
+    """
+    mops = gib = None
+    # Polling for receives takes the whole run; READ and WRITE only the
+    # connection's events
+    model = load_model()
+    busy = done["sec"] if run["mode"] == "send" else model["idle_server_cpu_us"] / 1e6
+    rand = rng(run["mode"], run["msg"], run["iters"], "server cpu")
+    use = cpu_use(model, busy, done["sec"], run["cycles"], rand)
+    gpu_tag = "GPU " if gpu is not None else ""
+    # A client stopped early reports the WRs it did
+    ops = done.get("ops", run["iters"])
+    if run["mode"] == "send" and done.get("ok"):
+        mops = ops / done["sec"] / 1e6
+        gib = ops * run["msg"] / done["sec"] / 2**30
+        if not as_json:
+            print(f"[server] {gpu_tag}recv done: {mops:.2f} Mops, {gib:.2f} GiB/s")
+    if as_json:
+        send = run["mode"] == "send" and mops is not None
+        print_json(
+            "server",
+            mode=run["mode"],
+            msg=run["msg"],
+            iters=ops,
+            gpu=gpu,
+            reused=reused,
+            qps=run["qps"] if run["qps"] > 1 else None,
+            recv_depth=run["recv_depth"] if send else None,
+            sec=round(done["sec"], 6) if send else None,
+            mops=round(mops, 5) if send else None,
+            gib=round(gib, 5) if send else None,
+            **use,
+        )
+    else:
+        print_cpu("server", use)
+    return mops, gib, use
+
+
+def run_daemon(lsock, port, ctrl_port, gpu, as_json):
+    """The --daemon control loop of bench_server (see bench_control.py)."""
+    csock = listen(ctrl_port)
+    print(
+        f"[server] listening on {port} (daemon, control port {ctrl_port})", flush=True
+    )
+    conn, _ = csock.accept()
+    csock.close()
+    print("[server] controller connected", flush=True)
+    buf_len = 0
+    with conn, conn.makefile("r") as rfile:
+        for line in rfile:
+            req = json.loads(line)
+            if req.get("cmd", "run") == "quit":
+                break
+            if req.get("cmd", "run") != "run":
+                send_line(
+                    conn, {"status": "error", "error": f"unknown cmd {req['cmd']}"}
+                )
+                continue
+            run = {
+                "mode": req.get("mode", "read"),
+                "msg": int(req.get("msg", 4096)),
+                "iters": int(req.get("iters", 100000)),
+                "recv_depth": int(req.get("recv_depth", 128)),
+                "qps": int(req.get("qps", 1)),
+                "cycles": bool(req.get("cycles")),
+            }
+            print(
+                f"[server] run: mode={run['mode']} msg={run['msg']} "
+                f"iters={run['iters']} recv_depth={run['recv_depth']} "
+                f"qps={run['qps']}",
+                flush=True,
+            )
+            send_line(conn, {"status": "listening", "port": port})
+            need = run["msg"] * max(run["recv_depth"], 1) * run["qps"]
+            reused = need <= buf_len
+            buf_len = max(buf_len, need)
+            done = serve_one(lsock, run)
+            if not done.get("ok"):
+                send_line(conn, {"status": "error", "error": done.get("error")})
+                continue
+            mops, gib, use = report(run, done, gpu, as_json, reused)
+            send_line(
+                conn,
+                {
+                    "status": "done",
+                    **{k: run[k] for k in ("mode", "msg", "iters")},
+                    "reused": reused,
+                    "mops": round(mops or 0, 2),
+                    "gib": round(gib or 0, 2),
+                    **use,
+                },
+            )
+    return 0
+
+
+def server(argv):
+    opts = parse_args(
+        argv[1:],
+        ("port",),
+        (
+            "--mode",
+            "--msg",
+            "--iters",
+            "--recv-depth",
+            "--qps",
+            "--gpu",
+            "--ctrl-port",
+        ),
+        ("--cycles", "--daemon", "--json"),
+    )
+    if opts is None:
+        print(SERVER_USAGE.format(argv[0]), file=sys.stderr)
+        return 1
+    port = int(opts["port"])
+    gpu = int(opts["gpu"]) if "gpu" in opts else None
+    mode = opts.get("mode", "read")
+    run = {
+        "mode": mode if mode in MODES else "read",
+        "msg": int(opts.get("msg", "4096"), 0),
+        "iters": int(opts.get("iters", "100000"), 0),
+        "recv_depth": int(opts.get("recv_depth", 128)),
+        "qps": int(opts.get("qps", 1)),
+        "cycles": bool(opts.get("cycles")),
+    }
+    # The counters must exist before the driver's first snapshot
+    bump(load_model(), {})
+    with listen(port) as lsock:
+        if opts.get("daemon"):
+            ctrl_port = int(opts.get("ctrl_port", port + 1))
+            return run_daemon(lsock, port, ctrl_port, gpu, opts.get("json"))
+        gpu_info = f" gpu={gpu}" if gpu is not None else ""
+        print(
+            f"[server] listening on {port} (mode={run['mode']} msg={run['msg']} "
+            f"iters={run['iters']}{gpu_info})",
+            flush=True,
+        )
+        done = serve_one(lsock, run)
+    if not done.get("ok"):
+        print(f"[server] client failed: {done.get('error')}", file=sys.stderr)
+        return 1
+    if run["mode"] != "send":
+        print(
+            f"[server] ready for client RDMA {run['mode'].upper()}, "
+            "waiting for disconnect..."
+        )
+    report(run, done, gpu, opts.get("json"))
+    return 0
+
+
+if __name__ == "__main__":
+    role = sys.argv[1] if len(sys.argv) > 1 else ""
+    if role not in ("client", "server"):
+        print(f"Usage: {sys.argv[0]} client|server ...", file=sys.stderr)
+        sys.exit(1)
+    main = client if role == "client" else server
+    sys.exit(main([f"{sys.argv[0]} {role}", *sys.argv[2:]]))
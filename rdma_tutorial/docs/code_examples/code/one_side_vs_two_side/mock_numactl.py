@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""Simulated numactl (see mock_bench.py): takes --cpunodebind=N /
+--membind=N, passes the node on in MOCK_BENCH_NODE and runs the command.
+"""
+
+import os
+import sys
+
+USAGE = "Usage: {} --cpunodebind=N --membind=N command [args ...]"
+
+
+def main(argv):
+    args = argv[1:]
+    while args and args[0].startswith("-"):
+        flag, _, node = args.pop(0).partition("=")
+        if flag not in ("--cpunodebind", "--membind") or not node.isdigit():
+            args = []
+            break
+        os.environ["MOCK_BENCH_NODE"] = node
+    if not args:
+        print(USAGE.format(argv[0]), file=sys.stderr)
+        return 1
+    os.execvp(args[0], args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
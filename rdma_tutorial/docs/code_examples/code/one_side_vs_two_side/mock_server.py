@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+"""Simulated bench_server (see mock_bench.py); same arguments and output."""
+
+import sys
+
+import mock_bench
+
+if __name__ == "__main__":
+    sys.exit(mock_bench.server(sys.argv))
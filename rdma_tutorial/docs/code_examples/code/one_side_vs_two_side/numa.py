@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Pin bench_client and bench_server to the NUMA node of their RNIC.
+
+Unpinned, a host-memory run lands on whichever socket the scheduler
+picks; when that is not the socket the RNIC hangs off, every DMA and
+doorbell crosses the inter-socket link. An experiment's `numa` option
+places both sides:
+
+- "none" (default): no pinning, as before;
+- "local": each side runs on its RNIC's node;
+- "remote": each side runs on the node nearest to its RNIC's node but
+  not that node (by the firmware's distance table).
+
+A list sweeps the placements like any other option. The node of an RNIC
+is read from sysfs:
+
+    <sysfs>/class/infiniband/<dev>/device/numa_node
+    <sysfs>/devices/system/node/online
+    <sysfs>/devices/system/node/node<N>/distance
+    <sysfs>/devices/system/node/node<N>/cpulist
+
+on the client directly and on the server through its launcher (sysfs.py;
+the spec's `sysfs` root may be a fake tree such as mock_sysfs/). The
+RNICs are the spec's `ib_dev` and `server_ib_dev`, or a slot's
+`nics = ["client:mlx5_0", "server:mlx5_1"]`. Each side is then started
+under `numactl --cpunodebind=N --membind=N`, and the nodes go to the
+`client_node` / `server_node` columns. A `[numa]` table overrides
+NUMA_DEFAULTS: the numactl command, and `client_node` / `server_node`,
+a side's RNIC node for "local" without reading sysfs, which the server
+needs with the manual launcher.
+
+    python3 numa.py mlx5_0                    # local and remote node, CPUs
+    python3 numa.py mock0 --sysfs mock_sysfs
+"""
+
+import argparse
+import shlex
+import sys
+
+import sysfs
+
+NUMA_DEFAULTS = {
+    "numactl": "numactl",
+    "client_node": None,
+    "server_node": None,
+}
+
+PLACEMENTS = ("none", "local", "remote")
+
+# Per run; sweep.py CSV columns
+NODE_FIELDS = ("client_node", "server_node")
+
+
+class NumaError(Exception):
+    """A placement cannot be resolved on this host."""
+
+
+def settings(*layers):
+    """Merge NUMA settings: defaults, then each layer in order."""
+    cfg = dict(NUMA_DEFAULTS)
+    for layer in layers:
+        unknown = set(layer or {}) - set(NUMA_DEFAULTS)
+        if unknown:
+            raise ValueError(f"unknown numa setting(s): {', '.join(sorted(unknown))}")
+        cfg.update(layer or {})
+    return cfg
+
+
+def parse_list(text):
+    """A sysfs list like "0-3,8" -> [0, 1, 2, 3, 8]."""
+    out = []
+    for part in filter(None, text.split(",")):
+        lo, _, hi = part.partition("-")
+        out += range(int(lo), int(hi or lo) + 1)
+    return out
+
+
+def nic_node(fs, dev):
+    """NUMA node of an RNIC; None if the platform does not say (-1)."""
+    text = fs.read(f"class/infiniband/{dev}/device/numa_node")
+    node = int(text)
+    return node if node >= 0 else None
+
+
+def distances(fs, node):
+    """{node: distance} from a node to every online node."""
+    online = parse_list(fs.read("devices/system/node/online"))
+    dist = fs.read(f"devices/system/node/node{node}/distance").split()
+    # The table has one column per possible node, online or not
+    return {n: int(dist[n]) for n in online if n < len(dist)}
+
+
+def cpus(fs, node):
+    """The CPUs of a node, which --cpunodebind binds to."""
+    return parse_list(fs.read(f"devices/system/node/node{node}/cpulist"))
+
+
+def place(fs, dev, placement):
+    """The node to run on for a placement of one side."""
+    if placement == "none":
+        return None
+    if placement not in PLACEMENTS:
+        raise ValueError(f"unknown numa placement {placement!r}")
+    if not dev:
+        raise NumaError(f"numa = {placement!r} needs the RNIC's name")
+    node = nic_node(fs, dev)
+    if node is None:
+        raise NumaError(f"{dev} reports no NUMA node (numa_node is -1)")
+    if placement == "local":
+        return node
+    others = {n: d for n, d in distances(fs, node).items() if n != node}
+    if not others:
+        raise NumaError(f"no remote NUMA node: node {node} is the only one online")
+    return min(others, key=lambda n: (others[n], n))
+
+
+def nics(spec):
+    """{"client": dev, "server": dev} from the spec or the slot's nics."""
+    out = {"client": spec.get("ib_dev"), "server": spec.get("server_ib_dev")}
+    for nic in spec.get("nics") or []:
+        side, _, dev = str(nic).partition(":")
+        if dev and side in out and out[side] is None:
+            out[side] = dev
+    return out
+
+
+def nodes(cfg, placement, devs, client_fs, server_fs):
+    """{"client_node": N, "server_node": N} for a placement; all None for
+    "none". server_fs is None when the server host cannot be read.
+    Raises NumaError, or OSError if sysfs cannot be read.
+    """
+    out = {}
+    for side, fs in (("client", client_fs), ("server", server_fs)):
+        fixed = cfg[f"{side}_node"]
+        if placement == "none":
+            out[f"{side}_node"] = None
+        elif fixed is not None and placement == "local":
+            out[f"{side}_node"] = fixed
+        elif fs is None:
+            hint = f"; set {side}_node in [numa]" if placement == "local" else ""
+            raise NumaError(f"cannot read the {side}'s sysfs with this launcher{hint}")
+        else:
+            out[f"{side}_node"] = place(fs, devs[side], placement)
+    return out
+
+
+def command(cfg, node):
+    """The numactl prefix binding CPUs and memory to node ([] for None)."""
+    if node is None:
+        return []
+    return [*shlex.split(cfg["numactl"]), f"--cpunodebind={node}", f"--membind={node}"]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("dev", help="RNIC name, e.g. mlx5_0")
+    ap.add_argument("--sysfs", default="/sys", help="sysfs root")
+    args = ap.parse_args(argv)
+    fs = sysfs.Sysfs(args.sysfs)
+    try:
+        node = nic_node(fs, args.dev)
+        print(f"{args.dev}: NUMA node {'unknown' if node is None else node}")
+        if node is not None:
+            print(f"  distances: {distances(fs, node)}")
+            for placement in PLACEMENTS[1:]:
+                n = place(fs, args.dev, placement)
+                print(f"  {placement}: node {n}, CPUs {cpus(fs, n)}")
+    except (NumaError, OSError) as e:
+        print(f"{args.dev}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
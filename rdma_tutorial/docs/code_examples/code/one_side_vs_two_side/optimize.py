@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Find the best configuration for a message-size mix by successive halving.
+
+With `optimize = true` in an experiment its `window` and `recv_depth`
+lists are not swept as a grid but searched, per mode: which (window,
+recv_depth) gives the highest throughput on the experiment's `msg` mix
+while keeping p99 latency under a limit?
+
+1. up to `configs` candidates are drawn from the cartesian product;
+2. every candidate is run on each message size of the mix with few
+   iterations (a cheap, noisy measurement);
+3. the best 1/eta of them go on to the next rung, which runs eta times
+   as many iterations, until one is left; the last rung runs the
+   experiment's full `iters`.
+
+With 27 candidates and eta = 3 that is 27 + 9 + 3 + 1 = 40 evaluations
+instead of the full grid, and poor candidates only ever get the short
+runs. A candidate's score is the throughput of the whole mix: with
+`weights` as the share of operations of each message size, the mix
+spends sum(w / Mops) per operation, so the score is the weighted
+harmonic mean of the per-size Mops (of GiB/s, weighted by bytes, for
+metric = "gib"). A candidate over `max_lat_p99_us` on any size, or with
+a failed run, ranks below every feasible one.
+"""
+
+import itertools
+import math
+import random
+
+OPTIMIZE_DEFAULTS = {
+    "metric": "mops",
+    "max_lat_p99_us": None,
+    "weights": None,
+    "configs": 27,
+    "eta": 3,
+    "min_iters": 20000,
+    "seed": 0,
+}
+
+# The knobs searched; each is a list in the experiment
+DIMENSIONS = ("window", "recv_depth")
+
+OPT_FIELDS = [
+    "experiment",
+    "mode",
+    "rung",
+    "iters",
+    *DIMENSIONS,
+    "metric",
+    "score",
+    "lat_p99_us",
+    "feasible",
+    "promoted",
+]
+
+
+def settings(*layers):
+    """Merge optimizer settings: defaults, then each layer in order.
+
+    A layer may be `true` (an experiment's `optimize = true`).
+    """
+    cfg = dict(OPTIMIZE_DEFAULTS)
+    for layer in layers:
+        if not isinstance(layer, dict):
+            continue
+        unknown = set(layer) - set(OPTIMIZE_DEFAULTS)
+        if unknown:
+            raise ValueError(
+                f"unknown optimize setting(s): {', '.join(sorted(unknown))}"
+            )
+        cfg.update(layer)
+    if cfg["metric"] not in ("mops", "gib"):
+        raise ValueError('optimize metric must be "mops" or "gib"')
+    if cfg["eta"] < 2 or cfg["configs"] < 1:
+        raise ValueError("optimize needs eta >= 2 and configs >= 1")
+    return cfg
+
+
+def candidates(space, cfg):
+    """Up to cfg["configs"] configurations ({dimension: value}) of space."""
+    names = list(space)
+    grid = [dict(zip(names, vals)) for vals in itertools.product(*space.values())]
+    if len(grid) <= cfg["configs"]:
+        return grid
+    return random.Random(cfg["seed"]).sample(grid, cfg["configs"])
+
+
+def schedule(n, iters, cfg):
+    """[(configs, iters)] per rung: n, n/eta, ... 1, the last at `iters`."""
+    counts = [n]
+    while counts[-1] > 1:
+        counts.append(math.ceil(counts[-1] / cfg["eta"]))
+    last = len(counts) - 1
+    return [
+        (count, min(iters, max(cfg["min_iters"], iters // cfg["eta"] ** (last - k))))
+        for k, count in enumerate(counts)
+    ]
+
+
+def mix_score(values, msgs, cfg):
+    """Throughput of the message mix from per-size values; None if any is."""
+    if any(v is None or math.isnan(v) or v <= 0 for v in values):
+        return None
+    weights = cfg["weights"] or [1] * len(msgs)
+    if cfg["metric"] == "gib":
+        weights = [w * m for w, m in zip(weights, msgs)]
+    return sum(weights) / sum(w / v for w, v in zip(weights, values))
+
+
+def search(evaluate, space, iters, cfg):
+    """Run successive halving over space.
+
+    evaluate(config, iters) returns (score, lat_p99_us); score is None if a
+    run failed and lat_p99_us None without latency. Returns (best, trace):
+    the best feasible result of the last rung that has one ({**config,
+    "score", "lat_p99_us", "iters"}, or None) and one record per evaluation.
+    """
+    limit = cfg["max_lat_p99_us"]
+    alive = candidates(space, cfg)
+    trace = []
+    for rung, (_, rung_iters) in enumerate(schedule(len(alive), iters, cfg)):
+        scored = []
+        for config in alive:
+            score, lat = evaluate(config, rung_iters)
+            feasible = score is not None and (
+                limit is None or (lat is not None and lat <= limit)
+            )
+            rec = {
+                "rung": rung,
+                "iters": rung_iters,
+                **config,
+                "score": score,
+                "lat_p99_us": lat,
+                "feasible": feasible,
+                "promoted": False,
+            }
+            trace.append(rec)
+            scored.append(rec)
+        # Feasible first, then by score; infeasible ones only fill up
+        scored.sort(key=lambda r: (r["feasible"], r["score"] or 0), reverse=True)
+        keep = scored[: math.ceil(len(scored) / cfg["eta"])] if len(scored) > 1 else []
+        for rec in keep:
+            rec["promoted"] = True
+        if not keep:
+            break
+        alive = [{k: rec[k] for k in space} for rec in keep]
+
+    # The longest runs are the most accurate; fall back to shorter ones if
+    # the finalist turned out infeasible at full length
+    for rung in range(trace[-1]["rung"], -1, -1):
+        final = [r for r in trace if r["rung"] == rung and r["feasible"]]
+        if final:
+            best = max(final, key=lambda r: r["score"])
+            return {k: best[k] for k in (*space, "score", "lat_p99_us", "iters")}, trace
+    return None, trace
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Summarize repeated runs of one sweep point.
+
+With `repeats = N` in an experiment every point is run N times. The runs
+are interleaved (all points once, then all points again, ...) so slow drift
+of the hosts is spread over every point instead of biasing a few. The CSV
+row of a point then holds the mean in `mops` / `gib` and, per metric,
+median, sample stddev, min, max and a 95% confidence interval of the mean
+(Student t), rounded to DECIMALS. Failed runs are left out; `n_ok` counts the runs that worked.
+"""
+
+import math
+import statistics
+
+import counters
+import cpu
+import latency
+import numa
+import results
+import steady
+
+METRICS = ("mops", "gib")
+STATS = ("median", "std", "min", "max", "ci_lo", "ci_hi")
+STAT_FIELDS = ["repeats", "n_ok"] + [f"{m}_{s}" for m in METRICS for s in STATS]
+# The bench prints Mops and GiB/s with 2 decimals; one more keeps a small
+# spread visible
+DECIMALS = 3
+
+# Two-sided 95% Student t quantiles by degrees of freedom; 1.96 beyond 30
+T95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571,
+    6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228,
+    11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131,
+    16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093, 20: 2.086,
+    21: 2.080, 22: 2.074, 23: 2.069, 24: 2.064, 25: 2.060,
+    26: 2.056, 27: 2.052, 28: 2.048, 29: 2.045, 30: 2.042,
+}  # fmt: skip
+
+
+def t95(df):
+    return T95.get(df, 1.96)
+
+
+def summarize(values):
+    """mean/median/std/min/max/ci_lo/ci_hi of the non-NaN values."""
+    vals = [v for v in values if not math.isnan(v)]
+    nan = float("nan")
+    if not vals:
+        return dict.fromkeys(("mean",) + STATS, nan)
+    mean = statistics.mean(vals)
+    out = {
+        "mean": mean,
+        "median": statistics.median(vals),
+        "min": min(vals),
+        "max": max(vals),
+        "std": nan,
+        "ci_lo": nan,
+        "ci_hi": nan,
+    }
+    if len(vals) >= 2:
+        std = statistics.stdev(vals)
+        half = t95(len(vals) - 1) * std / math.sqrt(len(vals))
+        out.update(std=std, ci_lo=mean - half, ci_hi=mean + half)
+    return out
+
+
+def aggregate(runs):
+    """Fold the rows of all runs of one point into its CSV row."""
+    row = {k: runs[0][k] for k in ("experiment", "mode", "msg", "window")}
+    options = (
+        "qps",
+        "threads",
+        "shared_cq",
+        "batch",
+        "signal",
+        "inline",
+        "sge",
+        "numa",
+    )
+    for k in options:
+        if k in runs[0]:
+            row[k] = runs[0][k]
+    # Discovered by the client or numa.py; the same for every run
+    for k in (*results.LIMIT_FIELDS, *numa.NODE_FIELDS):
+        row[k] = next((r[k] for r in runs if r.get(k) is not None), None)
+    # steady = true: the warm-up and steady time of a typical run, and how
+    # many runs were stopped once steady
+    if any(k in r for r in runs for k in steady.STEADY_FIELDS):
+        for k in ("warmup_s", "steady_s"):
+            vals = [r[k] for r in runs if r.get(k) is not None]
+            row[k] = statistics.mean(vals) if vals else None
+        row["stopped_early"] = sum(r.get("stopped_early") or 0 for r in runs)
+    # With iters = "auto" every run calibrates on its own; keep the typical count
+    row["iters"] = int(statistics.median(r["iters"] for r in runs))
+    # Failed send runs may have been retried with other settings (retry.py)
+    depths = [r["recv_depth"] for r in runs if r["recv_depth"] is not None]
+    row["recv_depth"] = max(depths) if depths else None
+    row["run_window"] = min(r["run_window"] for r in runs)
+    row["attempts"] = sum(r["attempts"] for r in runs)
+    row["timeouts"] = sum(r.get("timeouts", 0) for r in runs)
+    row["retry"] = "; ".join(sorted({r["retry"] for r in runs if r["retry"]}))
+    row["repeats"] = len(runs)
+    row["n_ok"] = sum(not math.isnan(r["mops"]) for r in runs)
+    for m in METRICS:
+        s = summarize([r[m] for r in runs])
+        row[m] = round(s["mean"], DECIMALS)
+        for k in STATS:
+            row[f"{m}_{k}"] = round(s[k], DECIMALS)
+    # Per-thread Mops (--threads), averaged over the runs that have them
+    per_thread = [r["thread_mops"] for r in runs if r.get("thread_mops")]
+    if per_thread:
+        row["thread_mops"] = ";".join(
+            f"{statistics.mean(t):.3f}" for t in zip(*per_thread)
+        )
+    # RNIC counter deltas (counters = true): the mean of the runs
+    for k in counters.COUNTER_FIELDS:
+        if any(r.get(k) for r in runs):
+            row[k] = counters.merge(r.get(k) for r in runs)
+    # CPU cost (cpu.py): the mean of the runs that report it
+    for k in cpu.CPU_FIELDS:
+        vals = [r[k] for r in runs if r.get(k) is not None]
+        row[k] = statistics.mean(vals) if vals else None
+    if any(r.get("lat_hist") for r in runs):
+        row.update(latency.summary(latency.merge(r.get("lat_hist") for r in runs)))
+    return row
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Parse the result of a bench run: --json objects, or older text lines.
+
+With --json every bench program (bench_client*, bench_server*, and
+RC_vs_UD/RC_client) prints each result as one JSON object on a line:
+
+    {"schema": "rdma-bench/1", "role": "client", "mode": "write", "msg": 32,
+     "window": 64, "iters": 200000, "sec": 0.05, "mops": 3.9, "gib": 0.12,
+     "latency": {"n": 200000, "p50_us": 1.2, ..., "hist": [[992, 7], ...]}}
+
+SCHEMA lists the known fields and their types; required ones must be
+present, unknown fields are kept so new metrics reach the caller without
+a new regex. Binaries built before --json print text lines instead, which
+parse_text() turns into the same shape.
+
+With --interval the client also prints a sample every interval while it
+runs (role "interval"; text "[client] interval N: ..."), which
+parse_interval() reads one line at a time.
+
+Both sides also report the CPU time the measured part of a run cost
+(cpu_user_s, cpu_sys_s, host_cpu_s and, with --cycles, cycles; text
+"[client] cpu: ..." / "[server] cpu: ..."), which parse_cpu() reads for
+either role; cpu.py turns it into CPU time per operation.
+"""
+
+import json
+import re
+
+import latency
+
+SCHEMA_ID = "rdma-bench/1"
+
+# field: (type(s), required for role)
+SCHEMA = {
+    "schema": (str, ("client", "server")),
+    "role": (str, ("client", "server")),
+    "mode": (str, ("client", "server")),
+    "msg": (int, ("client", "server")),
+    "iters": (int, ("client", "server")),
+    "window": (int, ("client",)),
+    "sec": ((int, float), ("client", "interval")),
+    "mops": ((int, float), ("client", "interval")),
+    "gib": ((int, float), ("client", "interval")),
+    "interval": (int, ("interval",)),
+    "t": ((int, float), ("interval",)),
+    "ops": (int, ("interval",)),
+    "stopped": (bool, ()),
+    "gpu": (int, ()),
+    "qp_type": (str, ()),
+    "cqe_batch": (int, ()),
+    "recv_depth": (int, ()),
+    "reused": (bool, ()),
+    "qps": (int, ()),
+    "threads": (int, ()),
+    "shared_cq": (bool, ()),
+    "batch": (int, ()),
+    "signal": (int, ()),
+    "inline": (bool, ()),
+    "max_inline": (int, ()),
+    "sge": (int, ()),
+    "max_rd_atomic": (int, ()),
+    "max_dest_rd_atomic": (int, ()),
+    "effective_window": (int, ()),
+    "per_thread": (list, ()),
+    "cpu_user_s": ((int, float), ()),
+    "cpu_sys_s": ((int, float), ()),
+    "host_cpu_s": ((int, float), ()),
+    "cycles": (int, ()),
+    "latency": (dict, ()),
+}
+
+# Reported by both roles; see parse_cpu()
+CPU_KEYS = ("cpu_user_s", "cpu_sys_s", "host_cpu_s", "cycles")
+
+# What the client found out about the QPs' limits; CSV columns of sweep.py
+LIMIT_FIELDS = ("max_inline", "max_rd_atomic", "effective_window")
+
+# [client] write done: 3.34 Mops, 0.10 GiB/s (msg=32 bytes, window=64)
+# [client] GPU write done: 0.43 Mops, 0.01 GiB/s (msg=32 bytes, window=64, gpu=0)
+CLIENT_LINE_RE = re.compile(
+    r"\[client\]\s+(?:GPU\s+)?(\w+)\s+done:\s+([0-9.]+)\s+Mops,\s+([0-9.]+)\s+GiB/s"
+)
+# [client] thread 0: 3.80 Mops, 0.11 GiB/s (qps=2)   (with --qps / --threads)
+THREAD_LINE_RE = re.compile(
+    r"\[client\]\s+thread\s+(\d+):\s+([0-9.]+)\s+Mops,\s+([0-9.]+)\s+GiB/s"
+    r"\s+\(qps=(\d+)\)"
+)
+# [client] inline on (max_inline_data=220)   (with --inline)
+INLINE_LINE_RE = re.compile(
+    r"\[client\]\s+inline\s+(on|off)\s+\(max_inline_data=(\d+)\)"
+)
+# [client] 4 SGEs per WR   (with --sge)
+SGE_LINE_RE = re.compile(r"\[client\]\s+(\d+)\s+SGEs per WR")
+# [client] READ: max_rd_atomic=16 max_dest_rd_atomic=16, effective window 16
+READ_LINE_RE = re.compile(
+    r"\[client\]\s+READ:\s+max_rd_atomic=(\d+)\s+max_dest_rd_atomic=(\d+),"
+    r"\s+effective window (\d+)"
+)
+# [client] interval 3: t=0.300 s, 391234 ops, 3.912 Mops, 0.119 GiB/s
+INTERVAL_LINE_RE = re.compile(
+    r"\[client\]\s+interval\s+(\d+):\s+t=([0-9.]+)\s+s,\s+(\d+)\s+ops,"
+    r"\s+([0-9.]+)\s+Mops,\s+([0-9.]+)\s+GiB/s"
+)
+# [client] stopped early after 1200000 of 50000000 WRs
+STOPPED_LINE_RE = re.compile(r"\[client\]\s+stopped early after (\d+) of")
+# [server] cpu: user=0.000120 s, sys=0.000310 s, host=0.020000 s, cycles=91230
+# (cycles with --cycles only)
+CPU_LINE_RE = re.compile(
+    r"\[(client|server)\]\s+cpu:\s+user=([0-9.]+) s,\s+sys=([0-9.]+) s,"
+    r"\s+host=([0-9.]+) s(?:,\s+cycles=(\d+))?"
+)
+# [server] recv done: 3.90 Mops, 0.12 GiB/s
+SERVER_LINE_RE = re.compile(
+    r"\[server\]\s+(?:GPU\s+)?recv\s+done:\s+([0-9.]+)\s+Mops,\s+([0-9.]+)\s+GiB/s"
+)
+
+
+class ResultError(RuntimeError):
+    """Output has no result, or a result that does not match SCHEMA."""
+
+
+def validate(obj):
+    """Check a result object against SCHEMA; returns it unchanged."""
+    if obj.get("schema") != SCHEMA_ID:
+        raise ResultError(f"unknown result schema {obj.get('schema')!r}")
+    role = obj.get("role")
+    for key, (types, required_for) in SCHEMA.items():
+        if key not in obj:
+            if role in required_for:
+                raise ResultError(f"{role} result missing {key!r}")
+            continue
+        # bool is an int subclass; only accept it where bool is meant
+        if not isinstance(obj[key], types) or (
+            isinstance(obj[key], bool) and types is not bool
+        ):
+            raise ResultError(f"{key!r} has type {type(obj[key]).__name__}")
+    return obj
+
+
+def parse_json(stdout, role="client"):
+    """The last --json result of `role` in stdout, or None."""
+    for line in stdout.splitlines()[::-1]:
+        line = line.strip()
+        if not line.startswith("{"):
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(obj, dict) and "schema" in obj and obj.get("role") == role:
+            return validate(obj)
+    return None
+
+
+def parse_text(stdout, role="client"):
+    """The result of a binary without --json, in the same shape, or None."""
+    pattern = CLIENT_LINE_RE if role == "client" else SERVER_LINE_RE
+    for line in stdout.splitlines()[::-1]:
+        m = pattern.search(line)
+        if m:
+            break
+    else:
+        return None
+    if role == "client":
+        mode, mops, gib = m.groups()
+        out = {"role": role, "mode": mode, "mops": float(mops), "gib": float(gib)}
+        hist = latency.parse_hist(stdout)
+        if hist:
+            out["latency"] = {"hist": sorted(hist.items())}
+        threads = [
+            {"thread": int(t), "mops": float(mo), "gib": float(g), "qps": int(q)}
+            for t, mo, g, q in THREAD_LINE_RE.findall(stdout)
+        ]
+        if threads:
+            out["per_thread"] = threads
+        m = INLINE_LINE_RE.search(stdout)
+        if m:
+            out["inline"] = m.group(1) == "on"
+            out["max_inline"] = int(m.group(2))
+        m = SGE_LINE_RE.search(stdout)
+        if m:
+            out["sge"] = int(m.group(1))
+        m = READ_LINE_RE.search(stdout)
+        if m:
+            keys = ("max_rd_atomic", "max_dest_rd_atomic", "effective_window")
+            out.update(zip(keys, map(int, m.groups())))
+        m = STOPPED_LINE_RE.search(stdout)
+        if m:
+            out["iters"] = int(m.group(1))
+            out["stopped"] = True
+        out.update(parse_cpu(stdout, role))
+        return out
+    mops, gib = m.groups()
+    out = {"role": role, "mode": "send", "mops": float(mops), "gib": float(gib)}
+    out.update(parse_cpu(stdout, role))
+    return out
+
+
+def parse(stdout, role="client"):
+    """The result of one run; raises ResultError if there is none."""
+    res = parse_json(stdout, role) or parse_text(stdout, role)
+    if res is None:
+        raise ResultError(f"Cannot parse {role} output for Mops/GiB/s")
+    return res
+
+
+def parse_cpu(stdout, role="client"):
+    """The CPU_KEYS a run of `role` reported, from its --json result or
+    its "cpu:" text line; {} if it reported none (older binaries). A
+    server in read or write mode prints no other result.
+    """
+    try:
+        res = parse_json(stdout, role)
+    except ResultError:
+        res = None
+    if res:
+        return {k: res[k] for k in CPU_KEYS if k in res}
+    for line in stdout.splitlines()[::-1]:
+        m = CPU_LINE_RE.search(line)
+        if m and m.group(1) == role:
+            user, sys_, host, cycles = m.groups()[1:]
+            out = dict(zip(CPU_KEYS, map(float, (user, sys_, host))))
+            if cycles is not None:
+                out["cycles"] = int(cycles)
+            return out
+    return {}
+
+
+def parse_interval(line):
+    """One --interval sample {"interval", "t", "sec", "ops", "mops", "gib"}
+    of a line of client output, or None.
+    """
+    line = line.strip()
+    if line.startswith("{"):
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            return None
+        if isinstance(obj, dict) and obj.get("role") == "interval":
+            return validate(obj)
+        return None
+    m = INTERVAL_LINE_RE.search(line)
+    if not m:
+        return None
+    n, t, ops, mops, gib = m.groups()
+    return {
+        "interval": int(n),
+        "t": float(t),
+        "ops": int(ops),
+        "mops": float(mops),
+        "gib": float(gib),
+    }
+
+
+def lat_hist(res):
+    """The latency histogram of a result as {lower_ns: count}, or None."""
+    hist = (res.get("latency") or {}).get("hist")
+    return {int(lo): int(n) for lo, n in hist} if hist else None
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Retry failed send-mode runs instead of leaving NaN holes in the grid.
+
+A send run usually fails with "RNR retry exceeded": the client sent faster
+than the server re-posted receives. A failed run is retried, with a pause
+that doubles each time, first with a deeper receive queue:
+
+    recv_depth * factor, * factor^2, ...   (recv_depth_steps times, up to
+                                            max_recv_depth)
+
+and then, keeping the deepest receive queue, with a smaller window:
+
+    window / 2, window / 4, ...            (window_steps times, down to
+                                            min_window)
+
+The row then records the recv_depth and window (`run_window`) of the run
+that succeeded, how many attempts it took and which retry it was.
+write/read runs are not retried.
+"""
+
+RETRY_DEFAULTS = {
+    "enabled": True,
+    "recv_depth_factor": 2,
+    "recv_depth_steps": 3,
+    "max_recv_depth": 16384,
+    "window_steps": 3,
+    "min_window": 1,
+    "backoff_seconds": 1.0,
+}
+
+
+def settings(*layers):
+    """Merge retry settings: defaults, then each layer in order."""
+    cfg = dict(RETRY_DEFAULTS)
+    for layer in layers:
+        unknown = set(layer or {}) - set(RETRY_DEFAULTS)
+        if unknown:
+            raise ValueError(f"unknown retry setting(s): {', '.join(sorted(unknown))}")
+        cfg.update(layer or {})
+    return cfg
+
+
+def variants(point, cfg):
+    """The (recv_depth, window) pairs to try after the point itself failed."""
+    if not cfg["enabled"] or point["mode"] != "send":
+        return []
+    out = []
+    depth, window = point["recv_depth"], point["window"]
+    for _ in range(cfg["recv_depth_steps"]):
+        deeper = min(cfg["max_recv_depth"], depth * cfg["recv_depth_factor"])
+        if deeper == depth:
+            break
+        depth = deeper
+        out.append((depth, window))
+    for _ in range(cfg["window_steps"]):
+        smaller = max(cfg["min_window"], window // 2)
+        if smaller == window:
+            break
+        window = smaller
+        out.append((depth, window))
+    return out
+
+
+def describe(point, recv_depth, window):
+    """What a retry changed, e.g. "recv_depth=1024,window=32"."""
+    parts = []
+    if recv_depth != point["recv_depth"]:
+        parts.append(f"recv_depth={recv_depth}")
+    if window != point["window"]:
+        parts.append(f"window={window}")
+    return ",".join(parts)
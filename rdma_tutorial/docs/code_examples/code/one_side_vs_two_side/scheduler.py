@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Run independent sweep points in parallel over a pool of slots.
+
+A slot is one (server, port, NICs) combination, declared in the spec:
+
+    [[slot]]
+    server_ip = "10.0.0.2"
+    port = 9000
+    nics = ["client:mlx5_0", "server:mlx5_0"]
+
+Any top-level spec key (client, server, gpu, launcher, ...) may be
+overridden per slot. Every slot gets one worker thread. Before a point
+runs, the worker takes a lock on each NIC of its slot, so two points never
+share a NIC at the same time even when slots overlap. Slots without
+`nics` are keyed by their server_ip. After an error or Ctrl-C no worker
+takes another point; the points already running finish first.
+"""
+
+import queue
+import threading
+
+
+def slot_specs(spec):
+    """One spec per slot: the spec with the slot's overrides applied."""
+    out = []
+    for slot in spec["slot"]:
+        if "experiment" in slot or "slot" in slot:
+            raise ValueError("a slot cannot override experiment/slot")
+        s = {**spec, **slot}
+        if "server_ip" in slot and "server_host" not in slot:
+            s["server_host"] = slot["server_ip"]
+        s["nics"] = list(slot.get("nics") or [s["server_ip"]])
+        s["slot_name"] = slot.get("name") or f"{s['server_ip']}:{s['port']}"
+        out.append(s)
+    if len(out) > 1 and any(s["launcher"] == "manual" for s in out):
+        raise ValueError("parallel slots need an unattended launcher, not 'manual'")
+
+    ports = {}
+    for s in out:
+        used = [s["port"], s["port"] + 1] if s["daemon"] else [s["port"]]
+        for port in used:
+            key = (s["server_host"], port)
+            if key in ports:
+                raise ValueError(
+                    f"slots {ports[key]} and {s['slot_name']} both use port {port} "
+                    f"on {s['server_host']}"
+                )
+            ports[key] = s["slot_name"]
+    return out
+
+
+def run_parallel(spec, points, run_point, make_launcher):
+    """Run points over the spec's slots; returns rows in point order.
+
+    run_point(slot_spec, launcher, point) -> row
+    make_launcher(slot_spec) -> launcher
+    """
+    slots = slot_specs(spec)
+    nic_locks = {nic: threading.Lock() for s in slots for nic in s["nics"]}
+    todo = queue.Queue()
+    for i, point in enumerate(points):
+        todo.put((i, point))
+    rows = [None] * len(points)
+    errors = []
+    stop = threading.Event()
+
+    def worker(slot):
+        # Locks are always taken in sorted order so overlapping slots cannot deadlock.
+        locks = [nic_locks[n] for n in sorted(set(slot["nics"]))]
+        launcher = make_launcher(slot)
+        try:
+            while not stop.is_set():
+                try:
+                    i, point = todo.get_nowait()
+                except queue.Empty:
+                    return
+                for lock in locks:
+                    lock.acquire()
+                try:
+                    if stop.is_set():
+                        return  # stopped while waiting for the NICs
+                    print(f"\n[slot {slot['slot_name']}] point {i + 1}/{len(points)}")
+                    rows[i] = run_point(slot, launcher, point)
+                finally:
+                    for lock in reversed(locks):
+                        lock.release()
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            launcher.close()
+
+    threads = [
+        threading.Thread(target=worker, args=(slot,), name=slot["slot_name"])
+        for slot in slots
+    ]
+    print(f"Running {len(points)} points on {len(slots)} slots")
+    for t in threads:
+        t.start()
+    try:
+        for t in threads:
+            t.join()
+    except KeyboardInterrupt:
+        stop.set()
+        print("\nInterrupted, waiting for the running points ...")
+        for t in threads:
+            t.join()
+        raise
+    if errors:
+        raise errors[0]
+    return rows
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""Start / stop bench_server for each sweep point.
+
+A launcher wraps one server run in a context manager:
+
+    with launcher.running(server_command(...)):
+        run_client(...)
+
+On enter the server is started and we wait until it prints
+"[server] listening on"; on exit we wait for it to finish and kill it
+if it does not.
+
+DaemonLauncher instead keeps one `bench_server --daemon` alive for the
+whole sweep and sends each point over its control port (bench_control.py).
+
+running(cmd, prefix) starts the server under a prefix such as numactl
+(numa.py), and sysfs(root) reads the server host's sysfs (sysfs.py);
+None where the launcher cannot run commands there.
+"""
+
+import queue
+import shlex
+import subprocess
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+import sysfs
+from bench_control import BenchControl
+
+READY_MARKER = "[server] listening on"
+
+# Default remote template; {host} and {cmd} are substituted.
+# -tt gives the remote server a tty, so killing ssh also kills bench_server.
+SSH_TEMPLATE = "ssh -tt {host} {cmd}"
+
+
+def server_command(
+    bench_server,
+    port,
+    mode,
+    msg,
+    iters,
+    recv_depth=None,
+    gpu=None,
+    qps=None,
+    cycles=False,
+):
+    """Build the bench_server argv for one point."""
+    if mode not in ("write", "read", "send"):
+        raise ValueError(f"Unknown mode: {mode}")
+    cmd = [
+        bench_server,
+        str(port),
+        "--mode",
+        mode,
+        "--msg",
+        str(msg),
+        "--iters",
+        str(iters),
+    ]
+    # read/write modes do not need pre-posted recv WRs; server only provides RDMA buffers
+    if mode == "send" and recv_depth is not None:
+        cmd += ["--recv-depth", str(recv_depth)]
+    if gpu is not None:
+        cmd += ["--gpu", str(gpu)]
+    # The server accepts one connection per client QP (client --qps)
+    if qps is not None and qps > 1:
+        cmd += ["--qps", str(qps)]
+    # Last: the only flag without a value (DaemonLauncher pairs the others)
+    if cycles:
+        cmd += ["--cycles"]
+    return cmd
+
+
+class ManualLauncher:
+    """Print the server command and wait for ENTER (the original workflow)."""
+
+    @contextmanager
+    def running(self, cmd, prefix=()):
+        print("\n========================================")
+        print("Run on SERVER host (manual):")
+        print(f"  {shlex.join([*prefix, *cmd])}")
+        print("After the server is up, press Enter here to continue...")
+        input("Press ENTER to run client...")
+        yield None
+
+    def sysfs(self, root):
+        return None
+
+    def close(self):
+        pass
+
+
+class NullLauncher:
+    """Stand-in that starts nothing; the server is managed elsewhere."""
+
+    @contextmanager
+    def running(self, cmd, prefix=()):
+        yield None
+
+    def sysfs(self, root):
+        return None
+
+    def close(self):
+        pass
+
+
+class LocalLauncher:
+    """Run bench_server as a local subprocess."""
+
+    def __init__(self, ready_timeout=30.0, exit_timeout=10.0, cwd=None):
+        self.ready_timeout = ready_timeout
+        self.exit_timeout = exit_timeout
+        self.cwd = cwd
+        self.last_output = []
+
+    def argv(self, cmd):
+        return list(cmd)
+
+    def _spawn(self, cmd):
+        return subprocess.Popen(
+            self.argv(cmd),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+            cwd=self.cwd,
+        )
+
+    def _pump(self, proc, lines):
+        """Reader thread: forward server output into a queue."""
+        for line in proc.stdout:
+            lines.put(line.rstrip("\n"))
+        lines.put(None)
+
+    def _wait_ready(self, proc, lines):
+        deadline = time.monotonic() + self.ready_timeout
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise TimeoutError(
+                    f"bench_server not ready after {self.ready_timeout}s"
+                )
+            try:
+                line = lines.get(timeout=left)
+            except queue.Empty:
+                continue
+            if line is None:
+                raise RuntimeError(
+                    "bench_server exited before listening (code "
+                    f"{proc.wait()}):\n" + "\n".join(self.last_output)
+                )
+            self.last_output.append(line)
+            if READY_MARKER in line:
+                print("server:", line)
+                return
+
+    def _stop(self, proc):
+        try:
+            proc.wait(timeout=self.exit_timeout)
+        except subprocess.TimeoutExpired:
+            print("!! bench_server did not exit, terminating it")
+            proc.terminate()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+    @contextmanager
+    def running(self, cmd, prefix=()):
+        cmd = [*prefix, *cmd]
+        self.last_output = []
+        print("Starting server:", shlex.join(self.argv(cmd)))
+        proc = self._spawn(cmd)
+        lines = queue.Queue()
+        reader = threading.Thread(target=self._pump, args=(proc, lines), daemon=True)
+        reader.start()
+        try:
+            self._wait_ready(proc, lines)
+            yield proc
+        finally:
+            self._stop(proc)
+            reader.join(timeout=1)
+            while True:
+                try:
+                    line = lines.get_nowait()
+                except queue.Empty:
+                    break
+                if line is not None:
+                    self.last_output.append(line)
+            if self.last_output:
+                print("server stdout:\n", "\n".join(self.last_output))
+
+    def sysfs(self, root):
+        return sysfs.host(root)
+
+    def close(self):
+        pass
+
+
+class RemoteLauncher(LocalLauncher):
+    """Run bench_server through a command template, e.g. over ssh."""
+
+    def __init__(self, host, template=SSH_TEMPLATE, **kwargs):
+        super().__init__(**kwargs)
+        self.host = host
+        self.template = template
+
+    def argv(self, cmd):
+        out = []
+        for tok in shlex.split(self.template):
+            if tok == "{cmd}":
+                out.append(shlex.join(cmd))
+            else:
+                out.append(tok.format(host=self.host, cmd=shlex.join(cmd)))
+        return out
+
+    def sysfs(self, root):
+        return sysfs.host(root, self.argv, self.host)
+
+
+class DaemonLauncher:
+    """Drive one long-lived `bench_server --daemon` for all points.
+
+    The daemon itself is started (once) through `base`, so it can be run
+    locally, over ssh or by hand. The buffer memory is chosen when the
+    daemon starts, so a point's --gpu is passed to the daemon; a server
+    without GPU support then refuses to start rather than measuring host
+    memory. If a run fails the daemon is torn down and restarted for the
+    next point, and so it is when the prefix changes (another NUMA
+    placement) or the GPU does.
+    """
+
+    def __init__(self, base, host, ctrl_port=None, run_timeout=60.0):
+        self.base = base
+        self.host = host
+        self.ctrl_port = ctrl_port
+        self.run_timeout = run_timeout
+        self.ctrl = None
+        self.prefix = ()
+        self.gpu = None
+        self.last_result = None
+        self._stack = None
+
+    def _start(self, cmd, prefix, gpu):
+        port = int(cmd[1])
+        ctrl_port = self.ctrl_port or port + 1
+        daemon_cmd = [cmd[0], str(port), "--daemon", "--ctrl-port", str(ctrl_port)]
+        if gpu is not None:
+            daemon_cmd += ["--gpu", gpu]
+        self._stack = ExitStack()
+        self._stack.enter_context(self.base.running(daemon_cmd, prefix))
+        self.prefix = tuple(prefix)
+        self.gpu = gpu
+        self.ctrl = BenchControl(self.host, ctrl_port, run_timeout=self.run_timeout)
+
+    @contextmanager
+    def running(self, cmd, prefix=()):
+        # cmd is a server_command() argv: [server, port, --flag, value, ...]
+        opts = dict(zip(cmd[2::2], cmd[3::2]))
+        gpu = opts.get("--gpu")
+        if self.ctrl is not None and (tuple(prefix), gpu) != (self.prefix, self.gpu):
+            self.close()
+        if self.ctrl is None:
+            self._start(cmd, prefix, gpu)
+        self.last_result = None
+        try:
+            self.ctrl.start_run(
+                opts["--mode"],
+                opts["--msg"],
+                opts["--iters"],
+                recv_depth=opts.get("--recv-depth"),
+                qps=opts.get("--qps"),
+                cycles="--cycles" in cmd,
+            )
+        except (OSError, RuntimeError):
+            self.close()
+            raise
+        try:
+            yield self.ctrl
+        except BaseException:
+            self.close()
+            raise
+        try:
+            self.last_result = self.ctrl.wait_done()
+            print("server:", self.last_result)
+        except (OSError, RuntimeError) as e:
+            print("!! bench_server daemon failed, restarting it for the next point:", e)
+            self.close()
+
+    def sysfs(self, root):
+        return self.base.sysfs(root)
+
+    def close(self):
+        if self.ctrl is not None:
+            self.ctrl.close()
+            self.ctrl = None
+        if self._stack is not None:
+            self._stack.close()
+            self._stack = None
+
+
+LAUNCHERS = ("manual", "local", "ssh", "none")
+
+
+def make_launcher(
+    kind, host=None, template=SSH_TEMPLATE, daemon=False, ctrl_host=None, **kwargs
+):
+    """Create a launcher by name (one of LAUNCHERS).
+
+    With daemon=True the server is started once in daemon mode and driven
+    over its control port on `ctrl_host` (default: `host`).
+    """
+    if daemon:
+        base = make_launcher(kind, host, template, **kwargs)
+        return DaemonLauncher(base, ctrl_host or host)
+    if kind == "manual":
+        return ManualLauncher()
+    if kind == "local":
+        return LocalLauncher(**kwargs)
+    if kind == "ssh":
+        if not host:
+            raise ValueError("ssh launcher needs a host")
+        return RemoteLauncher(host, template=template, **kwargs)
+    if kind == "none":
+        return NullLauncher()
+    raise ValueError(f"Unknown launcher: {kind} (choose from {', '.join(LAUNCHERS)})")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Measure a point over its steady state and stop the run once it settles.
+
+A run's single Mops number includes the warm-up: connection setup is
+over, but caches, TLBs and the NIC's QP context cache still fill during
+the first intervals. With `steady = true` in an experiment bench_client
+runs with --interval and prints a sample every `interval_ms`, which the
+driver reads as they come:
+
+1. the first `warmup` intervals are always dropped;
+2. the steady state starts with the first `window` intervals in a row
+   whose relative stddev is at most `cv`; everything before is warm-up;
+3. once there are `min_steady` steady intervals and the 95% confidence
+   interval of their mean is within `ci` (relative) of it, the driver
+   sends the client SIGUSR1. It finishes the WRs in flight and exits.
+
+The point's Mops and GiB/s are then the mean over the steady intervals,
+and `iters` becomes a cap on the run. A run that ends before a steady
+state is found keeps its whole-run result.
+"""
+
+import signal
+
+import repeats
+import results
+import supervisor
+
+STEADY_DEFAULTS = {
+    "interval_ms": 100,
+    "warmup": 1,
+    "window": 5,
+    "cv": 0.05,
+    "ci": 0.01,
+    "min_steady": 10,
+}
+
+# Per run; sweep.py CSV columns
+STEADY_FIELDS = ("warmup_s", "steady_s", "stopped_early")
+
+
+def settings(*layers):
+    """Merge steady-state settings: defaults, then each layer in order.
+
+    A layer may be `true` (an experiment's `steady = true`).
+    """
+    cfg = dict(STEADY_DEFAULTS)
+    for layer in layers:
+        if not isinstance(layer, dict):
+            continue
+        unknown = set(layer) - set(STEADY_DEFAULTS)
+        if unknown:
+            raise ValueError(f"unknown steady setting(s): {', '.join(sorted(unknown))}")
+        cfg.update(layer)
+    if cfg["interval_ms"] < 1 or cfg["window"] < 2:
+        raise ValueError("steady needs interval_ms >= 1 and window >= 2")
+    return cfg
+
+
+def _cv(vals):
+    s = repeats.summarize(vals)
+    return s["std"] / s["mean"] if s["mean"] else float("inf")
+
+
+class Detector:
+    """Interval samples of one run, split into warm-up and steady state."""
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.samples = []
+        self.start = None  # index of the first steady sample
+
+    def add(self, sample):
+        """Take one sample (results.parse_interval); True once settled."""
+        self.samples.append(sample)
+        if self.start is None:
+            first = len(self.samples) - self.cfg["window"]
+            mops = [s["mops"] for s in self.samples[first:]]
+            if first >= self.cfg["warmup"] and _cv(mops) <= self.cfg["cv"]:
+                self.start = first
+        return self.settled()
+
+    def steady(self):
+        return self.samples[self.start :] if self.start is not None else []
+
+    def settled(self):
+        mops = [s["mops"] for s in self.steady()]
+        if len(mops) < max(2, self.cfg["min_steady"]):
+            return False
+        s = repeats.summarize(mops)
+        return s["ci_hi"] - s["mean"] <= self.cfg["ci"] * s["mean"]
+
+    def summary(self, res):
+        """mops / gib over the steady state, and the STEADY_FIELDS of the
+        run; res is the client's final result.
+        """
+        out = {"stopped_early": int(bool(res.get("stopped")))}
+        steady = self.steady()
+        if not steady:
+            print(
+                f"No steady state in {len(self.samples)} intervals; "
+                "keeping the whole-run result"
+            )
+            return {**out, "warmup_s": None, "steady_s": None}
+        # Weight each interval by its length: ops over time
+        warmup = self.samples[self.start - 1]["t"] if self.start else 0.0
+        times = [warmup] + [s["t"] for s in steady]
+        dts = [b - a for a, b in zip(times, times[1:])]
+        sec = sum(dts)
+        mops = sum(s["mops"] * dt for s, dt in zip(steady, dts)) / sec
+        gib = sum(s["gib"] * dt for s, dt in zip(steady, dts)) / sec
+        print(
+            f"Steady after {warmup:.2f} s: {mops:.3f} Mops over {sec:.2f} s "
+            f"({len(steady)} intervals; whole run {res['mops']:.3f} Mops"
+            + (", stopped early)" if out["stopped_early"] else ")")
+        )
+        return {**out, "mops": mops, "gib": gib, "warmup_s": warmup, "steady_s": sec}
+
+
+def run(cmd, cfg, timeout=None, watch=None):
+    """Run bench_client (with --interval in cmd) under the supervisor,
+    feed its samples to a Detector as they arrive and stop the client
+    once they settle.
+
+    Returns (supervisor.run() result, Detector).
+    """
+    det = Detector(cfg)
+    stop = []
+
+    def on_line(line):
+        sample = results.parse_interval(line)
+        if sample and det.add(sample) and not stop:
+            stop.append(True)
+            return signal.SIGUSR1
+        return None
+
+    return supervisor.run(cmd, timeout, on_line, watch), det
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""Append-only columnar store of sweep results (Parquet, needs pyarrow).
+
+Besides its CSV, every sweep appends its rows to one dataset shared by all
+specs, by default `results/` next to the CSVs:
+
+    results/nic=<NIC model>/host=<client host>/date=<YYYY-MM-DD>/<time>-<id>.parquet
+
+Files are only ever added, never rewritten. Each row is the CSV row plus
+the metadata of META_FIELDS: binaries and their hashes, NIC model and
+firmware, host or GPU memory and GPU id, IP family, git commit and the
+commit timestamp, so a row says what it measured without relying on the
+file name. load_results() reads across all files and filters on any
+column; filters on nic/host/date skip the other directories without
+opening them.
+
+    python3 store.py                       # row counts per nic/host/date
+    python3 store.py nic=ConnectX-6 mode=send msg=4096
+"""
+
+import datetime
+import ipaddress
+import socket
+import subprocess
+import sys
+import uuid
+from pathlib import Path
+
+import checkpoint
+
+DEFAULT_STORE = "results"
+
+PARTITIONS = ("nic", "host", "date")
+
+META_FIELDS = [
+    "timestamp",
+    "spec",
+    "source",
+    "client_bin",
+    "server_bin",
+    "client_hash",
+    "server_hash",
+    "nic_model",
+    "firmware",
+    "memory",
+    "gpu",
+    "server_ip",
+    "server_host",
+    "ip_family",
+    "git_commit",
+]
+
+SYSFS_IB = "/sys/class/infiniband"
+
+
+def _read(path):
+    try:
+        return Path(path).read_text().strip() or None
+    except OSError:
+        return None
+
+
+def nic_info(dev=None, sysfs=SYSFS_IB):
+    """(model, firmware) of an RDMA device, the first one if dev is None."""
+    root = Path(sysfs)
+    if dev is None:
+        devs = sorted(p.name for p in root.iterdir()) if root.is_dir() else []
+        if not devs:
+            return None, None
+        dev = devs[0]
+    base = root / dev
+    model = _read(base / "hca_type") or _read(base / "board_id") or dev
+    return model, _read(base / "fw_ver")
+
+
+def ip_family(addr):
+    try:
+        return f"ipv{ipaddress.ip_address(addr).version}"
+    except ValueError:
+        pass
+    try:
+        fam = socket.getaddrinfo(addr, None)[0][0]
+    except OSError:
+        return None
+    return "ipv6" if fam == socket.AF_INET6 else "ipv4"
+
+
+def git_commit():
+    """Commit of the checkout the drivers run from ("-dirty" if modified)."""
+    try:
+        out = subprocess.run(
+            ["git", "describe", "--always", "--dirty", "--abbrev=12"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        )
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def metadata(spec):
+    """META_FIELDS (except timestamp) for rows measured with this spec.
+
+    NIC model and firmware are read from sysfs (under the spec's `sysfs`
+    root) on this (client) host, from `ib_dev` or the first device; a
+    [meta] table in the spec overrides any field, e.g. for a NIC that only
+    the server has.
+    """
+    root = spec.get("sysfs") or "/sys"
+    model, fw = nic_info(spec.get("ib_dev"), f"{root}/class/infiniband")
+    meta = {
+        "spec": spec["name"],
+        "source": str(spec["result_csv"]),
+        "client_bin": Path(spec["client"]).name,
+        "server_bin": Path(spec["server"]).name,
+        "client_hash": checkpoint.file_digest(spec["client"])[:16],
+        "server_hash": checkpoint.file_digest(spec["server"])[:16],
+        "nic_model": model,
+        "firmware": fw,
+        "memory": "host" if spec["gpu"] is None else "gpu",
+        "gpu": spec["gpu"],
+        "server_ip": spec["server_ip"],
+        "server_host": spec["server_host"],
+        "ip_family": ip_family(spec["server_ip"]),
+        "git_commit": git_commit(),
+        "host": socket.gethostname(),
+    }
+    meta.update(spec.get("meta") or {})
+    return meta
+
+
+def now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _part(value):
+    """A partition directory value: no '/', '=' or spaces."""
+    text = str(value) if value not in (None, "") else "unknown"
+    return "".join(c if c.isalnum() or c in "._-" else "_" for c in text)
+
+
+def append(store, rows, meta):
+    """Add rows (CSV rows with a "timestamp") to the store; returns the files.
+
+    Rows go to one new file per nic/host/date partition. Values that are
+    not scalars (e.g. latency histograms) are left out.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    groups = {}
+    for row in rows:
+        rec = {**meta, **row}
+        rec["timestamp"] = rec.get("timestamp") or now()
+        key = (
+            _part(rec.pop("nic", None) or rec.get("nic_model")),
+            _part(rec.pop("host", None)),
+            rec["timestamp"].date().isoformat(),
+        )
+        rec = {
+            k: v
+            for k, v in rec.items()
+            if v is None or isinstance(v, (str, int, float, datetime.datetime))
+        }
+        groups.setdefault(key, []).append(rec)
+
+    written = []
+    for key, recs in groups.items():
+        part_dir = Path(store).joinpath(*(f"{k}={v}" for k, v in zip(PARTITIONS, key)))
+        part_dir.mkdir(parents=True, exist_ok=True)
+        stamp = recs[0]["timestamp"].strftime("%Y%m%dT%H%M%S")
+        path = part_dir / f"{stamp}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp = path.with_name(path.name + ".tmp")
+        # from_pylist takes the columns of the first row only
+        keys = list(dict.fromkeys(k for rec in recs for k in rec))
+        table = pa.Table.from_pylist([{k: rec.get(k) for k in keys} for rec in recs])
+        pq.write_table(table, tmp)
+        tmp.replace(path)
+        written.append(path)
+    return written
+
+
+def dataset(store=DEFAULT_STORE):
+    """The store as a pyarrow dataset, or None if it holds no files.
+
+    Columns added over time are merged: older files read as null there.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    files = sorted(str(p) for p in Path(store).rglob("*.parquet"))
+    if not files:
+        return None
+    schema = pa.unify_schemas(
+        [pq.read_schema(f) for f in files], promote_options="permissive"
+    )
+    part_schema = pa.schema([(k, pa.string()) for k in PARTITIONS])
+    for field in part_schema:
+        schema = schema.append(field)
+    return ds.dataset(
+        files,
+        schema=schema,
+        format="parquet",
+        partitioning=ds.partitioning(part_schema, flavor="hive"),
+        partition_base_dir=str(store),
+    )
+
+
+def load_results(store=DEFAULT_STORE, columns=None, since=None, until=None, **filters):
+    """Rows of the store as a DataFrame, filtered on any column.
+
+    A filter value may be a list (any of). since/until bound the date
+    partition (inclusive, "YYYY-MM-DD"):
+
+        load_results(nic="ConnectX-6", mode=["write", "send"], since="2026-01-01")
+    """
+    import pandas as pd
+    import pyarrow.dataset as ds
+
+    data = dataset(store)
+    if data is None:
+        return pd.DataFrame(columns=columns or [])
+    expr = None
+    conds = []
+    for key, value in filters.items():
+        if key not in data.schema.names:
+            raise ValueError(f"unknown column {key!r} in {store}")
+        field = ds.field(key)
+        if isinstance(value, (list, tuple, set)):
+            conds.append(field.isin(list(value)))
+        else:
+            conds.append(field == value)
+    if since is not None:
+        conds.append(ds.field("date") >= str(since))
+    if until is not None:
+        conds.append(ds.field("date") <= str(until))
+    for cond in conds:
+        expr = cond if expr is None else expr & cond
+    return data.to_table(columns=columns, filter=expr).to_pandas()
+
+
+def parse_value(text):
+    for conv in (int, float):
+        try:
+            return conv(text)
+        except ValueError:
+            pass
+    return text
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    store = DEFAULT_STORE
+    if argv and "=" not in argv[0]:
+        store, argv = argv[0], argv[1:]
+    filters = {}
+    for arg in argv:
+        key, _, value = arg.partition("=")
+        filters[key] = parse_value(value)
+    df = load_results(store, **filters)
+    if df.empty:
+        print(f"No rows in {store} match.")
+        return 1
+    if not filters:
+        print(df.groupby(list(PARTITIONS)).size().to_string())
+    else:
+        cols = ["nic", "host", "date", "experiment", "mode", "msg", "window"]
+        cols = [c for c in cols + ["mops", "gib"] if c in df]
+        print(df[cols].to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Run bench_client under a deadline so a hung run cannot stall the sweep.
+
+A QP stuck in error, or a server that never pre-posted enough receives,
+leaves bench_client waiting for completions forever. run() starts the
+client with asyncio and reads its stdout and stderr at the same time, so
+neither pipe can fill up and block it. Each stdout line can be handed to
+a callback as it arrives (steady.py). The client runs in a session of
+its own; it is killed with everything it started (SIGTERM, then SIGKILL)
+and reaped when:
+
+- it is not done by its deadline. The deadline comes from the throughput
+  the point is expected to reach:
+
+      grace_seconds + slack * iters / expected rate
+
+  The expected rate is the calibration rate with `iters = "auto"`.
+  Otherwise it is the lower of `mops` and `gbps` / msg, a deliberately
+  low guess;
+- watch() returns a reason, e.g. a local bench_server exited with an
+  error while the client still waits for it (server_exit()).
+
+sweep.py records a timed-out run like a failed one (NaN, retried in send
+mode) and counts it in the `timeouts` column. A `[timeout]` table, or
+`timeout = {...}` in an experiment, overrides TIMEOUT_DEFAULTS.
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+
+TIMEOUT_DEFAULTS = {
+    "mops": 0.5,
+    "gbps": 5.0,
+    "slack": 4.0,
+    "grace_seconds": 15.0,
+    "kill_seconds": 5.0,
+}
+
+# How often watch() is asked, seconds
+WATCH_PERIOD = 0.2
+# Longest output line read; --latency histograms are long
+LINE_LIMIT = 1 << 20
+
+
+def settings(*layers):
+    """Merge timeout settings: defaults, then each layer in order."""
+    cfg = dict(TIMEOUT_DEFAULTS)
+    for layer in layers:
+        unknown = set(layer or {}) - set(TIMEOUT_DEFAULTS)
+        if unknown:
+            raise ValueError(
+                f"unknown timeout setting(s): {', '.join(sorted(unknown))}"
+            )
+        cfg.update(layer or {})
+    if min(cfg["mops"], cfg["gbps"], cfg["slack"]) <= 0:
+        raise ValueError("timeout mops, gbps and slack must be positive")
+    return cfg
+
+
+def deadline(cfg, msg, iters, mops=None):
+    """Seconds a run of iters WRs of msg bytes may take; mops is the
+    expected rate if known.
+    """
+    if not mops:
+        mops = min(cfg["mops"], cfg["gbps"] * 1e3 / (8 * msg))
+    return cfg["grace_seconds"] + cfg["slack"] * iters / (mops * 1e6)
+
+
+def server_exit(server):
+    """watch() for a server started by a LocalLauncher (a Popen): the
+    reason to stop the client once the server has failed, else None.
+    """
+    if not isinstance(server, subprocess.Popen):
+        return None
+
+    def watch():
+        code = server.poll()
+        return f"bench_server exited with code {code}" if code else None
+
+    return watch
+
+
+async def _pump(stream, sink, on_line, proc):
+    while True:
+        line = await stream.readline()
+        if not line:
+            return
+        text = line.decode(errors="replace")
+        sink.append(text)
+        sig = on_line(text) if on_line else None
+        if sig and proc.returncode is None:
+            proc.send_signal(sig)
+
+
+async def _watch(watch):
+    while True:
+        await asyncio.sleep(WATCH_PERIOD)
+        reason = watch()
+        if reason:
+            return reason
+
+
+def _signal_group(proc, sig):
+    try:
+        os.killpg(proc.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+async def _kill(proc, grace):
+    """SIGTERM to the client's process group, SIGKILL after grace seconds."""
+    _signal_group(proc, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(proc.wait(), grace)
+    except asyncio.TimeoutError:
+        _signal_group(proc, signal.SIGKILL)
+        await proc.wait()
+
+
+async def _supervise(cmd, timeout, on_line, watch, grace):
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        limit=LINE_LIMIT,
+        start_new_session=True,
+    )
+    out, err = [], []
+    run = asyncio.ensure_future(
+        asyncio.gather(
+            _pump(proc.stdout, out, on_line, proc),
+            _pump(proc.stderr, err, None, proc),
+            proc.wait(),
+        )
+    )
+    tasks = {run}
+    watcher = asyncio.ensure_future(_watch(watch)) if watch else None
+    if watcher:
+        tasks.add(watcher)
+    try:
+        done, _ = await asyncio.wait(
+            tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+    except asyncio.CancelledError:
+        # Ctrl-C: the client's session does not get the terminal's SIGINT
+        _signal_group(proc, signal.SIGKILL)
+        raise
+    killed, timed_out = None, False
+    if run not in done:
+        timed_out = watcher not in done
+        killed = f"timed out after {timeout:.3g}s" if timed_out else watcher.result()
+        await _kill(proc, grace)
+        await run  # the pipes are closed now
+    if watcher:
+        watcher.cancel()
+    result = subprocess.CompletedProcess(
+        cmd, proc.returncode, "".join(out), "".join(err)
+    )
+    result.killed = killed
+    result.timed_out = timed_out
+    return result
+
+
+def run(cmd, timeout=None, on_line=None, watch=None, cfg=None):
+    """Run cmd to completion, or kill it at the deadline.
+
+    on_line(line) sees each stdout line as it arrives and may return a
+    signal to send to the process. Returns a subprocess.CompletedProcess
+    with two more attributes: `killed` (why the supervisor killed it, or
+    None) and `timed_out`.
+    """
+    grace = (cfg or TIMEOUT_DEFAULTS)["kill_seconds"]
+    return asyncio.run(_supervise(cmd, timeout, on_line, watch, grace))
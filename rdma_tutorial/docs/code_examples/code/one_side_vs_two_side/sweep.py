@@ -0,0 +1,1464 @@
+#!/usr/bin/env python3
+"""Declarative sweep engine for bench_client / bench_server.
+
+An experiment spec (TOML, or YAML if PyYAML is installed) names the hosts,
+the binaries and one or more parameter grids; every grid is expanded to the
+cartesian product msg x window x mode. See specs/*.toml, one per result CSV
+in this directory, and specs/mock.toml for a run against simulated
+binaries (mock_bench.py). Each finished point is appended to the spec's
+CSV and to the Parquet store (store.py). The experiment options and the
+modules behind them are described in one_sided_vs_two_sided.md.
+
+    python3 sweep.py specs/msg_sweep_w64.toml points   # list the points
+    python3 sweep.py specs/msg_sweep_w64.toml run --launcher local
+    python3 sweep.py specs/msg_sweep_w64.toml run --resume
+    python3 sweep.py specs/msg_sweep_w64.toml plot
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import math
+import sys
+import time
+from pathlib import Path
+
+import adaptive
+import checkpoint
+import counters
+import cpu
+import knee
+import latency
+import numa
+import optimize
+import repeats
+import results
+import retry
+import scheduler
+import steady
+import store
+import supervisor
+import sysfs
+from server_launcher import LAUNCHERS, make_launcher, server_command
+
+FIELDNAMES = [
+    "experiment",
+    "mode",
+    "msg",
+    "window",
+    "iters",
+    "mops",
+    "gib",
+    *repeats.STAT_FIELDS,
+    *latency.LAT_FIELDS,
+    "recv_depth",
+    "run_window",
+    "attempts",
+    "timeouts",
+    "retry",
+    "qps",
+    "threads",
+    "shared_cq",
+    "batch",
+    "signal",
+    "inline",
+    "sge",
+    "numa",
+    *numa.NODE_FIELDS,
+    *results.LIMIT_FIELDS,
+    *steady.STEADY_FIELDS,
+    *counters.COUNTER_FIELDS,
+    *cpu.CPU_FIELDS,
+    "thread_mops",
+    "fingerprint",
+]
+
+SPEC_DEFAULTS = {
+    "port": 9000,
+    "launcher": "manual",
+    "daemon": False,
+    "gpu": None,
+    "json": False,
+    "store": store.DEFAULT_STORE,
+    "sysfs": "/sys",
+    "sysfs_seed": None,
+    "ib_dev": None,
+    "server_ib_dev": None,
+}
+
+EXPERIMENT_DEFAULTS = {
+    "modes": ["write", "send", "read"],
+    "recv_depth": "auto",
+    "repeats": 1,
+    "latency": False,
+    "qps": 1,
+    "threads": 1,
+    "shared_cq": False,
+    "batch": 1,
+    "signal": 1,
+    "inline": False,
+    "sge": 1,
+    "numa": "none",
+    "steady": False,
+    "counters": False,
+    "overlay": None,
+    "cycles": False,
+    "plot": "msg",
+}
+
+PLOT_KINDS = ("msg", "window", "bar", "scaling", "doorbell", "inline", "numa", "cpu")
+
+# Client settings besides the grid's msg/window, with their defaults. All
+# but shared_cq may be lists, swept like msg and window. numa places the
+# server too and is not a bench_client flag.
+CLIENT_OPTIONS = {
+    "qps": 1,
+    "threads": 1,
+    "shared_cq": False,
+    "batch": 1,
+    "signal": 1,
+    "inline": False,
+    "sge": 1,
+    "numa": "none",
+}
+GRID_OPTIONS = [k for k in CLIENT_OPTIONS if k != "shared_cq"]
+
+
+# ================== spec ==================
+
+
+def load_spec(path):
+    """Read a TOML/YAML spec and fill in defaults."""
+    path = Path(path)
+    if path.suffix in (".yaml", ".yml"):
+        import yaml
+
+        with open(path) as f:
+            raw = yaml.safe_load(f)
+    else:
+        import tomllib
+
+        with open(path, "rb") as f:
+            raw = tomllib.load(f)
+
+    spec = dict(SPEC_DEFAULTS)
+    spec.update(raw)
+    spec["path"] = str(path)
+    for key in ("name", "server_ip", "client", "server", "result_csv"):
+        if key not in spec:
+            raise ValueError(f"{path}: missing required key '{key}'")
+    spec.setdefault("server_host", spec["server_ip"])
+    spec.setdefault("plot_dir", f"plots_{spec['name']}")
+    spec.setdefault("slot", [])
+    spec["numa"] = numa.settings(spec.get("numa"))
+
+    experiments = spec.get("experiment")
+    if not experiments:
+        raise ValueError(f"{path}: needs at least one [[experiment]] grid")
+    spec["experiment"] = []
+    for e in experiments:
+        if e.get("window") == "knee":
+            e = {"plot": "window", **e}
+        e = {**EXPERIMENT_DEFAULTS, **e}
+        for key in ("name", "msg", "window", "iters"):
+            if key not in e:
+                raise ValueError(f"{path}: experiment missing '{key}'")
+        e["knee"] = None
+        if e["window"] == "knee":
+            e["knee"] = knee.settings(spec.get("knee"), e.get("knee"))
+            e["window"] = []  # found by the search
+        for key in ("msg", "window", "modes", *GRID_OPTIONS):
+            if not isinstance(e[key], list):
+                e[key] = [e[key]]
+        unknown = set(e["numa"]) - set(numa.PLACEMENTS)
+        if unknown:
+            raise ValueError(f"{path}: unknown numa placement(s) {sorted(unknown)}")
+        if e.get("optimize"):
+            e["optimize"] = optimize_settings(path, spec, e)
+        else:
+            e["optimize"] = None
+        if e["optimize"] is None and isinstance(e["recv_depth"], list):
+            raise ValueError(f"{path}: a recv_depth list needs optimize = true")
+        if e["plot"] not in PLOT_KINDS:
+            raise ValueError(f"{path}: unknown plot kind {e['plot']!r}")
+        if e["iters"] == "auto":
+            e["adaptive"] = adaptive.settings(spec.get("adaptive"), e.get("adaptive"))
+        elif not isinstance(e["iters"], int):
+            raise ValueError(f'{path}: iters must be an integer or "auto"')
+        if not isinstance(e["repeats"], int) or e["repeats"] < 1:
+            raise ValueError(f"{path}: repeats must be a positive integer")
+        e["retry"] = retry.settings(spec.get("retry"), e.get("retry"))
+        e["timeout"] = supervisor.settings(spec.get("timeout"), e.get("timeout"))
+        if e["steady"]:
+            e["steady"] = steady.settings(spec.get("steady"), e["steady"])
+        else:
+            e["steady"] = None
+        if e["counters"]:
+            e["counters"] = counters.settings(spec.get("counters"), e["counters"])
+        else:
+            e["counters"] = None
+        if e["overlay"] and e["plot"] not in ("msg", "window"):
+            raise ValueError(f'{path}: overlay needs plot = "msg" or "window"')
+        e.setdefault("plot_dir", spec["plot_dir"])
+        spec["experiment"].append(e)
+    return spec
+
+
+def optimize_settings(path, spec, e):
+    """Settings of an `optimize = true` experiment; moves its lists to e["space"]."""
+    cfg = optimize.settings(spec.get("optimize"), e["optimize"])
+    if not isinstance(e["iters"], int):
+        raise ValueError(f"{path}: optimize needs an integer iters")
+    if cfg["weights"] is not None and len(cfg["weights"]) != len(e["msg"]):
+        raise ValueError(f"{path}: optimize weights need one entry per msg")
+    depths = e["recv_depth"]
+    e["space"] = {
+        "window": e["window"],
+        "recv_depth": depths if isinstance(depths, list) else [depths],
+    }
+    # Chosen by the search
+    e["window"], e["recv_depth"] = [], "auto"
+    if cfg["max_lat_p99_us"] is not None:
+        e["latency"] = True
+    return cfg
+
+
+def recv_depth_for(exp, window):
+    """Receive depth for send mode; "auto" covers the window with headroom."""
+    if exp["recv_depth"] == "auto":
+        return max(256, window * 4)
+    return int(exp["recv_depth"])
+
+
+def make_point(exp, mode, msg, window, **options):
+    """One point; options are CLIENT_OPTIONS, at their default if not given."""
+    return {
+        "experiment": exp["name"],
+        "mode": mode,
+        "msg": msg,
+        "window": window,
+        "iters": exp["iters"],
+        "recv_depth": recv_depth_for(exp, window),
+        "adaptive": exp.get("adaptive"),
+        "repeats": exp["repeats"],
+        "retry": exp["retry"],
+        "latency": exp["latency"],
+        "steady": exp["steady"],
+        "counters": exp["counters"],
+        "cycles": exp["cycles"],
+        "timeout": exp["timeout"],
+        **CLIENT_OPTIONS,
+        "shared_cq": exp["shared_cq"],
+        **options,
+    }
+
+
+def runnable(mode, msg, window, options):
+    """Whether a combination of the grid measures something of its own.
+
+    More threads than QPs would leave threads idle, the client caps batch
+    and signal at the window, every SGE needs a byte and READ has no
+    payload to inline.
+    """
+    return (
+        options["threads"] <= options["qps"]
+        and max(options["batch"], options["signal"]) <= window
+        and options["sge"] <= msg
+        and not (options["inline"] and mode == "read")
+    )
+
+
+def expand_points(spec):
+    """All grid points, in the order they are run (msg, window, the
+    GRID_OPTIONS, mode), except those that are not runnable().
+
+    Knee-search and optimize experiments have no grid; their points are
+    chosen while they run (run_knee, run_optimize).
+    """
+    points = []
+    for exp in spec["experiment"]:
+        grid = itertools.product(
+            exp["msg"], exp["window"], *(exp[k] for k in GRID_OPTIONS), exp["modes"]
+        )
+        for msg, window, *values, mode in grid:
+            options = dict(zip(GRID_OPTIONS, values))
+            if runnable(mode, msg, window, options):
+                points.append(make_point(exp, mode, msg, window, **options))
+    return points
+
+
+# ================== running ==================
+
+
+def run_client(
+    spec,
+    mode: str,
+    msg: int,
+    iters: int,
+    window: int,
+    lat=False,
+    qps=1,
+    threads=1,
+    shared_cq=False,
+    batch=1,
+    signal=1,
+    inline=False,
+    sge=1,
+    cycles=False,
+    steady_cfg=None,
+    timeout=None,
+    watch=None,
+    prefix=(),
+):
+    """Run bench_client and parse Mops / GiB/s (and the latency histogram).
+    With steady_cfg the client streams interval samples and the result is
+    its steady state (steady.py). The supervisor kills the client after
+    `timeout` seconds, raising TimeoutError, or once watch() gives a reason
+    (supervisor.py). prefix, e.g. numactl (numa.py), goes before the
+    command; cycles counts CPU cycles (cpu.py). If bench_client returns
+    non-zero, return None.
+    """
+    cmd = [
+        *prefix,
+        spec["client"],
+        spec["server_ip"],
+        str(spec["port"]),
+        "--mode",
+        mode,
+        "--msg",
+        str(msg),
+        "--iters",
+        str(iters),
+        "--window",
+        str(window),
+    ]
+    if spec["gpu"] is not None:
+        cmd += ["--gpu", str(spec["gpu"])]
+    if qps > 1 or threads > 1:
+        cmd += ["--qps", str(qps), "--threads", str(threads)]
+        if shared_cq:
+            cmd += ["--shared-cq"]
+    if batch > 1:
+        cmd += ["--batch", str(batch)]
+    if signal > 1:
+        cmd += ["--signal", str(signal)]
+    if inline:
+        cmd += ["--inline"]
+    if sge > 1:
+        cmd += ["--sge", str(sge)]
+    if steady_cfg:
+        cmd += ["--interval", str(steady_cfg["interval_ms"])]
+    if lat:
+        cmd += ["--latency"]
+    if cycles:
+        cmd += ["--cycles"]
+    if spec["json"]:
+        cmd += ["--json"]
+    print("\n=== Running client ===")
+    print(" ".join(cmd))
+
+    if steady_cfg:
+        proc, detector = steady.run(cmd, steady_cfg, timeout, watch)
+    else:
+        proc = supervisor.run(cmd, timeout, watch=watch)
+    if proc.killed:
+        print(f"!! bench_client killed: {proc.killed}")
+        print("stdout:\n", proc.stdout)
+        print("stderr:\n", proc.stderr)
+        if proc.timed_out:
+            raise TimeoutError(f"bench_client {proc.killed}")
+        return None
+    if proc.returncode != 0:
+        print("!! bench_client exited with non-zero code:", proc.returncode)
+        print("stdout:\n", proc.stdout)
+        print("stderr:\n", proc.stderr)
+        # For errors like RNR retry exceeded; return None so caller records NaN
+        return None
+
+    print("client stdout:\n", proc.stdout.strip())
+
+    res = results.parse(proc.stdout)
+    out = {
+        **res,
+        "lat_hist": results.lat_hist(res),
+        "thread_mops": [t["mops"] for t in res.get("per_thread") or []],
+        "raw_stdout": proc.stdout.strip(),
+    }
+    if steady_cfg:
+        out.update(detector.summary(res))
+    return out
+
+
+def start_server(spec, launcher, point, prefix=()):
+    """Start bench_server for one point under prefix; use as a context manager."""
+    cmd = server_command(
+        spec["server"],
+        spec["port"],
+        point["mode"],
+        point["msg"],
+        point["iters"],
+        recv_depth=point["recv_depth"],
+        gpu=spec["gpu"],
+        qps=point["qps"],
+        cycles=point.get("cycles", False),
+    )
+    return launcher.running(cmd, prefix)
+
+
+def append_result_csv(path, rows, fieldnames=FIELDNAMES):
+    """Append results to the CSV file. First write adds the header.
+
+    The file is replaced atomically, so a crash never leaves a torn row.
+    A CSV written before a column was added gets the full header; its old
+    rows get empty cells for the new columns.
+    """
+    path = Path(path)
+    old_rows, header = [], fieldnames
+    if path.exists():
+        with open(path, newline="") as f:
+            reader = csv.DictReader(f)
+            old_rows = list(reader)
+            header = reader.fieldnames or []
+        header = fieldnames + [k for k in header if k not in fieldnames]
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=header, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(old_rows)
+    writer.writerows(rows)
+    checkpoint.write_atomic(path, out.getvalue())
+
+
+def pin(spec, launcher, point):
+    """The NUMA nodes of the point's placement (numa.py), by NODE_FIELDS;
+    raises numa.NumaError or OSError if the placement cannot be resolved.
+    """
+    return numa.nodes(
+        numa.settings(spec["numa"]),
+        point["numa"],
+        numa.nics(spec),
+        sysfs.host(spec["sysfs"]),
+        launcher.sysfs(spec["sysfs"]),
+    )
+
+
+def run_pinned(spec, launcher, point, probe=None, **kwargs):
+    """Start the server and run the client of one point, each under the
+    numactl prefix of its node (if any); returns run_client()'s result
+    with the server's CPU use in "server_cpu" (cpu.py). A counters.Probe
+    snapshots the RNICs right around the client run.
+    """
+    cfg = numa.settings(spec["numa"])
+    server_prefix = numa.command(cfg, point.get("server_node"))
+    with start_server(spec, launcher, point, server_prefix) as server:
+        if probe:
+            probe.start()
+        try:
+            data = run_client(
+                spec,
+                mode=point["mode"],
+                msg=point["msg"],
+                iters=point["iters"],
+                window=point["window"],
+                watch=supervisor.server_exit(server),
+                prefix=numa.command(cfg, point.get("client_node")),
+                **{k: point[k] for k in CLIENT_OPTIONS if k != "numa"},
+                **kwargs,
+            )
+        finally:
+            if probe:
+                probe.stop()
+    # The launcher has the server's result once the server is done
+    return data and {**data, "server_cpu": cpu.server_usage(launcher)}
+
+
+def measure(spec, launcher, point, iters):
+    """One short client run for calibration; returns Mops or None."""
+    point = {**point, "iters": iters}
+    timeout = supervisor.deadline(point["timeout"], point["msg"], iters)
+    try:
+        data = run_pinned(spec, launcher, point, timeout=timeout)
+    except TimeoutError:
+        return None
+    return data["mops"] if data else None
+
+
+def run_once(spec, launcher, point):
+    """Calibrate if needed, then run the point once.
+
+    Returns (iters, data, timed_out, counts); data is None if the run
+    failed, counts the COUNTER_FIELDS of the run (also of a failed one).
+    """
+    iters, rates = point["iters"], []
+    try:
+        nodes = pin(spec, launcher, point)
+    except (numa.NumaError, OSError) as e:
+        print(f"!! cannot place the point (numa={point['numa']}): {e}")
+        iters = point["adaptive"]["calib_iters"] if iters == "auto" else iters
+        return iters, None, False, {}
+    point = {**point, **nodes}
+    if iters == "auto":
+        cfg = point["adaptive"]
+
+        def calibrate(n):
+            mops = measure(spec, launcher, point, n)
+            if mops:
+                rates.append(mops)
+            return mops
+
+        iters = adaptive.calibrate(calibrate, cfg)
+        if iters is None:
+            # Calibration already failed; the NaN row records calib_iters
+            return cfg["calib_iters"], None, False, {}
+    point = {**point, "iters": iters}
+    # The calibration rate, if any, is what the run should reach
+    timeout = supervisor.deadline(
+        point["timeout"], point["msg"], iters, min(rates, default=None)
+    )
+    probe = None
+    if point["counters"]:
+        probe = counters.Probe(
+            point["counters"],
+            numa.nics(spec),
+            sysfs.host(spec["sysfs"]),
+            launcher.sysfs(spec["sysfs"]),
+        )
+    try:
+        data = run_pinned(
+            spec,
+            launcher,
+            point,
+            probe,
+            lat=point["latency"],
+            cycles=point["cycles"],
+            steady_cfg=point["steady"],
+            timeout=timeout,
+        )
+    except TimeoutError as e:
+        print(f"!! {e}; the server is stopped too")
+        return iters, None, True, probe.result if probe else {}
+    return iters, data and {**data, **nodes}, False, probe.result if probe else {}
+
+
+def run_point(spec, launcher, point):
+    """Start the server, run the client and return the CSV row for one point."""
+    mode, msg, window = point["mode"], point["msg"], point["window"]
+    run = (
+        f", run {point['repeat'] + 1}/{point['repeats']}"
+        if point["repeats"] > 1
+        else ""
+    )
+    print(
+        f"\n--- {point['experiment']}: msg={msg}, window={window}"
+        f"{options_tag(point)}, mode={mode}{run} ---"
+    )
+
+    tries = [(point["recv_depth"], window)] + retry.variants(point, point["retry"])
+    try:
+        pin(spec, launcher, point)
+    except (numa.NumaError, OSError):
+        tries = tries[:1]  # run_once() reports it; other settings cannot help
+    timeouts = 0
+    for attempt, (recv_depth, run_window) in enumerate(tries):
+        if attempt:
+            delay = point["retry"]["backoff_seconds"] * 2 ** (attempt - 1)
+            print(
+                f"Retry {attempt}/{len(tries) - 1} in {delay:g}s with "
+                f"{retry.describe(point, recv_depth, run_window)}"
+            )
+            time.sleep(delay)
+        iters, data, timed_out, counts = run_once(
+            spec, launcher, {**point, "recv_depth": recv_depth, "window": run_window}
+        )
+        timeouts += timed_out
+        if data is not None:
+            break
+
+    row = {k: point[k] for k in ("experiment", "mode", "msg", "window")}
+    row.update({k: point[k] for k in CLIENT_OPTIONS})
+    # A run stopped once steady did fewer than the iters it was given
+    row["iters"] = data.get("iters", iters) if data else iters
+    row["recv_depth"] = recv_depth if mode == "send" else None
+    row["run_window"] = run_window
+    row["attempts"] = attempt + 1
+    row["timeouts"] = timeouts
+    row["retry"] = retry.describe(point, recv_depth, run_window)
+    if data is None:
+        # If a combination fails, e.g., RNR retry exceeded
+        print(
+            f"*** Combination failed: msg={msg}, window={window}, mode={mode}; recorded as NaN, continue to next ***"
+        )
+        row["mops"] = float("nan")
+        row["gib"] = float("nan")
+        if attempt:
+            row["retry"] = "exhausted"
+    else:
+        row["mops"] = data["mops"]
+        row["gib"] = data["gib"]
+    # Kept per run so repeats can merge histograms; not a CSV column
+    row["lat_hist"] = data["lat_hist"] if data else None
+    row["thread_mops"] = data["thread_mops"] if data else None
+    row.update({k: data.get(k) if data else None for k in results.LIMIT_FIELDS})
+    row.update({k: data.get(k) if data else None for k in numa.NODE_FIELDS})
+    if point["steady"]:
+        row.update({k: data.get(k) if data else None for k in steady.STEADY_FIELDS})
+    # Of the last attempt; a failed run's counters may say why it failed
+    row.update(counts)
+    if data:
+        row.update(cpu.costs(cpu.usage(data), data["server_cpu"], row["iters"], msg))
+
+    print(
+        f"Recorded: mode={mode}, msg={msg}, window={window}, "
+        f"Mops={row['mops']}, GiB/s={row['gib']}"
+        + (f" (after retry: {row['retry']})" if row["retry"] else "")
+    )
+    eff = row["effective_window"]
+    if eff is not None and eff < run_window:
+        print(
+            f"Note: READ window capped at {eff} of {run_window} "
+            f"(max_rd_atomic={row['max_rd_atomic']})"
+        )
+    if row["lat_hist"]:
+        lat = latency.summary(row["lat_hist"])
+        print(
+            f"Latency: p50={lat['lat_p50_us']:.2f} p99={lat['lat_p99_us']:.2f} "
+            f"p99.9={lat['lat_p999_us']:.2f} us"
+        )
+    return row
+
+
+def options_tag(point):
+    """The client options not at their default, as ", qps=4, inline"."""
+    return "".join(
+        f", {k}" if point[k] is True else f", {k}={point[k]}"
+        for k, default in CLIENT_OPTIONS.items()
+        if point.get(k, default) != default
+    )
+
+
+def launcher_for(spec):
+    return make_launcher(
+        spec["launcher"],
+        host=spec["server_host"],
+        daemon=spec["daemon"],
+        ctrl_host=spec["server_ip"],
+    )
+
+
+def run_sweep(spec, launcher, resume=False):
+    """Run every point of the spec and append the rows to its CSV.
+
+    Each point's row is written as soon as all its runs are done. With
+    resume=True, points already in the CSV with the same fingerprint are
+    skipped and journaled runs are not repeated.
+
+    With [[slot]] entries in the spec, points run in parallel over the
+    slots (scheduler.py) and `launcher` is not used; rows are then
+    written in the order the points finish, not in point order.
+    """
+    points = expand_points(spec)
+    for point in points:
+        point["fingerprint"] = checkpoint.fingerprint(spec, point)
+    if spec["sysfs_seed"]:
+        sysfs.seed(spec["sysfs"], spec["sysfs_seed"])
+    print(f"\n\n===== {spec['name']}: {len(points)} points =====")
+
+    done = checkpoint.committed(spec["result_csv"]) if resume else {}
+    stored = []
+
+    def commit(row):
+        row["timestamp"] = store.now()
+        append_result_csv(spec["result_csv"], [row])
+        stored.append(row)
+
+    ckpt = checkpoint.Checkpoint(
+        spec["result_csv"],
+        points,
+        commit=commit,
+        aggregate=repeats.aggregate,
+        resume=resume,
+    )
+    # Repeats are interleaved: every point once, then every point again, ...
+    runs = [
+        {**point, "index": i, "repeat": r}
+        for r in range(max((p["repeats"] for p in points), default=0))
+        for i, point in enumerate(points)
+        if r < point["repeats"] and point["fingerprint"] not in done
+    ]
+    todo = [run for run in runs if ckpt.cached(run) is None]
+    if resume:
+        print(
+            f"Resuming: {len(done)} points already in {spec['result_csv']}, "
+            f"{len(runs) - len(todo)} runs journaled, {len(todo)} runs to go"
+        )
+
+    results = []
+
+    def run_and_record(run_spec, launcher, run):
+        row = run_point(run_spec, launcher, run)
+        result = ckpt.record(run, row)
+        if result is not None:
+            results.append(result)
+        return row
+
+    # Points whose runs were all journaled before the interruption
+    for run in runs:
+        if ckpt.cached(run) is not None:
+            result = ckpt.record(run, ckpt.cached(run))
+            if result is not None:
+                results.append(result)
+
+    try:
+        if spec["slot"]:
+            scheduler.run_parallel(spec, todo, run_and_record, launcher_for)
+        else:
+            for run in todo:
+                run_and_record(spec, launcher, run)
+        for exp in spec["experiment"]:
+            if exp["knee"]:
+                run_knee(spec, launcher, exp, commit, done)
+            if exp["optimize"]:
+                run_optimize(spec, launcher, exp, commit, done)
+    except KeyboardInterrupt:
+        print("\nInterrupted; finished points are saved. Continue with `run --resume`.")
+        raise
+    finally:
+        save_to_store(spec, stored)
+    ckpt.finish()
+
+    for r in results:
+        if r["repeats"] > 1:
+            print(
+                f"{r['experiment']},{r['mode']},{r['msg']},{r['window']}: "
+                f"Mops={r['mops']:.3f} [{r['mops_ci_lo']:.3f}, {r['mops_ci_hi']:.3f}] "
+                f"GiB/s={r['gib']:.3f} ({r['n_ok']}/{r['repeats']} ok)"
+            )
+    print("\nSweep finished, results written to", spec["result_csv"])
+
+
+def run_or_reuse(spec, launcher, point, commit, done):
+    """The committed row of a point chosen by a search, running it if needed.
+
+    Rows already in `done` (fingerprint -> CSV row, from --resume) are
+    reused; otherwise the point's repeats are run and its row committed.
+    Returns the row's {metric: value} for mops, gib and lat_p99_us.
+    """
+    point["fingerprint"] = checkpoint.fingerprint(spec, point)
+    row = done.get(point["fingerprint"])
+    if row is None:
+        runs = [
+            run_point(spec, launcher, {**point, "repeat": r})
+            for r in range(point["repeats"])
+        ]
+        row = repeats.aggregate(runs)
+        row["fingerprint"] = point["fingerprint"]
+        commit(row)
+    out = {}
+    for key in ("mops", "gib", "lat_p99_us"):
+        try:
+            value = float(row.get(key))
+        except (TypeError, ValueError):
+            value = math.nan
+        out[key] = None if math.isnan(value) else value
+    return out
+
+
+def knee_csv(spec):
+    path = Path(spec["result_csv"])
+    return path.with_name(f"{path.stem}_knee.csv")
+
+
+def run_knee(spec, launcher, exp, commit, done):
+    """Knee search (knee.py) per (msg, mode) of one experiment.
+
+    Every probed window is committed like a grid point; probes already in
+    `done` (fingerprint -> CSV row, from --resume) are not run again. The
+    knee of each (mode, msg) goes to <result_csv>_knee.csv.
+    """
+    cfg = exp["knee"]
+    summary = []
+    for msg, mode in itertools.product(exp["msg"], exp["modes"]):
+        print(f"\n===== {exp['name']}: knee search, mode={mode}, msg={msg} =====")
+
+        def measure(window):
+            point = make_point(exp, mode, msg, window)
+            return run_or_reuse(spec, launcher, point, commit, done)[cfg["metric"]]
+
+        res = knee.search(measure, cfg) or dict.fromkeys(knee.KNEE_FIELDS)
+        summary.append(
+            {
+                "experiment": exp["name"],
+                "mode": mode,
+                "msg": msg,
+                "metric": cfg["metric"],
+                "fraction": cfg["fraction"],
+                **{k: res[k] for k in knee.KNEE_FIELDS[5:]},
+            }
+        )
+        if res["knee_window"] is None:
+            print(f"Knee: mode={mode}, msg={msg}: every run failed")
+            continue
+        print(
+            f"Knee: mode={mode}, msg={msg}: window {res['knee_window']} reaches "
+            f"{cfg['fraction']:.0%} of peak {res['peak']:.3f} {cfg['metric']} "
+            f"(peak at window {res['peak_window']}, {res['runs']} runs)"
+        )
+    append_result_csv(knee_csv(spec), summary, knee.KNEE_FIELDS)
+    print(f"Knee windows written to {knee_csv(spec)}")
+
+
+def optimize_csv(spec):
+    path = Path(spec["result_csv"])
+    return path.with_name(f"{path.stem}_optimize.csv")
+
+
+def run_optimize(spec, launcher, exp, commit, done):
+    """Successive-halving search (optimize.py) per mode of one experiment.
+
+    Every run is committed like a grid point (with its rung's iters), and
+    every evaluation of a configuration goes to <result_csv>_optimize.csv.
+    """
+    cfg = exp["optimize"]
+    trace_rows = []
+    for mode in exp["modes"]:
+        space = dict(exp["space"])
+        if mode != "send":
+            space["recv_depth"] = ["auto"]  # only send mode posts receives
+        print(f"\n===== {exp['name']}: optimize, mode={mode}, msg={exp['msg']} =====")
+
+        def evaluate(config, iters):
+            values, lats = [], []
+            for msg in exp["msg"]:
+                point = make_point(exp, mode, msg, config["window"])
+                point["iters"] = iters
+                point["recv_depth"] = recv_depth_for(config, config["window"])
+                res = run_or_reuse(spec, launcher, point, commit, done)
+                values.append(res[cfg["metric"]])
+                lats.append(res["lat_p99_us"])
+            score = optimize.mix_score(values, exp["msg"], cfg)
+            lat = None if None in lats or not exp["latency"] else max(lats)
+            print(
+                f"Evaluated: mode={mode}, window={config['window']}, "
+                f"recv_depth={config['recv_depth']}, iters={iters}: "
+                + (f"{cfg['metric']}={score:.3f}" if score is not None else "failed")
+                + (f", p99={lat:.2f} us" if lat is not None else "")
+            )
+            return score, lat
+
+        best, trace = optimize.search(evaluate, space, exp["iters"], cfg)
+        trace_rows += [
+            {"experiment": exp["name"], "mode": mode, "metric": cfg["metric"], **r}
+            for r in trace
+        ]
+        if best is None:
+            print(f"Best: mode={mode}: no configuration met the constraints")
+            continue
+        print(
+            f"Best: mode={mode}: window={best['window']}, "
+            f"recv_depth={best['recv_depth']}: {best['score']:.3f} {cfg['metric']}"
+            + (
+                f", p99={best['lat_p99_us']:.2f} us"
+                if best["lat_p99_us"] is not None
+                else ""
+            )
+            + f" ({len(trace)} evaluations)"
+        )
+    append_result_csv(optimize_csv(spec), trace_rows, optimize.OPT_FIELDS)
+    print(f"Optimizer evaluations written to {optimize_csv(spec)}")
+
+
+def save_to_store(spec, rows):
+    """Append the committed rows to the Parquet store (store.py)."""
+    if not spec["store"] or not rows:
+        return
+    try:
+        files = store.append(spec["store"], rows, store.metadata(spec))
+    except ImportError:
+        print(
+            f"pyarrow is not installed; {len(rows)} rows not added to {spec['store']}"
+        )
+        return
+    print(f"Added {len(rows)} rows to {spec['store']} ({len(files)} files)")
+
+
+# ================== plotting ==================
+
+
+def load_results(spec):
+    import pandas as pd
+
+    df = pd.read_csv(spec["result_csv"])
+    # CSVs from before --qps / --threads / --batch / --signal ran with 1
+    for col in ("qps", "threads", "batch", "signal", "sge"):
+        df[col] = df[col].fillna(1).astype(int) if col in df else 1
+    for col in ("shared_cq", "inline"):
+        df[col] = df[col].fillna(False).astype(bool) if col in df else False
+    df["numa"] = df["numa"].fillna("none") if "numa" in df else "none"
+    return df
+
+
+def _ci_err(s, y):
+    """Asymmetric error bar lengths from the CI columns (0 where missing)."""
+    lo = (s[y] - s[f"{y}_ci_lo"]).fillna(0)
+    hi = (s[f"{y}_ci_hi"] - s[y]).fillna(0)
+    return [lo.to_list(), hi.to_list()]
+
+
+def _line_plot(
+    sub,
+    modes,
+    x,
+    y,
+    xlabel,
+    ylabel,
+    title,
+    out,
+    logx=False,
+    marks=None,
+    limits=None,
+    overlay=None,
+):
+    """One line per mode; marks ({mode: x}) draws a dotted line at x, and
+    limits ({mode: (x, label)}) a labeled dash-dotted one. overlay is a
+    (column, label) drawn dashed per mode on a second y axis.
+    """
+    import matplotlib.pyplot as plt
+
+    plt.figure()
+    ax = plt.gca()
+    colors = {}
+    for mode in modes:
+        s = sub[sub["mode"] == mode].sort_values(x)
+        if s.empty:
+            continue
+        if f"{y}_ci_lo" in s and s[f"{y}_ci_lo"].notna().any():
+            # Repeated runs: mean with its 95% confidence interval
+            line = plt.errorbar(
+                s[x],
+                s[y],
+                yerr=_ci_err(s, y),
+                marker="o",
+                capsize=3,
+                label=f"{mode}",
+            ).lines[0]
+            plt.fill_between(s[x], s[f"{y}_ci_lo"], s[f"{y}_ci_hi"], alpha=0.15)
+        else:
+            (line,) = plt.plot(s[x], s[y], marker="o", label=f"{mode}")
+        colors[mode] = line.get_color()
+        if marks and mode in marks:
+            plt.axvline(marks[mode], color=line.get_color(), linestyle=":")
+        if limits and mode in limits:
+            at, label = limits[mode]
+            plt.axvline(at, color=line.get_color(), linestyle="-.", label=label)
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.title(title)
+    if logx:
+        plt.xscale("log", base=2)  # Wide message size range; log2 x-axis is clearer
+    plt.grid(True, linestyle="--", alpha=0.5)
+    if overlay and sub[overlay[0]].notna().any():
+        col, label = overlay
+        ax2 = ax.twinx()
+        for mode, color in colors.items():
+            s = sub[sub["mode"] == mode].sort_values(x)
+            ax2.plot(
+                s[x],
+                s[col],
+                linestyle="--",
+                marker="x",
+                color=color,
+                label=f"{mode}: {label}",
+            )
+        ax2.set_ylabel(label)
+        lines, labels = ax.get_legend_handles_labels()
+        lines2, labels2 = ax2.get_legend_handles_labels()
+        ax.legend(lines + lines2, labels + labels2, fontsize="small")
+    else:
+        plt.legend()
+    plt.tight_layout()
+    plt.savefig(out, dpi=200)
+    plt.close()
+
+
+def _latency_plot(sub, modes, x, xlabel, title, out, logx=False):
+    """p50 / p99 / p99.9 per mode: one color per mode, one style per percentile."""
+    import matplotlib.pyplot as plt
+
+    if sub[latency.LAT_FIELDS[0]].isna().all():
+        return
+    plt.figure()
+    for i, mode in enumerate(modes):
+        s = sub[sub["mode"] == mode].sort_values(x)
+        if s.empty:
+            continue
+        for p, style in zip(latency.PERCENTILES, ("-", "--", ":")):
+            label = "p99.9" if p == "p999" else p
+            plt.plot(
+                s[x],
+                s[f"lat_{p}_us"],
+                linestyle=style,
+                marker="o",
+                color=f"C{i}",
+                label=f"{mode} {label}",
+            )
+    plt.xlabel(xlabel)
+    plt.ylabel("Latency (us)")
+    plt.yscale("log")
+    plt.title(title)
+    if logx:
+        plt.xscale("log", base=2)
+    plt.legend(fontsize="small")
+    plt.grid(True, linestyle="--", alpha=0.5)
+    plt.tight_layout()
+    plt.savefig(out, dpi=200)
+    plt.close()
+
+
+def _scaling_plot(sub, modes, x, series, xlabel, label, title, out, vline=None):
+    """Mops against column x: one color per value of column series, one
+    style per mode; label(value) names a series in the legend. vline is an
+    optional (x, label) marked with a dotted line.
+    """
+    import matplotlib.pyplot as plt
+
+    plt.figure()
+    for i, value in enumerate(sorted(sub[series].unique())):
+        for mode, style in zip(modes, ("-", "--", ":")):
+            s = sub[(sub["mode"] == mode) & (sub[series] == value)]
+            s = s.sort_values(x)
+            if s.empty:
+                continue
+            ci = "mops_ci_lo" in s and s["mops_ci_lo"].notna().any()
+            yerr = _ci_err(s, "mops") if ci else None
+            plt.errorbar(
+                s[x],
+                s["mops"],
+                yerr=yerr,
+                linestyle=style,
+                marker="o",
+                capsize=3,
+                color=f"C{i}",
+                label=f"{mode}, {label(value)}",
+            )
+    if vline:
+        plt.axvline(vline[0], color="gray", linestyle=":", label=vline[1])
+    plt.xlabel(xlabel)
+    plt.ylabel("Operations (Mops, all threads)")
+    plt.title(title)
+    plt.xscale("log", base=2)
+    plt.legend(fontsize="small")
+    plt.grid(True, linestyle="--", alpha=0.5)
+    plt.tight_layout()
+    plt.savefig(out, dpi=200)
+    plt.close()
+
+
+def _cpu_plot(sub, modes, x, unit, xlabel, title, out):
+    """CPU ns per `unit` ("op" or "byte") of both sides: one color per
+    mode, solid circles for the client and dashed crosses for the server.
+    """
+    import matplotlib.pyplot as plt
+
+    cols = [f"{side}_cpu_ns_{unit}" for side in cpu.SIDES]
+    if not all(c in sub for c in cols) or sub[cols].isna().all().all():
+        return
+    plt.figure()
+    for i, mode in enumerate(modes):
+        s = sub[sub["mode"] == mode].sort_values(x)
+        if s.empty:
+            continue
+        for side, style, marker in zip(cpu.SIDES, ("-", "--"), ("o", "x")):
+            plt.plot(
+                s[x],
+                s[f"{side}_cpu_ns_{unit}"],
+                linestyle=style,
+                marker=marker,
+                color=f"C{i}",
+                label=f"{mode} {side}",
+            )
+    plt.xlabel(xlabel)
+    plt.ylabel(f"CPU time per {'operation' if unit == 'op' else 'byte'} (ns)")
+    plt.title(title)
+    plt.xscale("log", base=2)
+    # A polling side costs orders of magnitude more than an idle one; a
+    # side that used no measurable CPU (0) is left out
+    plt.yscale("log")
+    plt.legend(fontsize="small")
+    plt.grid(True, linestyle="--", alpha=0.5)
+    plt.tight_layout()
+    plt.savefig(out, dpi=200)
+    plt.close()
+
+
+def read_limit(sub):
+    """max_rd_atomic of the READ rows in sub, or None if not recorded."""
+    if "max_rd_atomic" not in sub:
+        return None
+    caps = sub.loc[sub["mode"] == "read", "max_rd_atomic"].dropna()
+    return int(caps.min()) if not caps.empty else None
+
+
+def knee_windows(spec, exp):
+    """{msg: {mode: knee window}} from the knee CSV of a knee experiment."""
+    if not exp["knee"] or not knee_csv(spec).exists():
+        return {}
+    out = {}
+    with open(knee_csv(spec), newline="") as f:
+        for r in csv.DictReader(f):
+            if r["experiment"] == exp["name"] and r["knee_window"]:
+                out.setdefault(int(r["msg"]), {})[r["mode"]] = int(r["knee_window"])
+    return out
+
+
+def plot_experiment(spec, exp, df):
+    import matplotlib.pyplot as plt
+
+    plot_dir = Path(exp["plot_dir"])
+    plot_dir.mkdir(exist_ok=True)
+    tag = "[GPU] " if spec["gpu"] is not None else ""
+    if exp["optimize"]:
+        print(f"{exp['name']}: optimizer results are in {optimize_csv(spec)}")
+        return
+    sub = df[
+        (df["experiment"] == exp["name"])
+        & df["msg"].isin(exp["msg"])
+        & df["qps"].isin(exp["qps"])
+        & df["threads"].isin(exp["threads"])
+        & df["batch"].isin(exp["batch"])
+        & df["signal"].isin(exp["signal"])
+        & df["inline"].isin(exp["inline"])
+        & df["sge"].isin(exp["sge"])
+        & df["numa"].isin(exp["numa"])
+    ]
+    if not exp["knee"]:
+        sub = sub[sub["window"].isin(exp["window"])]
+    if sub.empty:
+        print(f"No {exp['name']} data; run the experiment before plotting.")
+        return
+    overlay = None
+    if exp["overlay"]:
+        # An RNIC counter over the throughput curves (counters.py)
+        sub = sub.assign(overlay=counters.per_mwr(sub, exp["overlay"]))
+        overlay = ("overlay", f"{exp['overlay']} per 1M WRs")
+
+    if exp["plot"] == "msg":
+        prefix = exp.get("plot_prefix") or (
+            "gpu_msg_sweep" if spec["gpu"] is not None else "msg_sweep"
+        )
+        for window in exp["window"]:
+            s = sub[sub["window"] == window]
+            # READs past max_rd_atomic only wait in the send queue
+            cap = read_limit(s)
+            note = f", READ capped at {cap}" if cap is not None and cap < window else ""
+            _line_plot(
+                s,
+                exp["modes"],
+                "msg",
+                "gib",
+                "Message size (bytes)",
+                "Throughput (GiB/s)",
+                f"{tag}Throughput vs message size (window={window}{note})",
+                plot_dir / f"{prefix}_gib_w{window}.png",
+                logx=True,
+                overlay=overlay,
+            )
+            _line_plot(
+                s,
+                exp["modes"],
+                "msg",
+                "mops",
+                "Message size (bytes)",
+                "Operations (Mops)",
+                f"{tag}Ops vs message size (window={window}{note})",
+                plot_dir / f"{prefix}_mops_w{window}.png",
+                logx=True,
+                overlay=overlay,
+            )
+            if exp["latency"]:
+                _latency_plot(
+                    s,
+                    exp["modes"],
+                    "msg",
+                    "Message size (bytes)",
+                    f"{tag}Latency vs message size (window={window})",
+                    plot_dir / f"{prefix}_lat_w{window}.png",
+                    logx=True,
+                )
+    elif exp["plot"] == "window":
+        prefix = exp.get("plot_prefix") or "sweep"
+        knees = knee_windows(spec, exp)
+        for msg in exp["msg"]:
+            s = sub[sub["msg"] == msg]
+            # A knee search probes windows up to max_window; log2 x-axis
+            logx = bool(exp["knee"])
+            marks = knees.get(msg)
+            cap = read_limit(s)
+            limits = None
+            if cap is not None and cap < s["window"].max():
+                limits = {"read": (cap, f"read: max_rd_atomic={cap}")}
+            _line_plot(
+                s,
+                exp["modes"],
+                "window",
+                "gib",
+                "window size (outstanding requests)",
+                "Throughput (GiB/s)",
+                f"{tag}Throughput vs window (msg={msg} bytes)",
+                plot_dir / f"{prefix}_msg{msg}_gib.png",
+                logx=logx,
+                marks=marks,
+                limits=limits,
+                overlay=overlay,
+            )
+            _line_plot(
+                s,
+                exp["modes"],
+                "window",
+                "mops",
+                "window size (outstanding requests)",
+                "Operations (Mops)",
+                f"{tag}Ops vs window (msg={msg} bytes)",
+                plot_dir / f"{prefix}_msg{msg}_mops.png",
+                logx=logx,
+                marks=marks,
+                limits=limits,
+                overlay=overlay,
+            )
+            if exp["latency"]:
+                _latency_plot(
+                    s,
+                    exp["modes"],
+                    "window",
+                    "window size (outstanding requests)",
+                    f"{tag}Latency vs window (msg={msg} bytes)",
+                    plot_dir / f"{prefix}_msg{msg}_lat.png",
+                )
+    elif exp["plot"] == "scaling":
+        prefix = exp.get("plot_prefix") or "scaling"
+        for msg, window in itertools.product(exp["msg"], exp["window"]):
+            s = sub[(sub["msg"] == msg) & (sub["window"] == window)]
+            if s.empty:
+                continue
+            _scaling_plot(
+                s,
+                exp["modes"],
+                "qps",
+                "threads",
+                "QPs",
+                lambda t: f"{t} thread{'s' if t > 1 else ''}",
+                f"{tag}Mops vs QPs and threads (msg={msg} bytes, window={window})",
+                plot_dir / f"{prefix}_msg{msg}_w{window}_mops.png",
+            )
+    elif exp["plot"] == "doorbell":
+        prefix = exp.get("plot_prefix") or "doorbell"
+        for msg, window in itertools.product(exp["msg"], exp["window"]):
+            s = sub[(sub["msg"] == msg) & (sub["window"] == window)]
+            if s.empty:
+                continue
+            _scaling_plot(
+                s,
+                exp["modes"],
+                "batch",
+                "signal",
+                "WRs per post call (doorbell batch)",
+                lambda n: f"signal every {n}",
+                f"{tag}Mops vs doorbell batch (msg={msg} bytes, window={window})",
+                plot_dir / f"{prefix}_msg{msg}_w{window}_mops.png",
+            )
+    elif exp["plot"] == "inline":
+        prefix = exp.get("plot_prefix") or "inline"
+        names = [
+            f"{'inline' if i else 'no inline'}, {n} SGE{'s' if n > 1 else ''}"
+            for i, n in zip(sub["inline"], sub["sge"])
+        ]
+        variants = sub.assign(variant=names)
+        for window in exp["window"]:
+            s = variants[variants["window"] == window]
+            if s.empty:
+                continue
+            # Inline only applies up to the discovered max_inline_data
+            limit = s["max_inline"].max() if "max_inline" in s else math.nan
+            _scaling_plot(
+                s,
+                exp["modes"],
+                "msg",
+                "variant",
+                "Message size (bytes)",
+                str,
+                f"{tag}Mops vs message size, inline and SGEs (window={window})",
+                plot_dir / f"{prefix}_mops_w{window}.png",
+                vline=None if math.isnan(limit) else (limit, "max_inline_data"),
+            )
+    elif exp["plot"] == "numa":
+        prefix = exp.get("plot_prefix") or "numa"
+        for window in exp["window"]:
+            s = sub[sub["window"] == window]
+            if s.empty:
+                continue
+            _scaling_plot(
+                s,
+                exp["modes"],
+                "msg",
+                "numa",
+                "Message size (bytes)",
+                lambda p: "unpinned" if p == "none" else f"{p} NUMA node",
+                f"{tag}Mops vs message size, NUMA placement (window={window})",
+                plot_dir / f"{prefix}_mops_w{window}.png",
+            )
+    elif exp["plot"] == "cpu":
+        prefix = exp.get("plot_prefix") or "cpu"
+        for window, unit in itertools.product(exp["window"], ("op", "byte")):
+            s = sub[sub["window"] == window]
+            if s.empty:
+                continue
+            _cpu_plot(
+                s,
+                exp["modes"],
+                "msg",
+                unit,
+                "Message size (bytes)",
+                f"{tag}CPU cost per {'operation' if unit == 'op' else 'byte'}, "
+                f"client and server (window={window})",
+                plot_dir / f"{prefix}_ns_{unit}_w{window}.png",
+            )
+    else:
+        # Bar chart comparing modes at a single point
+        prefix = exp.get("plot_prefix") or exp["name"]
+        plt.figure()
+        xs = list(range(len(sub)))
+        yerr = _ci_err(sub, "gib") if "gib_ci_lo" in sub else None
+        plt.bar(xs, sub["gib"].to_list(), yerr=yerr, capsize=4)
+        plt.xticks(xs, [f"{m}" for m in sub["mode"]])
+        plt.ylabel("Throughput (GiB/s)")
+        plt.title(
+            f"{tag}{exp['name'].capitalize()}: msg={exp['msg'][0]}, "
+            f"window={exp['window'][0]}"
+        )
+        plt.tight_layout()
+        plt.savefig(plot_dir / f"{prefix}_throughput.png", dpi=200)
+        plt.close()
+
+
+def plot_results(spec):
+    df = load_results(spec)
+    for exp in spec["experiment"]:
+        plot_experiment(spec, exp, df)
+    dirs = sorted({str(Path(e["plot_dir"]).resolve()) for e in spec["experiment"]})
+    print(f"\nPlotting finished, images saved to: {', '.join(dirs)}")
+
+
+# ================== main ==================
+
+
+def print_points(spec):
+    for p in expand_points(spec):
+        print(
+            f"{p['experiment']},{p['mode']},{p['msg']},{p['window']},{p['iters']}"
+            f"  (recv_depth={p['recv_depth']}{options_tag(p)})"
+        )
+    for exp in spec["experiment"]:
+        if exp["knee"]:
+            cfg = exp["knee"]
+            for msg, mode in itertools.product(exp["msg"], exp["modes"]):
+                print(
+                    f"{exp['name']},{mode},{msg},knee,{exp['iters']}  "
+                    f"(window {cfg['min_window']}..{cfg['max_window']} to "
+                    f"{cfg['fraction']:.0%} of peak {cfg['metric']})"
+                )
+        if exp["optimize"]:
+            cfg = exp["optimize"]
+            for mode in exp["modes"]:
+                depths = len(exp["space"]["recv_depth"]) if mode == "send" else 1
+                n = min(cfg["configs"], len(exp["space"]["window"]) * depths)
+                rungs = optimize.schedule(n, exp["iters"], cfg)
+                print(
+                    f"{exp['name']},{mode},{exp['msg']},optimize  "
+                    f"({' -> '.join(f'{c} x {i} iters' for c, i in rungs)})"
+                )
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("spec", help="experiment spec (.toml, .yaml)")
+    ap.add_argument(
+        "action",
+        nargs="?",
+        choices=["run", "plot", "all", "points"],
+        help="run this action and exit instead of showing the menu",
+    )
+    ap.add_argument("--launcher", choices=LAUNCHERS, help="override the spec")
+    ap.add_argument("--server-host", help="override the spec")
+    ap.add_argument("--daemon", action=argparse.BooleanOptionalAction, default=None)
+    ap.add_argument("--result-csv", help="write to this CSV instead of the spec's")
+    ap.add_argument("--plot-dir", help="write plots here instead of the spec's")
+    ap.add_argument("--store", help='Parquet result store ("" for none)')
+    ap.add_argument("--repeats", type=int, help="runs per point, for every experiment")
+    ap.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip points already in the CSV with the same fingerprint",
+    )
+    return ap.parse_intermixed_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    spec = load_spec(args.spec)
+    for key in ("launcher", "server_host", "daemon", "result_csv", "store"):
+        if getattr(args, key) is not None:
+            spec[key] = getattr(args, key)
+    for exp in spec["experiment"]:
+        if args.plot_dir:
+            exp["plot_dir"] = args.plot_dir
+        if args.repeats:
+            exp["repeats"] = args.repeats
+
+    if args.action == "points":
+        print_points(spec)
+        return 0
+
+    launcher = launcher_for(spec)
+    try:
+        run_actions(spec, args.action, launcher, resume=args.resume)
+    finally:
+        launcher.close()
+    return 0
+
+
+def run_actions(spec, action, launcher, resume=False):
+    print("This spec assumes:")
+    print(f"  Client can directly run: {spec['client']}")
+    print(f"  Server can directly run: {spec['server']}")
+    print(f"  server IP = {spec['server_ip']}, port = {spec['port']}")
+    if spec["gpu"] is not None:
+        print(f"  GPU_ID = {spec['gpu']}")
+    print(f"  Server launcher = {spec['launcher']} (daemon={spec['daemon']})")
+    if spec["slot"]:
+        print(f"  Parallel slots = {len(spec['slot'])}")
+    print(f"  Results = {spec['result_csv']}")
+
+    if action in ("run", "all"):
+        run_sweep(spec, launcher, resume=resume)
+    if action in ("plot", "all"):
+        plot_results(spec)
+    if action:
+        return
+
+    while True:
+        print("\nChoose an action:")
+        print(f"  1) Run {spec['name']} ({len(expand_points(spec))} points)")
+        print("  2) Plot only (use existing CSV)")
+        print("  q) Quit")
+        choice = input("> ").strip().lower()
+        if choice == "1":
+            run_sweep(spec, launcher, resume=resume)
+        elif choice == "2":
+            plot_results(spec)
+        elif choice == "q":
+            break
+        else:
+            print("Invalid input, please choose again.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
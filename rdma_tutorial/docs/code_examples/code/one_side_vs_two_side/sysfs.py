@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Read sysfs on the client host, or on the server host through its launcher.
+
+numa.py reads where an RNIC sits, counters.py its port counters. Both
+take any root, so they run against a fake tree too (mock_sysfs/); seed()
+copies one to where it may be written to. A Sysfs reads files directly, or with argv (a launcher's argv(), e.g. the
+ssh template) by running cat / grep on that host. read() caches, as
+topology does not change during a sweep; scan() reads afresh each time.
+"""
+
+import os
+import shutil
+import subprocess
+
+# (root, host) -> Sysfs; shared by all points and slots of a sweep
+_hosts = {}
+
+
+class Sysfs:
+    """Files under a sysfs root, locally or through argv."""
+
+    def __init__(self, root="/sys", argv=None):
+        self.root = root.rstrip("/") or "/"
+        self.argv = argv
+        self._files = {}
+
+    def _run(self, args):
+        proc = subprocess.run(
+            self.argv(args), stdin=subprocess.DEVNULL, capture_output=True, text=True
+        )
+        return proc.returncode, proc.stdout
+
+    def read(self, rel):
+        """Contents of one file, stripped; OSError if it cannot be read."""
+        if rel not in self._files:
+            path = f"{self.root}/{rel}"
+            if self.argv is None:
+                try:
+                    with open(path) as f:
+                        text = f.read()
+                except OSError as e:
+                    raise OSError(f"cannot read {path}: {e.strerror}") from None
+            else:
+                code, text = self._run(["cat", path])
+                if code != 0:
+                    raise OSError(f"cannot read {path} (cat exited with {code})")
+            self._files[rel] = text.strip()
+        return self._files[rel]
+
+    def scan(self, *rels):
+        """{file name: value} of the numeric files in the directories rels,
+        read now. Directories that do not exist are skipped.
+        """
+        raw = {}
+        if self.argv is None:
+            for rel in rels:
+                try:
+                    entries = list(os.scandir(f"{self.root}/{rel}"))
+                except FileNotFoundError:
+                    continue
+                for entry in entries:
+                    try:
+                        with open(entry.path) as f:
+                            raw[entry.name] = f.read()
+                    except OSError:
+                        continue  # e.g. a counter the driver cannot read
+        else:
+            # One round trip for all files: "path:value" per line. grep
+            # exits with 2 if a directory is missing, which is fine here.
+            dirs = [f"{self.root}/{rel}" for rel in rels]
+            code, out = self._run(["grep", "-rsH", "", *dirs])
+            if code not in (0, 1, 2):
+                raise OSError(
+                    f"cannot read {', '.join(dirs)} (grep exited with {code})"
+                )
+            for line in out.splitlines():
+                path, _, value = line.rpartition(":")
+                raw[path.rpartition("/")[2]] = value
+        out = {}
+        for name, value in raw.items():
+            try:
+                out[name] = int(value.strip())
+            except ValueError:
+                continue
+        return out
+
+
+def host(root, argv=None, name=None):
+    """The Sysfs of a host (None: this one), created on first use."""
+    key = (root, name)
+    if key not in _hosts:
+        # setdefault: two slot threads asking at once get the same one
+        _hosts.setdefault(key, Sysfs(root, argv))
+    return _hosts[key]
+
+
+def seed(root, tree):
+    """Copy the fake sysfs tree over root (created if missing), so a mock
+    can add to its counters without touching the committed tree. Files
+    only in root, e.g. the counters of earlier sweeps, are kept.
+    """
+    shutil.copytree(tree, root, dirs_exist_ok=True)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Port counters and their deltas (counters.py) on a copy of mock_sysfs/,
+with mock_bench.py adding a run's traffic like in a mock sweep.
+
+Runs with the standard library, from this directory:
+
+    python3 -m unittest test_counters    # or: python3 -m pytest
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+import counters
+import mock_bench
+import sysfs
+
+MOCK_SYSFS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_sysfs")
+PORT = "class/infiniband/mock0/ports/1"
+
+
+class CountersTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        sysfs.seed(tmp.name, MOCK_SYSFS)
+        self.fs = sysfs.Sysfs(tmp.name)
+        self.model = {**mock_bench.MODEL_DEFAULTS, "sysfs_port": f"{tmp.name}/{PORT}"}
+        self.cfg = counters.settings(True)
+
+    def test_snapshot(self):
+        self.assertEqual(counters.snapshot(self.fs, "mock0", self.cfg), {})
+        mock_bench.bump(self.model, {})
+        values = counters.snapshot(self.fs, "mock0", self.cfg)
+        self.assertEqual(
+            set(values), {n.partition("/")[2] for n in mock_bench.COUNTERS}
+        )
+        self.assertEqual(set(values.values()), {0})
+        self.assertEqual(counters.snapshot(self.fs, None, self.cfg), {})
+        self.assertEqual(counters.snapshot(None, "mock0", self.cfg), {})
+
+    def test_probe(self):
+        mock_bench.bump(self.model, {})
+        add = mock_bench.traffic(self.model, 8192, 1000, random.Random(1))
+        devs = {"client": "mock0", "server": None}
+        probe = counters.Probe(self.cfg, devs, self.fs, None)
+        probe.start()
+        mock_bench.bump(self.model, add)
+        result = probe.stop()
+        # Two packets of 8192 + 2 * 58 header bytes per WR, in 4-byte words
+        expect = {
+            "port_xmit_data": 2077000,
+            "port_rcv_data": 2077000,
+            "port_xmit_packets": 2000,
+            "port_rcv_packets": 2000,
+        }
+        got = counters.parse_cell(result["client_counters"])
+        self.assertEqual({k: got[k] for k in expect}, expect)
+        self.assertIsNone(result["server_counters"])
+
+    def test_delta(self):
+        before = {"a": 5, "b": 7, "c": 1}
+        after = {"a": 9, "b": 7, "c": 0, "d": 3}
+        # b did not move, c went down (reset), d is new
+        self.assertEqual(counters.delta(before, after), {"a": 4})
+
+    def test_cells(self):
+        cell = counters.format_cell({"b": 2, "a": 1})
+        self.assertEqual(cell, "a=1;b=2")
+        self.assertEqual(counters.parse_cell(cell), {"a": 1, "b": 2})
+        self.assertIsNone(counters.format_cell({}))
+        self.assertEqual(counters.parse_cell(float("nan")), {})
+        self.assertEqual(counters.merge(["a=1;b=2", None, "a=2"]), "a=1.5;b=1")
+
+
+if __name__ == "__main__":
+    unittest.main()
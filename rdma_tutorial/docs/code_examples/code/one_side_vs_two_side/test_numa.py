@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""NUMA discovery and placement (numa.py) on the fake tree mock_sysfs/.
+
+Runs with the standard library, from this directory:
+
+    python3 -m unittest test_numa        # or: python3 -m pytest
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numa
+import sysfs
+
+MOCK_SYSFS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_sysfs")
+
+
+class MockSysfsTest(unittest.TestCase):
+    def setUp(self):
+        self.fs = sysfs.Sysfs(MOCK_SYSFS)
+
+    def test_nic_node(self):
+        self.assertEqual(numa.nic_node(self.fs, "mock0"), 0)
+        self.assertEqual(numa.distances(self.fs, 0), {0: 10, 1: 21})
+
+    def test_local_and_remote(self):
+        local = numa.place(self.fs, "mock0", "local")
+        remote = numa.place(self.fs, "mock0", "remote")
+        self.assertEqual((local, remote), (0, 1))
+        self.assertEqual(numa.cpus(self.fs, local), [0, 1, 2, 3])
+        self.assertEqual(numa.cpus(self.fs, remote), [4, 5, 6, 7])
+        self.assertIsNone(numa.place(self.fs, "mock0", "none"))
+
+    def test_nodes(self):
+        cfg = numa.settings()
+        devs = {"client": "mock0", "server": "mock0"}
+        for placement, node in (("none", None), ("local", 0), ("remote", 1)):
+            self.assertEqual(
+                numa.nodes(cfg, placement, devs, self.fs, self.fs),
+                {"client_node": node, "server_node": node},
+            )
+        self.assertEqual(
+            numa.command(cfg, 1), ["numactl", "--cpunodebind=1", "--membind=1"]
+        )
+        self.assertEqual(numa.command(cfg, None), [])
+
+    def test_errors(self):
+        cfg = numa.settings()
+        devs = {"client": "mock0", "server": "mock0"}
+        with self.assertRaises(numa.NumaError):
+            numa.nodes(cfg, "local", devs, self.fs, None)
+        fixed = numa.settings({"server_node": 1})
+        self.assertEqual(
+            numa.nodes(fixed, "local", devs, self.fs, None),
+            {"client_node": 0, "server_node": 1},
+        )
+        with self.assertRaises(numa.NumaError):
+            numa.place(self.fs, None, "local")
+
+    def test_single_node(self):
+        with tempfile.TemporaryDirectory() as root:
+            shutil.copytree(MOCK_SYSFS, root, dirs_exist_ok=True)
+            with open(f"{root}/devices/system/node/online", "w") as f:
+                f.write("0\n")
+            fs = sysfs.Sysfs(root)
+            self.assertEqual(numa.place(fs, "mock0", "local"), 0)
+            with self.assertRaises(numa.NumaError):
+                numa.place(fs, "mock0", "remote")
+
+
+if __name__ == "__main__":
+    unittest.main()